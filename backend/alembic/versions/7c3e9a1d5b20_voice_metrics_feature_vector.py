@@ -0,0 +1,115 @@
+"""voice_metrics_feature_vector
+
+合并两条迁移分支，并把语音指标的 mfcc_1..13、chroma_1..12 共25列替换为一个二进制特征向量列：
+- feature_vector 保存完整的162维特征向量（格式见 app/utils/feature_blob.py，版本1：4字节头 + 小端 float32）
+- 旧记录按原先各列在特征向量中的位置回填（zcr、色度、MFCC前13维；rms、mel_spectrogram 列实际保存的是
+  特征向量第26、27位），其余位置为 NaN
+- 回填完成后删除原有的25列，降级时从特征向量恢复
+
+Revision ID: 7c3e9a1d5b20
+Revises: 1f96afcc6566, update_relationships
+Create Date: 2026-10-17 10:00:00.000000
+
+"""
+import struct
+from typing import Sequence, Union
+
+from alembic import op
+import numpy as np
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7c3e9a1d5b20'
+down_revision: Union[str, Sequence[str], None] = ('1f96afcc6566', 'update_relationships')
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# 迁移中固定使用格式版本1（float32），不依赖应用代码
+FEATURE_DIM = 162
+HEADER = struct.pack("<2sBB", b"FV", 1, 1)
+MFCC_COLUMNS = [f"mfcc_{i}" for i in range(1, 14)]
+CHROMA_COLUMNS = [f"chroma_{i}" for i in range(1, 13)]
+BATCH_SIZE = 1000
+
+
+def _voice_metrics_table(*columns: str) -> sa.Table:
+    return sa.table(
+        'voice_metrics',
+        sa.column('id', sa.Integer),
+        sa.column('zcr', sa.Float),
+        sa.column('rms', sa.Float),
+        sa.column('mel_spectrogram', sa.Text),
+        sa.column('feature_vector', sa.LargeBinary),
+        *[sa.column(name, sa.Float) for name in columns]
+    )
+
+
+def _to_float(value) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return float("nan")
+
+
+def _batches(connection, table: sa.Table, columns):
+    """按主键分批读取（不一次性载入整张表）"""
+    last_id = 0
+    while True:
+        rows = connection.execute(
+            sa.select(*columns).where(table.c.id > last_id).order_by(table.c.id).limit(BATCH_SIZE)
+        ).fetchall()
+        if not rows:
+            return
+        yield rows
+        last_id = rows[-1].id
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('voice_metrics', sa.Column('feature_vector', sa.LargeBinary(), nullable=True))
+
+    connection = op.get_bind()
+    table = _voice_metrics_table(*MFCC_COLUMNS, *CHROMA_COLUMNS)
+    columns = [table.c.id, table.c.zcr, table.c.rms, table.c.mel_spectrogram] + \
+        [table.c[name] for name in CHROMA_COLUMNS + MFCC_COLUMNS]
+    update = table.update().where(table.c.id == sa.bindparam('_id')).values(feature_vector=sa.bindparam('_blob'))
+    for rows in _batches(connection, table, columns):
+        params = []
+        for row in rows:
+            vector = np.full(FEATURE_DIM, np.nan, dtype='<f4')
+            vector[0] = _to_float(row.zcr)
+            vector[1:13] = [_to_float(getattr(row, name)) for name in CHROMA_COLUMNS]
+            vector[13:26] = [_to_float(getattr(row, name)) for name in MFCC_COLUMNS]
+            vector[26] = _to_float(row.rms)
+            vector[27] = _to_float(row.mel_spectrogram)
+            params.append({'_id': row.id, '_blob': HEADER + vector.tobytes()})
+        connection.execute(update, params)
+
+    for name in MFCC_COLUMNS + CHROMA_COLUMNS:
+        op.drop_column('voice_metrics', name)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for name in MFCC_COLUMNS + CHROMA_COLUMNS:
+        op.add_column('voice_metrics', sa.Column(name, sa.Float(), nullable=True))
+
+    connection = op.get_bind()
+    table = _voice_metrics_table(*MFCC_COLUMNS, *CHROMA_COLUMNS)
+    values = {name: sa.bindparam(f'_{name}') for name in MFCC_COLUMNS + CHROMA_COLUMNS}
+    update = table.update().where(table.c.id == sa.bindparam('_id')).values(**values)
+    for rows in _batches(connection, table, [table.c.id, table.c.feature_vector]):
+        params = []
+        for row in rows:
+            if not row.feature_vector:
+                continue
+            code = row.feature_vector[3]
+            vector = np.frombuffer(row.feature_vector, dtype='<f4' if code == 1 else '<f2', offset=4).astype(float)
+            restored = dict(zip(CHROMA_COLUMNS, vector[1:13]))
+            restored.update(zip(MFCC_COLUMNS, vector[13:26]))
+            params.append({'_id': row.id, **{f'_{name}': None if np.isnan(value) else float(value) for name, value in restored.items()}})
+        if params:
+            connection.execute(update, params)
+
+    op.drop_column('voice_metrics', 'feature_vector')
@@ -0,0 +1,36 @@
+"""history_pagination_indexes
+
+历史记录游标分页所需的索引：
+- voice_metrics、diagnosis_sessions 的 (user_id, created_at) 复合索引，按用户过滤并按创建时间倒序分页时
+  直接沿索引读取，不再文件排序（InnoDB 二级索引隐含主键，id 作为第二排序键同样有序）
+- voice_metrics.session_id 索引，按会话查询语音指标
+
+Revision ID: b4d8e2f6a913
+Revises: 7c3e9a1d5b20
+Create Date: 2026-10-17 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b4d8e2f6a913'
+down_revision: Union[str, None] = '7c3e9a1d5b20'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_voice_metrics_user_id_created_at', 'voice_metrics', ['user_id', 'created_at'], unique=False)
+    op.create_index(op.f('ix_voice_metrics_session_id'), 'voice_metrics', ['session_id'], unique=False)
+    op.create_index('ix_diagnosis_sessions_user_id_created_at', 'diagnosis_sessions', ['user_id', 'created_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_diagnosis_sessions_user_id_created_at', table_name='diagnosis_sessions')
+    op.drop_index(op.f('ix_voice_metrics_session_id'), table_name='voice_metrics')
+    op.drop_index('ix_voice_metrics_user_id_created_at', table_name='voice_metrics')
@@ -0,0 +1,53 @@
+"""user_daily_stats
+
+按用户、按天的统计汇总表，仪表盘总数、趋势和预测分布读取该表而不是扫描全部会话和语音指标。
+升级后运行 python scripts/rebuild_daily_stats.py 从已有记录回填（之后由写入路径增量维护）。
+
+Revision ID: d2a7c4e9f051
+Revises: b4d8e2f6a913
+Create Date: 2026-10-17 14:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd2a7c4e9f051'
+down_revision: Union[str, None] = 'b4d8e2f6a913'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('user_daily_stats',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('session_count', sa.Integer(), nullable=False),
+    sa.Column('analysis_count', sa.Integer(), nullable=False),
+    sa.Column('prediction_counts', sa.Text(), nullable=True),
+    sa.Column('confidence_count', sa.Integer(), nullable=False),
+    sa.Column('confidence_sum', sa.Float(), nullable=False),
+    sa.Column('confidence_sumsq', sa.Float(), nullable=False),
+    sa.Column('rms_count', sa.Integer(), nullable=False),
+    sa.Column('rms_sum', sa.Float(), nullable=False),
+    sa.Column('rms_sumsq', sa.Float(), nullable=False),
+    sa.Column('zcr_count', sa.Integer(), nullable=False),
+    sa.Column('zcr_sum', sa.Float(), nullable=False),
+    sa.Column('zcr_sumsq', sa.Float(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('user_id', 'day', name='uq_user_daily_stats_user_id_day')
+    )
+    op.create_index(op.f('ix_user_daily_stats_id'), 'user_daily_stats', ['id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_user_daily_stats_id'), table_name='user_daily_stats')
+    op.drop_table('user_daily_stats')
@@ -0,0 +1,32 @@
+"""diagnosis_session_status
+
+diagnosis_sessions.status：异步分析任务的会话先于分析结果提交，任务失败时标记为 failed，
+任务状态过期或查询落到其他进程时据此返回失败；标记失败的会话不计入 user_daily_stats 的会话数。
+已有会话保持为空（有语音指标即为已完成）。
+
+Revision ID: e5b19c7a3d62
+Revises: d2a7c4e9f051
+Create Date: 2026-10-17 16:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e5b19c7a3d62'
+down_revision: Union[str, None] = 'd2a7c4e9f051'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('diagnosis_sessions', sa.Column('status', sa.String(length=20), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('diagnosis_sessions', 'status')
@@ -0,0 +1,54 @@
+from fastapi import APIRouter, Depends, HTTPException, status
+from typing import Dict, Any
+import logging
+import os
+
+from app.core.security import get_current_admin_user
+from app.db.models import User
+from app.schemas.model_registry import ModelSwapRequest
+from app.utils.model_registry import model_registry
+from app.utils.voice_models_utils import MODEL_DIR
+
+logger = logging.getLogger(__name__)
+router = APIRouter()
+
+@router.get("/model")
+def get_model_info(
+    current_user: User = Depends(get_current_admin_user)
+) -> Dict[str, Any]:
+    """获取当前进程的模型注册表状态"""
+    return model_registry.info()
+
+@router.post("/model/swap")
+def swap_model(
+    *,
+    request: ModelSwapRequest,
+    current_user: User = Depends(get_current_admin_user)
+) -> Dict[str, Any]:
+    """
+    热切换语音诊断模型
+    新模型加载并预热成功后才替换当前版本，处理中的请求继续使用旧版本完成；
+    分析进程池的工作进程在收到新版本的任务时按需加载
+    """
+    # 只允许加载模型目录下的文件
+    model_path = os.path.abspath(os.path.join(MODEL_DIR, request.model_file))
+    if os.path.dirname(model_path) != MODEL_DIR:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="模型文件必须位于模型目录下"
+        )
+    if not os.path.isfile(model_path):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"模型文件不存在: {request.model_file}"
+        )
+    logger.info(f"[swap_model] 用户 {current_user.id} 请求切换模型: {model_path}")
+    try:
+        ref = model_registry.swap(model_path, request.version)
+    except Exception as e:
+        logger.error(f"[swap_model] 模型切换失败: {str(e)}", exc_info=True)
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"模型加载失败，当前模型保持不变: {str(e)}"
+        )
+    return {"status": "success", "active": ref._asdict()}
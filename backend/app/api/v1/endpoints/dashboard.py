@@ -1,8 +1,8 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query, Body
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Body, Response
 from sqlalchemy.orm import Session
-from sqlalchemy import func, desc, and_
+from sqlalchemy import desc, and_
 from typing import Any, Dict, List, Optional
-from datetime import datetime, timedelta, date
+from datetime import timedelta, date
 import json
 from pydantic import BaseModel
 
@@ -10,7 +10,9 @@ from app.core.security import get_current_user
 from app.db.session import get_db
 from app.db.models import User, DiagnosisSession, VoiceMetrics
 from app.controllers.dashboard_controller import DashboardController
+from app.repositories.stats_repository import StatsRepository, utc_today
 from app.schemas.voice import VoiceHistoryResponse, VoiceStatsResponse
+from app.utils.pagination import set_page_headers
 
 router = APIRouter()
 
@@ -110,11 +112,15 @@ async def get_session_history(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
     skip: int = Query(0, ge=0),
-    limit: int = Query(10, ge=1, le=100)
+    limit: int = Query(10, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="上一页响应头 X-Next-Cursor 的值，提供时忽略 skip"),
+    with_total: bool = Query(False, description="为 true 时通过 X-Total-Count 响应头返回总数（缓存的近似值）"),
+    response: Response
 ):
-    """获取诊断历史记录"""
+    """获取诊断历史记录（下一页游标通过 X-Next-Cursor 响应头返回）"""
     dashboard_controller = DashboardController(db)
-    return await dashboard_controller.get_session_history(db, current_user.id, skip, limit)
+    page = await dashboard_controller.get_session_history(db, current_user.id, skip, limit, cursor, with_total)
+    return set_page_headers(response, page)
 
 # 获取趋势分析
 @router.get("/trend", response_model=Dict[str, Any])
@@ -151,12 +157,14 @@ async def get_historical_metrics(
 async def get_voice_history(
     skip: int = Query(0, ge=0),
     limit: int = Query(10, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="上一页返回的 next_cursor，提供时忽略 skip"),
+    with_total: bool = Query(True, description="是否返回总数（缓存的近似值）"),
     db: Session = Depends(get_db),
     current_user = Depends(get_current_user)
 ) -> Any:
     """获取语音分析历史记录"""
     dashboard_controller = DashboardController(db)
-    return await dashboard_controller.get_voice_history(db, current_user.id, skip, limit)
+    return await dashboard_controller.get_voice_history(db, current_user.id, skip, limit, cursor, with_total)
 
 @router.get("/stats", response_model=VoiceStatsResponse)
 async def get_voice_stats(
@@ -173,37 +181,28 @@ async def get_dashboard_overview(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ) -> Dict[str, Any]:
-    """获取仪表盘概览数据"""
-    # 获取总诊断次数
-    total_diagnoses = db.query(func.count(DiagnosisSession.id)).filter(
-        DiagnosisSession.user_id == current_user.id
-    ).scalar()
+    """获取仪表盘概览数据（总数读取按天汇总）"""
+    stats = StatsRepository(db)
+    rows = stats.get_days(current_user.id)
+    # 最近7天（含今天）
+    seven_days_ago = utc_today() - timedelta(days=6)
+    total_diagnoses = sum(row.session_count for row in rows)
+    recent_diagnoses = sum(row.session_count for row in rows if row.day >= seven_days_ago)
 
-    # 获取最近7天的诊断次数
-    seven_days_ago = datetime.utcnow() - timedelta(days=7)
-    recent_diagnoses = db.query(func.count(DiagnosisSession.id)).filter(
-        DiagnosisSession.user_id == current_user.id,
-        DiagnosisSession.created_at >= seven_days_ago
-    ).scalar()
-
-    # 获取平均诊断时长
-    avg_duration = db.query(func.avg(DiagnosisSession.duration)).filter(
-        DiagnosisSession.user_id == current_user.id
-    ).scalar() or 0
-
-    # 获取最新的诊断结果
+    # 获取最新的诊断结果（走 (user_id, created_at) 索引）
     latest_diagnosis = db.query(DiagnosisSession).filter(
         DiagnosisSession.user_id == current_user.id
-    ).order_by(DiagnosisSession.created_at.desc()).first()
+    ).order_by(DiagnosisSession.created_at.desc(), DiagnosisSession.id.desc()).first()
 
     return {
         "total_diagnoses": total_diagnoses,
         "recent_diagnoses": recent_diagnoses,
-        "avg_duration": float(avg_duration),
+        # 会话没有时长列
+        "avg_duration": 0.0,
         "latest_diagnosis": {
             "id": latest_diagnosis.id,
             "created_at": latest_diagnosis.created_at,
-            "status": latest_diagnosis.status
+            "status": "completed" if latest_diagnosis.voice_metrics else "pending"
         } if latest_diagnosis else None
     }
 
@@ -214,26 +213,15 @@ async def get_diagnosis_trends(
     current_user: User = Depends(get_current_user),
     days: int = 7
 ) -> List[Dict[str, Any]]:
-    """获取诊断趋势数据"""
-    start_date = datetime.utcnow() - timedelta(days=days)
-    
-    # 按日期分组统计诊断次数
-    daily_stats = db.query(
-        func.date(DiagnosisSession.created_at).label('date'),
-        func.count(DiagnosisSession.id).label('count')
-    ).filter(
-        DiagnosisSession.user_id == current_user.id,
-        DiagnosisSession.created_at >= start_date
-    ).group_by(
-        func.date(DiagnosisSession.created_at)
-    ).all()
+    """获取诊断趋势数据（读取按天汇总）"""
+    rows = StatsRepository(db).get_recent_days(current_user.id, days)
 
     return [
         {
-            "date": stat.date.strftime("%Y-%m-%d"),
-            "count": stat.count
+            "date": row.day.strftime("%Y-%m-%d"),
+            "count": row.session_count
         }
-        for stat in daily_stats
+        for row in rows if row.session_count
     ]
 
 @router.get("/metrics")
@@ -260,35 +248,8 @@ async def get_voice_metrics(
         "prediction": latest_metrics.model_prediction,
         "confidence": latest_metrics.model_confidence,
         "created_at": latest_metrics.created_at,
-        "mfcc": [
-            latest_metrics.mfcc_1,
-            latest_metrics.mfcc_2,
-            latest_metrics.mfcc_3,
-            latest_metrics.mfcc_4,
-            latest_metrics.mfcc_5,
-            latest_metrics.mfcc_6,
-            latest_metrics.mfcc_7,
-            latest_metrics.mfcc_8,
-            latest_metrics.mfcc_9,
-            latest_metrics.mfcc_10,
-            latest_metrics.mfcc_11,
-            latest_metrics.mfcc_12,
-            latest_metrics.mfcc_13
-        ],
-        "chroma": [
-            latest_metrics.chroma_1,
-            latest_metrics.chroma_2,
-            latest_metrics.chroma_3,
-            latest_metrics.chroma_4,
-            latest_metrics.chroma_5,
-            latest_metrics.chroma_6,
-            latest_metrics.chroma_7,
-            latest_metrics.chroma_8,
-            latest_metrics.chroma_9,
-            latest_metrics.chroma_10,
-            latest_metrics.chroma_11,
-            latest_metrics.chroma_12
-        ],
+        "mfcc": latest_metrics.mfcc,
+        "chroma": latest_metrics.chroma,
         "rms": latest_metrics.rms,
         "zcr": latest_metrics.zcr
     }
@@ -325,9 +286,9 @@ async def get_latest_session(
             "rms": metrics.rms,
             "zcr": metrics.zcr,
             # MFCC 1-13
-            **{f"mfcc_{i}": getattr(metrics, f"mfcc_{i}", None) for i in range(1, 14)},
+            **{f"mfcc_{i}": value for i, value in enumerate(metrics.mfcc, 1)},
             # Chroma 1-12
-            **{f"chroma_{i}": getattr(metrics, f"chroma_{i}", None) for i in range(1, 13)}
+            **{f"chroma_{i}": value for i, value in enumerate(metrics.chroma, 1)}
         }
     
     return result 
\ No newline at end of file
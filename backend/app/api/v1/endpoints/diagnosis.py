@@ -1,18 +1,19 @@
 import logging
 logger = logging.getLogger(__name__)
 
-from fastapi import APIRouter, Depends, UploadFile, File, HTTPException, BackgroundTasks, Query, WebSocket, WebSocketDisconnect
+from fastapi import APIRouter, Depends, UploadFile, File, HTTPException, BackgroundTasks, Query, WebSocket, WebSocketDisconnect, Request, Response, status
 from sqlalchemy.orm import Session
 from typing import Dict, Any, List, Optional
 from sqlalchemy.sql import func
 from datetime import datetime, timedelta
 
-from app.core.security import get_current_user
+from app.core.security import get_current_user, get_user_from_token
 from app.db.session import get_db
 from app.db.models import User, VoiceMetrics, DiagnosisSession
 from app.controllers.diagnosis_controller import DiagnosisController
-from app.schemas.voice import VoiceHistoryResponse, VoiceStatsResponse
+from app.schemas.voice import VoiceHistoryResponse, VoiceStatsResponse, ChunkedUploadCreate, ChunkedUploadFinalize
 from app.websockets.manager import websocket_manager
+from app.utils.pagination import set_page_headers
 
 router = APIRouter()
 
@@ -23,34 +24,142 @@ async def upload_voice_file(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
     file: UploadFile = File(...),
-    background_tasks: BackgroundTasks = BackgroundTasks()
+    background_tasks: BackgroundTasks = BackgroundTasks(),
+    async_mode: bool = Query(False, alias="async", description="为 true 时立即返回 202 和任务句柄，分析在后台执行"),
+    response: Response
 ):
     """上传语音文件并创建诊断会话"""
     try:
         logger.info(f"开始处理用户 {current_user.id} 的语音文件上传")
         controller = DiagnosisController(db)
+        if async_mode:
+            result = await controller.upload_voice_file_async(file, current_user.id)
+            response.status_code = status.HTTP_202_ACCEPTED
+            response.headers["Location"] = result["status_url"]
+            logger.info(f"用户 {current_user.id} 的语音文件已进入异步分析队列: job_id={result['job_id']}")
+            return result
         result = await controller.upload_voice_file(file, current_user.id, background_tasks)
         logger.info(f"用户 {current_user.id} 的语音文件上传成功")
         return result
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"用户 {current_user.id} 的语音文件上传失败: {str(e)}")
         raise HTTPException(
             status_code=500,
             detail=f"文件上传失败: {str(e)}"
         )
+
+@router.post("/upload-batch")
+async def upload_voice_files(
+    *,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+    files: List[UploadFile] = File(...),
+    background_tasks: BackgroundTasks = BackgroundTasks()
+):
+    """批量上传同一次就诊的多段录音，返回逐段结果和会话级汇总"""
+    try:
+        logger.info(f"开始处理用户 {current_user.id} 的批量语音上传: {len(files)} 个文件")
+        controller = DiagnosisController(db)
+        result = await controller.upload_voice_files(files, current_user.id, background_tasks)
+        logger.info(f"用户 {current_user.id} 的批量语音上传成功")
+        return result
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"用户 {current_user.id} 的批量语音上传失败: {str(e)}")
+        raise HTTPException(
+            status_code=500,
+            detail=f"批量上传失败: {str(e)}"
+        )
+
+@router.get("/jobs/{job_id}")
+async def get_analysis_job(
+    *,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+    job_id: int
+):
+    """查询异步上传（/upload?async=true）的分析任务状态、进度事件和结果"""
+    controller = DiagnosisController(db)
+    return controller.get_analysis_job(job_id, current_user.id)
+
+# 分块续传上传：创建 -> 按偏移量追加分块 -> 完成上传并分析
+@router.post("/uploads")
+async def create_chunked_upload(
+    *,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+    request: ChunkedUploadCreate
+):
+    """创建分块续传上传"""
+    controller = DiagnosisController(db)
+    return controller.create_chunked_upload(current_user.id, request.filename, request.total_size)
+
+@router.get("/uploads/{upload_id}")
+async def get_chunked_upload(
+    *,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+    upload_id: str
+):
+    """查询分块上传状态（续传前获取服务器已接收的偏移量）"""
+    controller = DiagnosisController(db)
+    return controller.get_chunked_upload(upload_id, current_user.id)
+
+@router.put("/uploads/{upload_id}")
+async def append_chunked_upload(
+    *,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+    upload_id: str,
+    offset: int = Query(..., ge=0, description="本分块在文件中的起始偏移量"),
+    request: Request
+):
+    """追加上传分块，请求体为原始字节流，边接收边写盘"""
+    controller = DiagnosisController(db)
+    return await controller.append_chunked_upload(upload_id, current_user.id, offset, request.stream())
+
+@router.post("/uploads/{upload_id}/finalize")
+async def finalize_chunked_upload(
+    *,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+    upload_id: str,
+    request: ChunkedUploadFinalize,
+    background_tasks: BackgroundTasks = BackgroundTasks()
+):
+    """完成分块上传，校验后进入分析流水线，返回结果与 /upload 一致"""
+    try:
+        logger.info(f"用户 {current_user.id} 完成分块上传: {upload_id}")
+        controller = DiagnosisController(db)
+        return await controller.finalize_chunked_upload(upload_id, current_user.id, request.sha256, background_tasks)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"用户 {current_user.id} 的分块上传处理失败: {str(e)}")
+        raise HTTPException(
+            status_code=500,
+            detail=f"文件上传失败: {str(e)}"
+        )
 #疑似删除项目
 @router.get("/voice-history", response_model=VoiceHistoryResponse)
 async def get_voice_history(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
     page: int = Query(1, ge=1),
-    size: int = Query(10, ge=1, le=100)
+    size: int = Query(10, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="上一页返回的 next_cursor，提供时忽略页码"),
+    with_total: bool = Query(True, description="是否返回总数（缓存的近似值）")
 ):
     """获取用户的语音分析历史记录"""
-    logger.info(f"收到历史记录请求 - 用户ID: {current_user.id}, 页码: {page}, 每页大小: {size}")
+    logger.info(f"收到历史记录请求 - 用户ID: {current_user.id}, 页码: {page}, 每页大小: {size}, 游标: {cursor}")
     try:
         controller = DiagnosisController(db)
-        return await controller.get_voice_history(current_user.id, page, size)
+        return await controller.get_voice_history(current_user.id, page, size, cursor, with_total)
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"获取语音历史记录失败: {str(e)}", exc_info=True)
         raise HTTPException(
@@ -112,6 +221,21 @@ async def analyze_with_llm(
             detail=f"LLM分析失败: {str(e)}"
         )
     
+@router.get("/{session_id}/wait")
+async def wait_for_analysis(
+    *,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+    session_id: int,
+    timeout: Optional[float] = Query(None, gt=0, description="最长等待时间（秒），默认 LLM_WAIT_DEFAULT_TIMEOUT，上限 LLM_WAIT_MAX_TIMEOUT")
+):
+    """长轮询：LLM分析完成时立即返回结果，超时返回204（替代反复轮询 /latest）"""
+    controller = DiagnosisController(db)
+    result = await controller.wait_for_analysis(session_id, current_user.id, timeout)
+    if result is None:
+        return Response(status_code=status.HTTP_204_NO_CONTENT)
+    return result
+
 @router.get("/{session_id}")
 async def get_diagnosis_result(
     *,
@@ -151,9 +275,18 @@ async def get_latest_suggestion(session_id: int, user_id: int, db: Session = Dep
     return await controller.get_latest_suggestion(session_id, user_id)
 
 @router.get("/analysis-history")
-async def get_analysis_history(user_id: int, skip: int = 0, limit: int = 10, db: Session = Depends(get_db)):
+async def get_analysis_history(
+    user_id: int,
+    response: Response,
+    skip: int = 0,
+    limit: int = 10,
+    cursor: Optional[str] = None,
+    with_total: bool = False,
+    db: Session = Depends(get_db)
+):
     controller = DiagnosisController(db)
-    return await controller.get_analysis_history(user_id, skip, limit)
+    page = await controller.get_analysis_history(user_id, skip, limit, cursor, with_total)
+    return set_page_headers(response, page)
 
 @router.get("/display-summary")
 async def get_display_summary(user_id: int, db: Session = Depends(get_db)):
@@ -190,8 +323,8 @@ async def get_latest_result(
             "model_confidence": metrics.model_confidence if metrics else None,
             "rms": metrics.rms if metrics else None,
             "zcr": metrics.zcr if metrics else None,
-            "mfcc": [getattr(metrics, f"mfcc_{i}") for i in range(1, 14)] if metrics else [],
-            "chroma": [getattr(metrics, f"chroma_{i}") for i in range(1, 13)] if metrics else [],
+            "mfcc": metrics.mfcc if metrics else [],
+            "chroma": metrics.chroma if metrics else [],
             "mel_spectrogram": metrics.mel_spectrogram if metrics else None
         }
     }
@@ -205,4 +338,19 @@ async def diagnosis_ws(websocket: WebSocket, user_id: int):
             await websocket.receive_text()  # 保持连接
     except WebSocketDisconnect:
         logger.info(f"WebSocket断开: user_id={user_id}")
-        websocket_manager.disconnect(user_id) 
\ No newline at end of file
+        websocket_manager.disconnect(user_id) 
+@router.websocket("/stream")
+async def stream_voice(
+    websocket: WebSocket,
+    token: Optional[str] = Query(None),
+    db: Session = Depends(get_db)
+):
+    """流式录音分析：边录音边发送 PCM 帧，实时推送质量提示，录音结束后返回预测结果（令牌通过查询参数传递）"""
+    current_user = get_user_from_token(db, token)
+    if current_user is None:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+    await websocket.accept()
+    logger.info(f"流式录音连接建立: user_id={current_user.id}")
+    controller = DiagnosisController(db)
+    await controller.stream_voice(websocket, current_user.id)
@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Body, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Body, Query, Response
 from sqlalchemy.orm import Session
 from typing import Any, Dict, List, Optional
 from datetime import datetime, timedelta
@@ -10,6 +10,7 @@ from app.core.security import get_current_user
 from app.db.session import get_db
 from app.db.models import User, DiagnosisSession, VoiceMetrics
 from app.controllers.llm_controller import LLMController
+from app.utils.pagination import set_page_headers
 
 # 配置日志
 logger = logging.getLogger(__name__)
@@ -166,12 +167,16 @@ async def get_analysis_history(
     db: Session = Depends(get_db),
     skip: int = 0,
     limit: int = 10,
+    cursor: Optional[str] = Query(None, description="上一页响应头 X-Next-Cursor 的值，提供时忽略 skip"),
+    with_total: bool = Query(False, description="为 true 时通过 X-Total-Count 响应头返回总数（缓存的近似值）"),
+    response: Response,
     current_user: User = Depends(get_current_user)
 ):
-    """获取分析历史"""
-    logger.info(f"[API.history] 获取分析历史: user_id={current_user.id}, skip={skip}, limit={limit}")
+    """获取分析历史（下一页游标通过 X-Next-Cursor 响应头返回）"""
+    logger.info(f"[API.history] 获取分析历史: user_id={current_user.id}, skip={skip}, limit={limit}, cursor={cursor}")
     controller = LLMController(db)
-    return await controller.get_analysis_history(current_user.id, skip, limit)
+    page = await controller.get_analysis_history(current_user.id, skip, limit, cursor, with_total)
+    return set_page_headers(response, page)
 
 @router.post("/summary/{session_id}", response_model=Dict[str, Any])
 async def summarize_with_llm(
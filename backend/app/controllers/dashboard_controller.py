@@ -1,4 +1,4 @@
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, selectinload
 from typing import Dict, Any, List, Optional
 from fastapi import HTTPException
 from datetime import datetime, timedelta
@@ -9,6 +9,9 @@ from collections import Counter
 from app.db.models import User, DiagnosisSession, VoiceMetrics
 from app.services.voice_analysis_service import VoiceAnalysisService
 from app.schemas.voice import VoiceHistoryResponse, VoiceStatsResponse
+from app.repositories.llm_repository import LLMRepository
+from app.repositories.stats_repository import StatsRepository
+from app.utils.pagination import keyset_page
 
 class DashboardController:
     def __init__(self, db: Session):
@@ -57,14 +60,28 @@ class DashboardController:
         db: Session,
         user_id: int,
         skip: int = 0,
-        limit: int = 10
-    ) -> List[Dict[str, Any]]:
-        """获取诊断历史记录"""
-        sessions = db.query(DiagnosisSession).filter(
+        limit: int = 10,
+        cursor: Optional[str] = None,
+        with_total: bool = False
+    ) -> Dict[str, Any]:
+        """
+        获取一页诊断历史记录（按 (created_at, id) 倒序，提供游标时忽略 skip）
+
+        Returns:
+            {"records": 本页记录, "next_cursor": 下一页游标, "total": 总数}
+        """
+        # 各会话的语音指标用一条 IN 查询批量加载，不再逐个会话懒加载
+        query = db.query(DiagnosisSession).options(
+            selectinload(DiagnosisSession.voice_metrics)
+        ).filter(
             DiagnosisSession.user_id == user_id
-        ).order_by(
-            DiagnosisSession.created_at.desc()
-        ).offset(skip).limit(limit).all()
+        )
+        try:
+            sessions, next_cursor = keyset_page(
+                query, DiagnosisSession.created_at, DiagnosisSession.id, limit, cursor=cursor, offset=skip
+            )
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
         
         result = []
         for session in sessions:
@@ -92,7 +109,8 @@ class DashboardController:
                 "diagnosis_suggestion": session.diagnosis_suggestion if hasattr(session, 'diagnosis_suggestion') else None
             })
         
-        return result
+        total = LLMRepository(db).count_sessions(user_id) if with_total else None
+        return {"records": result, "next_cursor": next_cursor, "total": total}
 
     async def get_trend_analysis(
         self,
@@ -100,54 +118,26 @@ class DashboardController:
         user_id: int,
         days: int = 30
     ) -> Dict[str, Any]:
-        """获取趋势分析数据"""
-        # 获取指定天数内的诊断记录
-        start_date = datetime.now() - timedelta(days=days)
-        sessions = db.query(DiagnosisSession).filter(
-            DiagnosisSession.user_id == user_id,
-            DiagnosisSession.created_at >= start_date
-        ).order_by(DiagnosisSession.created_at).all()
-        
-        # 按日期分组统计数据
-        daily_stats = {}
-        for session in sessions:
-            date = session.created_at.date()
-            if date not in daily_stats:
-                daily_stats[date] = {
-                    "count": 0,
-                    "predictions": []
-                }
-            daily_stats[date]["count"] += 1
-            if session.metrics:
-                daily_stats[date]["predictions"].append(
-                    session.metrics.model_prediction
-                )
+        """获取趋势分析数据（读取按天汇总，每天一行）"""
+        stats = StatsRepository(db)
+        rows = [row for row in stats.get_recent_days(user_id, days) if row.session_count or row.analysis_count]
         
-        # 计算每日平均值
         trend_data = []
-        for date, stats in sorted(daily_stats.items()):
-            avg_prediction = (
-                sum(stats["predictions"]) / len(stats["predictions"])
-                if stats["predictions"]
-                else 0
-            )
+        for row in rows:
+            daily = stats.summarize([row])
             trend_data.append({
-                "date": date.isoformat(),
-                "count": stats["count"],
-                "average_prediction": round(avg_prediction, 2)
+                "date": row.day.isoformat(),
+                "count": row.session_count,
+                "analysis_count": row.analysis_count,
+                "prediction_distribution": daily["prediction_distribution"],
+                "average_confidence": round(daily["confidence"]["mean"], 4) if daily["confidence"]["count"] else 0
             })
         
+        overall = stats.summarize(rows)
         return {
             "trend_data": trend_data,
-            "total_sessions": sum(stats["count"] for stats in daily_stats.values()),
-            "average_prediction": round(
-                sum(
-                    sum(stats["predictions"]) / len(stats["predictions"])
-                    for stats in daily_stats.values()
-                    if stats["predictions"]
-                ) / len(daily_stats),
-                2
-            ) if daily_stats else 0
+            "total_sessions": overall["session_count"],
+            "average_confidence": round(overall["confidence"]["mean"], 4) if overall["confidence"]["count"] else 0
         }
 
     async def get_spectrum_analysis(
@@ -402,9 +392,9 @@ class DashboardController:
                 "model_confidence": latest_metrics.model_confidence,
                 "mel_spectrogram": latest_metrics.mel_spectrogram,
                 # MFCC 1-13
-                **{f"mfcc_{i}": getattr(latest_metrics, f"mfcc_{i}", None) for i in range(1, 14)},
+                **{f"mfcc_{i}": value for i, value in enumerate(latest_metrics.mfcc, 1)},
                 # Chroma 1-12
-                **{f"chroma_{i}": getattr(latest_metrics, f"chroma_{i}", None) for i in range(1, 13)}
+                **{f"chroma_{i}": value for i, value in enumerate(latest_metrics.chroma, 1)}
             },
             "created_at": latest_metrics.created_at
         }
@@ -436,44 +426,13 @@ class DashboardController:
         db: Session,
         user_id: int,
         skip: int = 0,
-        limit: int = 10
+        limit: int = 10,
+        cursor: Optional[str] = None,
+        with_total: bool = True
     ) -> VoiceHistoryResponse:
-        """获取语音分析历史记录"""
-        total = db.query(VoiceMetrics).filter(
-            VoiceMetrics.user_id == user_id
-        ).count()
-        
-        records = db.query(VoiceMetrics).filter(
-            VoiceMetrics.user_id == user_id
-        ).order_by(
-            VoiceMetrics.created_at.desc()
-        ).offset(skip).limit(limit).all()
-        
-        history = []
-        for record in records:
-            session = db.query(DiagnosisSession).filter(
-                DiagnosisSession.metrics_id == record.id
-            ).first()
-            
-            history_record = {
-                "id": record.id,
-                "created_at": record.created_at,
-                "f0": record.f0,
-                "hnr": record.hnr,
-                "short_time_energy": record.short_time_energy,
-                "zero_crossing_rate": record.zcr,
-                "spectral_centroid": record.spectral_centroid,
-                "model_prediction": record.model_prediction,
-                "model_confidence": record.model_confidence,
-                "session_id": session.id if session else None
-            }
-            history.append(history_record)
-        
-        return VoiceHistoryResponse(
-            total=total,
-            skip=skip,
-            limit=limit,
-            records=history
+        """获取语音分析历史记录（提供游标时忽略 skip）"""
+        return await self.voice_analysis_service.get_voice_history(
+            user_id, skip // limit + 1, limit, cursor=cursor, with_total=with_total, offset=skip
         )
 
     async def get_voice_stats(
@@ -481,42 +440,11 @@ class DashboardController:
         db: Session,
         user_id: int
     ) -> VoiceStatsResponse:
-        """获取语音分析统计数据"""
-        thirty_days_ago = datetime.utcnow() - timedelta(days=30)
-        
-        # 总分析次数
-        total_analyses = db.query(VoiceMetrics).filter(
-            VoiceMetrics.user_id == user_id
-        ).count()
-        
-        # 最近30天分析次数
-        recent_analyses = db.query(VoiceMetrics).filter(
-            VoiceMetrics.user_id == user_id,
-            VoiceMetrics.created_at >= thirty_days_ago
-        ).count()
-        
-        # 预测结果分布
-        prediction_distribution = db.query(
-            VoiceMetrics.model_prediction,
-            func.count(VoiceMetrics.id)
-        ).filter(
-            VoiceMetrics.user_id == user_id,
-            VoiceMetrics.model_prediction.isnot(None)
-        ).group_by(
-            VoiceMetrics.model_prediction
-        ).all()
-        
-        # 平均置信度
-        avg_confidence = db.query(
-            func.avg(VoiceMetrics.model_confidence)
-        ).filter(
-            VoiceMetrics.user_id == user_id,
-            VoiceMetrics.model_confidence.isnot(None)
-        ).scalar() or 0
-        
+        """获取语音分析统计数据（读取按天汇总）"""
+        stats = self.voice_analysis_service.repository.get_voice_stats(user_id)
         return VoiceStatsResponse(
-            total_analyses=total_analyses,
-            recent_analyses=recent_analyses,
-            prediction_distribution=dict(prediction_distribution),
-            avg_confidence=float(avg_confidence)
-        ) 
\ No newline at end of file
+            total_analyses=stats["total_analyses"],
+            recent_analyses=stats["recent_analyses"],
+            prediction_distribution=stats["prediction_distribution"],
+            average_confidence=float(stats["average_confidence"])
+        )
\ No newline at end of file
@@ -3,7 +3,7 @@ from sqlalchemy.orm import Session
 from app.db.session import get_db
 from app.services.voice_analysis_service import VoiceAnalysisService
 from app.schemas.voice import VoiceHistoryResponse, VoiceStatsResponse
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional
 from app.services.llm_service import LLMService
 from app.repositories.llm_repository import LLMRepository
 
@@ -98,8 +98,10 @@ class DiagnosisController:
         self,
         user_id: int,
         skip: int = 0,
-        limit: int = 10
-    ) -> List[Dict[str, Any]]:
+        limit: int = 10,
+        cursor: Optional[str] = None,
+        with_total: bool = False
+    ) -> Dict[str, Any]:
         """
         获取分析历史
         
@@ -107,12 +109,52 @@ class DiagnosisController:
             user_id: 用户ID
             skip: 跳过数量
             limit: 限制数量
+            cursor: 上一页返回的游标，提供时忽略 skip
+            with_total: 是否返回总数
             
         Returns:
-            分析历史记录
+            {"records": 分析历史记录, "next_cursor": 下一页游标, "total": 总数}
         """
-        return await self.llm_service.get_analysis_history(user_id, skip, limit)
+        return await self.llm_service.get_analysis_history(user_id, skip, limit, cursor, with_total)
     
+    async def get_voice_history(
+        self,
+        user_id: int,
+        page: int = 1,
+        size: int = 10,
+        cursor: Optional[str] = None,
+        with_total: bool = True
+    ) -> VoiceHistoryResponse:
+        """
+        获取语音分析历史记录
+        
+        Args:
+            user_id: 用户ID
+            page: 页码（未提供游标时使用）
+            size: 每页大小
+            cursor: 上一页返回的游标
+            with_total: 是否返回总数
+            
+        Returns:
+            语音历史记录
+        """
+        return await self.voice_analysis_service.get_voice_history(user_id, page, size, cursor, with_total)
+
+    async def get_voice_stats(
+        self,
+        user_id: int
+    ) -> VoiceStatsResponse:
+        """
+        获取语音分析统计数据
+
+        Args:
+            user_id: 用户ID
+
+        Returns:
+            语音统计数据
+        """
+        return await self.voice_analysis_service.get_voice_stats(user_id)
+
     async def get_display_summary(
         self,
         user_id: int
@@ -145,4 +187,40 @@ class DiagnosisController:
 #主数据流用到
     async def upload_voice_file(self, file, user_id, background_tasks):
         """上传语音文件并处理"""
-        return await self.voice_analysis_service.handle_voice_upload(file, user_id, background_tasks) 
\ No newline at end of file
+        return await self.voice_analysis_service.handle_voice_upload(file, user_id, background_tasks)
+
+    async def wait_for_analysis(self, session_id, user_id, timeout=None):
+        """长轮询等待诊断会话的LLM分析结果"""
+        return await self.llm_service.wait_for_analysis(session_id, user_id, timeout)
+
+    async def upload_voice_file_async(self, file, user_id):
+        """异步上传语音文件，立即返回任务句柄"""
+        return await self.voice_analysis_service.handle_voice_upload_async(file, user_id)
+
+    def get_analysis_job(self, job_id, user_id):
+        """查询异步分析任务"""
+        return self.voice_analysis_service.get_analysis_job(job_id, user_id)
+
+    async def upload_voice_files(self, files, user_id, background_tasks):
+        """批量上传同一次就诊的多段录音"""
+        return await self.voice_analysis_service.handle_voice_batch_upload(files, user_id, background_tasks)
+
+    def create_chunked_upload(self, user_id, filename, total_size=None):
+        """创建分块续传上传"""
+        return self.voice_analysis_service.create_chunked_upload(user_id, filename, total_size)
+
+    def get_chunked_upload(self, upload_id, user_id):
+        """查询分块上传状态"""
+        return self.voice_analysis_service.get_chunked_upload(upload_id, user_id)
+
+    async def append_chunked_upload(self, upload_id, user_id, offset, chunks):
+        """追加上传分块"""
+        return await self.voice_analysis_service.append_chunked_upload(upload_id, user_id, offset, chunks)
+
+    async def finalize_chunked_upload(self, upload_id, user_id, sha256, background_tasks):
+        """完成分块上传并分析"""
+        return await self.voice_analysis_service.finalize_chunked_upload(upload_id, user_id, sha256, background_tasks)
+
+    async def stream_voice(self, websocket, user_id):
+        """流式录音分析（WebSocket）"""
+        return await self.voice_analysis_service.handle_voice_stream(websocket, user_id)
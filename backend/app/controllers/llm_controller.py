@@ -130,14 +130,18 @@ class LLMController:
         self,
         user_id: int,
         skip: int = 0,
-        limit: int = 10
-    ) -> List[Dict[str, Any]]:
-        """获取分析历史"""
+        limit: int = 10,
+        cursor: Optional[str] = None,
+        with_total: bool = False
+    ) -> Dict[str, Any]:
+        """获取一页分析历史"""
         try:
-            logger.info(f"[LLMController.get_analysis_history] 获取分析历史: user_id={user_id}, skip={skip}, limit={limit}")
-            result = await self.llm_service.get_analysis_history(user_id, skip, limit)
+            logger.info(f"[LLMController.get_analysis_history] 获取分析历史: user_id={user_id}, skip={skip}, limit={limit}, cursor={cursor}")
+            result = await self.llm_service.get_analysis_history(user_id, skip, limit, cursor, with_total)
             logger.info(f"[LLMController.get_analysis_history] 获取分析历史成功: user_id={user_id}")
             return result
+        except HTTPException:
+            raise
         except Exception as e:
             logger.error(f"[LLMController.get_analysis_history] 获取分析历史失败: {str(e)}", exc_info=True)
             raise HTTPException(
@@ -34,6 +34,111 @@ class Settings(BaseSettings):
     MYSQL_DATABASE: str = "project"
     SQLALCHEMY_DATABASE_URI: Optional[str] = None
 
+    # 音频流水线采样率：所有解码后端直接输出该采样率，特征提取、质量评估和麦克风测试共用
+    PIPELINE_SAMPLE_RATE: int = 22050  # 与SVM训练时的特征采样率一致，避免二次重采样
+    RESAMPLE_QUALITY: str = "soxr_hq"  # 重采样质量（librosa res_type），soxr_qq 更快但精度略低
+
+    # 特征提取引擎：librosa（默认）或 numpy（纯 NumPy/SciPy 实现，无 numba JIT 冷启动）
+    FEATURE_ENGINE: str = "librosa"
+    FEATURE_FFT_WORKERS: int = 1  # numpy 引擎中 scipy.fft 的线程数，分析进程池中建议保持为 1
+    FEATURE_BLOB_DTYPE: str = "float32"  # 语音指标中特征向量的存储精度：float32，或 float16（体积减半，约3位有效数字）
+
+    # 分析进程池配置
+    ANALYSIS_WORKERS: int = 0  # 工作进程数，0 表示按CPU核数自动设置
+    ANALYSIS_QUEUE_SIZE: int = 16  # 工作进程全部繁忙时每类任务允许排队的任务数
+    ANALYSIS_BLAS_THREADS: int = 1  # 每个工作进程的BLAS/OpenMP线程数，避免超额订阅
+    ANALYSIS_RETRY_AFTER: int = 5  # 队列已满时建议客户端重试的秒数
+    # 分析任务分类调度：interactive（麦克风质量检测）、upload（上传分析）、background（异步上传任务）
+    # 各类任务分别排队，工作进程空闲时按权重轮流取任务；环境变量以 JSON 设置，如 {"interactive": 8, "upload": 2, "background": 1}
+    ANALYSIS_CLASS_WEIGHTS: Dict[str, int] = {"interactive": 8, "upload": 2, "background": 1}
+    ANALYSIS_CLASS_DEADLINES: Dict[str, float] = {"interactive": 5.0, "upload": 60.0, "background": 0.0}  # 从提交到开始执行的最长等待（秒），预计或实际超出时直接拒绝，0 表示不限
+    BATCH_UPLOAD_MAX_FILES: int = 10  # 批量上传单次允许的最大文件数
+
+    # 推理合批配置（并发上传的SVM预测由主进程合并为一次批量预测）
+    INFERENCE_BATCHING: bool = True  # 关闭时预测在分析工作进程内逐条完成
+    INFERENCE_BATCH_WINDOW_MS: float = 5.0  # 已有批次在预测时，新请求等待合批的最长时间（毫秒）；空闲时请求立即发出
+    INFERENCE_BATCH_MAX_SIZE: int = 32  # 单批最多样本数，凑满后立即预测
+
+    # 异步上传配置（/diagnosis/upload?async=true 立即返回202，分析在后台任务队列中执行）
+    ASYNC_JOB_WORKERS: int = 2  # 同时执行的异步分析任务数（实际的CPU并发仍由分析进程池控制）
+    ASYNC_JOB_QUEUE_SIZE: int = 100  # 排队中的异步分析任务上限，超过时返回503
+    ASYNC_JOB_TTL: int = 60 * 60  # 已结束任务的状态在进程内保留的时间（秒）
+
+    # LLM分析结果长轮询配置（GET /diagnosis/{session_id}/wait 在进程内等待 analyze_with_llm 完成，等待期间不查询数据库）
+    LLM_WAIT_DEFAULT_TIMEOUT: float = 25.0  # 未指定 timeout 时的等待时间（秒），超时返回204
+    LLM_WAIT_MAX_TIMEOUT: float = 60.0  # 单次等待的最长时间（秒），应小于代理的读超时
+    LLM_WAIT_RESULT_TTL: int = 10 * 60  # 已完成的LLM分析结果在进程内保留的时间（秒），晚到的等待请求直接返回
+
+    # 历史记录分页配置
+    HISTORY_TOTAL_CACHE_TTL: int = 60  # 历史记录总数在进程内缓存的时间（秒），0 表示每次都查询
+
+    # 分块续传上传配置
+    CHUNKED_UPLOAD_DIR: str = os.path.join("uploads", "partial")  # 未完成上传的临时文件目录
+    CHUNKED_UPLOAD_MAX_SIZE: int = 50 * 1024 * 1024  # 单个文件大小上限（字节）
+    CHUNKED_UPLOAD_TTL: int = 24 * 60 * 60  # 未完成上传的保留时间（秒）
+
+    # 流式录音分析配置（WebSocket 边录边传 PCM）
+    STREAM_MAX_SECONDS: float = 60.0  # 单次流式录音的最长时长（秒）
+    STREAM_HINT_INTERVAL: float = 0.5  # 推送实时质量提示的音频间隔（秒）
+
+    # 启动预热配置（全部必需项完成前 /readyz 返回 503，滚动发布时不会把流量转发到未预热的进程）
+    WARM_UP_ENABLED: bool = True  # 启动时并发预热数据库连接池、模型、特征提取、分析工作进程和LLM客户端
+    WARM_UP_TIMEOUT: float = 180.0  # 单项预热的超时时间（秒）
+    WARM_UP_RETRY_INTERVAL: float = 10.0  # 必需项预热失败后的重试间隔（秒）
+    NUMBA_CACHE_DIR: str = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "cache", "numba")  # librosa JIT函数的编译缓存目录，跨进程、跨重启复用，留空则使用numba默认位置
+
+    # 分析结果缓存配置（键为解码后PCM哈希 + 特征版本 + 模型版本）
+    ANALYSIS_CACHE_ENABLED: bool = True
+    ANALYSIS_CACHE_SIZE: int = 1024  # 每个进程内存层最多缓存的条目数
+    ANALYSIS_CACHE_PATH: str = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "cache", "analysis_cache.sqlite3")  # 磁盘层SQLite文件，留空则不启用
+    ANALYSIS_CACHE_DISK_MAX_ENTRIES: int = 100000  # 磁盘层最多保留的条目数
+
+    # 模型注册表配置
+    MODEL_PATH: Optional[str] = None  # SVM模型文件路径，默认 ml_models/trained/voice_models/svm_model.pkl
+    MODEL_MMAP_MODE: Optional[str] = None  # joblib.load 的内存映射模式（如 "r"），用于较大的模型文件
+    MODEL_MAX_VERSIONS: int = 2  # 每个进程内最多保留的模型版本数（含当前版本）
+    MODEL_INFERENCE: str = "sklearn"  # SVM推理方式：sklearn，或 numpy（使用模型文件旁导出的 .npz 推理文件，无需导入 scikit-learn）
+    MODEL_CASCADE: bool = False  # 级联推理：先用低成本特征（ZCR/MFCC/RMS）上的线性模型判断，置信间隔不足时才提取色度特征并由SVM判断
+    CASCADE_MARGIN_THRESHOLD: float = 0.8  # 第一级两个最高类别概率之差不低于该值时直接采用第一级结果（0-1，越大回退SVM越多）
+
+    # 管理员邮箱（可调用模型热切换等管理接口），逗号分隔
+    ADMIN_EMAILS: str = ""
+
+    @validator("FEATURE_ENGINE")
+    def validate_feature_engine(cls, v: str) -> str:
+        if v not in ("librosa", "numpy"):
+            raise ValueError(f"FEATURE_ENGINE 只能是 librosa 或 numpy，当前为: {v}")
+        return v
+
+    @validator("FEATURE_BLOB_DTYPE")
+    def validate_feature_blob_dtype(cls, v: str) -> str:
+        if v not in ("float32", "float16"):
+            raise ValueError(f"FEATURE_BLOB_DTYPE 只能是 float32 或 float16，当前为: {v}")
+        return v
+
+    @validator("MODEL_INFERENCE")
+    def validate_model_inference(cls, v: str) -> str:
+        if v not in ("sklearn", "numpy"):
+            raise ValueError(f"MODEL_INFERENCE 只能是 sklearn 或 numpy，当前为: {v}")
+        return v
+
+    @validator("CASCADE_MARGIN_THRESHOLD")
+    def validate_cascade_margin_threshold(cls, v: float) -> float:
+        if not 0.0 <= v <= 1.0:
+            raise ValueError(f"CASCADE_MARGIN_THRESHOLD 必须在 0 到 1 之间，当前为: {v}")
+        return v
+
+    @validator("ANALYSIS_CLASS_WEIGHTS", "ANALYSIS_CLASS_DEADLINES")
+    def validate_analysis_classes(cls, v: Dict[str, float], field) -> Dict[str, float]:
+        unknown = set(v) - {"interactive", "upload", "background"}
+        if unknown:
+            raise ValueError(f"{field.name} 只能包含 interactive、upload、background，当前包含: {sorted(unknown)}")
+        if field.name == "ANALYSIS_CLASS_WEIGHTS" and any(weight < 1 for weight in v.values()):
+            raise ValueError(f"ANALYSIS_CLASS_WEIGHTS 的权重必须为正整数，当前为: {v}")
+        if field.name == "ANALYSIS_CLASS_DEADLINES" and any(deadline < 0 for deadline in v.values()):
+            raise ValueError(f"ANALYSIS_CLASS_DEADLINES 不能为负数，当前为: {v}")
+        return v
+
     @validator("SQLALCHEMY_DATABASE_URI", pre=True)
     def assemble_db_connection(cls, v: Optional[str], values: Dict[str, Any]) -> Any:
         if isinstance(v, str):
@@ -56,6 +56,38 @@ class LLMClient:
         else:
             logger.info("[LLMClient.__init__] API密钥已设置，将使用实际API")
             self.use_mock = False
+
+        # 共享的HTTP客户端（复用连接池，避免每次请求重新建立TCP/TLS连接）
+        self._http: Optional[httpx.AsyncClient] = None
+
+    def _http_client(self) -> httpx.AsyncClient:
+        """获取共享的HTTP客户端（首次使用或关闭后重新创建）"""
+        if self._http is None or self._http.is_closed:
+            self._http = httpx.AsyncClient(timeout=self.timeout)
+        return self._http
+
+    async def warm_up(self) -> Dict[str, Any]:
+        """
+        预先建立到API的连接（应用启动时调用），模拟模式下跳过
+
+        Returns:
+            预热结果（模式及探测请求的状态码）
+        """
+        if self.use_mock:
+            return {"mode": "mock"}
+        response = await self._http_client().get(
+            f"{self.api_base}/models",
+            headers={"Authorization": f"Bearer {self.api_key}"},
+            timeout=10
+        )
+        logger.info(f"[LLMClient.warm_up] LLM连接预热完成: status_code={response.status_code}")
+        return {"mode": "api", "status_code": response.status_code}
+
+    async def aclose(self) -> None:
+        """关闭共享的HTTP客户端（应用关闭时调用）"""
+        if self._http is not None:
+            await self._http.aclose()
+            self._http = None
     
     async def analyze(self, prompt: str) -> str:
         """
@@ -100,31 +132,31 @@ class LLMClient:
         response_text = ""
         for attempt in range(self.max_retries):
             try:
-                async with httpx.AsyncClient(timeout=self.timeout) as client:
-                    headers = {
-                        "Content-Type": "application/json",
-                        "Authorization": f"Bearer {self.api_key}"
-                    }
-                    response = await client.post(
-                        f"{self.api_base}/chat/completions",
-                        headers=headers,
-                        json=data
-                    )
-                    if response.status_code != 200:
-                        logger.error(f"[LLMClient.analyze] API请求失败: status_code={response.status_code}, response={response.text}")
-                        if attempt < self.max_retries - 1:
-                            retry_delay = 2 ** attempt
-                            logger.info(f"[LLMClient.analyze] 将在{retry_delay}秒后重试, 尝试次数: {attempt+1}/{self.max_retries}")
-                            await asyncio.sleep(retry_delay)
-                            continue
-                        else:
-                            raise Exception(f"API请求失败，状态码: {response.status_code}，响应: {response.text}")
-                    resp_json = response.json()
-                    response_text = resp_json["choices"][0]["message"]["content"]
-                    duration_ms = int((time.time() - start_time) * 1000)
-                    tokens_used = resp_json.get("usage", {}).get("total_tokens", 0)
-                    logger.info(f"[LLMClient.analyze] API请求成功: length={len(response_text)}, tokens={tokens_used}, duration_ms={duration_ms}")
-                    break
+                client = self._http_client()
+                headers = {
+                    "Content-Type": "application/json",
+                    "Authorization": f"Bearer {self.api_key}"
+                }
+                response = await client.post(
+                    f"{self.api_base}/chat/completions",
+                    headers=headers,
+                    json=data
+                )
+                if response.status_code != 200:
+                    logger.error(f"[LLMClient.analyze] API请求失败: status_code={response.status_code}, response={response.text}")
+                    if attempt < self.max_retries - 1:
+                        retry_delay = 2 ** attempt
+                        logger.info(f"[LLMClient.analyze] 将在{retry_delay}秒后重试, 尝试次数: {attempt+1}/{self.max_retries}")
+                        await asyncio.sleep(retry_delay)
+                        continue
+                    else:
+                        raise Exception(f"API请求失败，状态码: {response.status_code}，响应: {response.text}")
+                resp_json = response.json()
+                response_text = resp_json["choices"][0]["message"]["content"]
+                duration_ms = int((time.time() - start_time) * 1000)
+                tokens_used = resp_json.get("usage", {}).get("total_tokens", 0)
+                logger.info(f"[LLMClient.analyze] API请求成功: length={len(response_text)}, tokens={tokens_used}, duration_ms={duration_ms}")
+                break
             except httpx.ReadTimeout:
                 logger.error(f"[LLMClient.analyze] LLM请求超时", exc_info=True)
                 if attempt < self.max_retries - 1:
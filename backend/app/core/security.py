@@ -73,4 +73,32 @@ async def get_current_user(
         logger.error("未找到用户")
         raise credentials_exception
     logger.error(f"认证通过: user_id={user.id}, email={user.email}")
-    return user
\ No newline at end of file
+    return user
+
+async def get_current_admin_user(
+    current_user: User = Depends(get_current_user)
+) -> User:
+    """校验当前用户是否为管理员（邮箱在 ADMIN_EMAILS 配置中）"""
+    admin_emails = {e.strip().lower() for e in settings.ADMIN_EMAILS.split(",") if e.strip()}
+    if current_user.email.lower() not in admin_emails:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="需要管理员权限"
+        )
+    return current_user
+
+def get_user_from_token(db: Session, token: Optional[str]) -> Optional[User]:
+    """
+    解析访问令牌并查找用户，令牌无效时返回 None
+    用于无法设置 Authorization 头的 WebSocket 连接（令牌通过查询参数传递）
+    """
+    if not token:
+        return None
+    try:
+        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+    except jwt.JWTError:
+        return None
+    email = payload.get("sub")
+    if email is None:
+        return None
+    return db.query(User).filter(User.email == email).first()
@@ -1,4 +1,7 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, Float, Boolean
+from typing import List, Optional
+
+import numpy as np
+from sqlalchemy import Column, Integer, String, Date, DateTime, ForeignKey, Text, Float, Boolean, LargeBinary, Index, UniqueConstraint
 from sqlalchemy.orm import relationship
 from datetime import datetime, timezone
 from app.db.base import Base
@@ -18,41 +21,17 @@ class User(Base):
 
 class VoiceMetrics(Base):
     __tablename__ = "voice_metrics"
+    # 历史记录按用户过滤、按 (created_at, id) 倒序分页
+    __table_args__ = (
+        Index("ix_voice_metrics_user_id_created_at", "user_id", "created_at"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
-    session_id = Column(Integer, ForeignKey("diagnosis_sessions.id"), nullable=False)
+    session_id = Column(Integer, ForeignKey("diagnosis_sessions.id"), nullable=False, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     
-    # MFCC特征
-    # 13维梅尔频率倒谱系数
-    mfcc_1 = Column(Float)
-    mfcc_2 = Column(Float)
-    mfcc_3 = Column(Float)
-    mfcc_4 = Column(Float)
-    mfcc_5 = Column(Float)
-    mfcc_6 = Column(Float)
-    mfcc_7 = Column(Float)
-    mfcc_8 = Column(Float)
-    mfcc_9 = Column(Float)
-    mfcc_10 = Column(Float)
-    mfcc_11 = Column(Float)
-    mfcc_12 = Column(Float)
-    mfcc_13 = Column(Float)
-    
-    # 色度特征
-    # 12维色谱特征
-    chroma_1 = Column(Float)
-    chroma_2 = Column(Float)
-    chroma_3 = Column(Float)
-    chroma_4 = Column(Float)
-    chroma_5 = Column(Float)
-    chroma_6 = Column(Float)
-    chroma_7 = Column(Float)
-    chroma_8 = Column(Float)
-    chroma_9 = Column(Float)
-    chroma_10 = Column(Float)
-    chroma_11 = Column(Float)
-    chroma_12 = Column(Float)
+    # 完整特征向量（ZCR、色度、MFCC、RMS、梅尔谱共162维），格式见 app/utils/feature_blob.py
+    feature_vector = Column(LargeBinary)
     
     # 时域特征
     rms = Column(Float)  # 均方根能量（音量）
@@ -72,8 +51,36 @@ class VoiceMetrics(Base):
     session = relationship("DiagnosisSession", back_populates="voice_metrics")
     user = relationship("User", back_populates="voice_metrics")
 
+    @property
+    def features(self) -> Optional[np.ndarray]:
+        """解码后的特征向量（只读视图，不复制）"""
+        # feature_blob 依赖 app.core.config，而 app.core 会导入本模块，因此在使用时导入
+        from app.utils.feature_blob import decode_features
+        return decode_features(self.feature_vector)
+
+    @property
+    def mfcc(self) -> List[Optional[float]]:
+        """MFCC 前13维"""
+        from app.utils.feature_blob import MFCC_SLICE, feature_values
+        return feature_values(self.features, MFCC_SLICE)
+
+    @property
+    def chroma(self) -> List[Optional[float]]:
+        """12维色度特征"""
+        from app.utils.feature_blob import CHROMA_SLICE, feature_values
+        return feature_values(self.features, CHROMA_SLICE)
+
+
+# 诊断会话状态：异步分析任务失败（会话已提交但没有语音指标）；其余会话为空，有语音指标即为已完成
+SESSION_STATUS_FAILED = "failed"
+
+
 class DiagnosisSession(Base):
     __tablename__ = "diagnosis_sessions"
+    # 历史记录按用户过滤、按 (created_at, id) 倒序分页
+    __table_args__ = (
+        Index("ix_diagnosis_sessions_user_id_created_at", "user_id", "created_at"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
@@ -86,7 +93,37 @@ class DiagnosisSession(Base):
     
     # LLM诊断建议
     diagnosis_suggestion = Column(Text, nullable=True)  # LLM生成的诊断建议
+    status = Column(String(20), nullable=True)  # 分析失败时为 SESSION_STATUS_FAILED
     
     # 关系
     user = relationship("User", back_populates="diagnosis_sessions")
-    voice_metrics = relationship("VoiceMetrics", back_populates="session")
\ No newline at end of file
+    voice_metrics = relationship("VoiceMetrics", back_populates="session")
+
+
+class UserDailyStats(Base):
+    """按用户、按天（UTC）汇总的统计，随会话和语音指标的写入在同一事务中增量更新"""
+    __tablename__ = "user_daily_stats"
+    __table_args__ = (
+        UniqueConstraint("user_id", "day", name="uq_user_daily_stats_user_id_day"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    day = Column(Date, nullable=False)
+
+    session_count = Column(Integer, nullable=False, default=0)  # 当天创建的诊断会话数
+    analysis_count = Column(Integer, nullable=False, default=0)  # 当天保存的语音指标数
+    prediction_counts = Column(Text)  # 预测结果分布，存储为JSON字符串 {标签: 次数}
+
+    # 置信度、RMS、ZCR 的计数、和、平方和（计数只统计非空值），用于计算均值和标准差
+    confidence_count = Column(Integer, nullable=False, default=0)
+    confidence_sum = Column(Float, nullable=False, default=0.0)
+    confidence_sumsq = Column(Float, nullable=False, default=0.0)
+    rms_count = Column(Integer, nullable=False, default=0)
+    rms_sum = Column(Float, nullable=False, default=0.0)
+    rms_sumsq = Column(Float, nullable=False, default=0.0)
+    zcr_count = Column(Integer, nullable=False, default=0)
+    zcr_sum = Column(Float, nullable=False, default=0.0)
+    zcr_sumsq = Column(Float, nullable=False, default=0.0)
+
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -1,14 +1,83 @@
-from sqlalchemy.orm import Session
-from sqlalchemy.sql import func
+from sqlalchemy.orm import Session, joinedload
 from datetime import datetime, timedelta
-from typing import List, Dict, Any, Optional
-from app.db.models import VoiceMetrics, DiagnosisSession
+from contextlib import contextmanager
+from typing import List, Dict, Any, Iterator, Optional, Tuple
+from app.db.models import SESSION_STATUS_FAILED, VoiceMetrics, DiagnosisSession
+from app.repositories.stats_repository import StatsRepository, utc_today
+from app.utils.pagination import history_total_cache, keyset_page
 import os
 import logging
 
 class DiagnosisRepository:
     def __init__(self, db: Session):
         self.db = db
+        # 写入单元的嵌套深度，以及提交后需要清除历史总数缓存的用户
+        self._uow_depth = 0
+        self._touched_users = set()
+
+    @contextmanager
+    def unit_of_work(self) -> Iterator["DiagnosisRepository"]:
+        """
+        写入单元：块内的 add_session、add_voice_metrics 只 flush（获取自增ID），正常退出时一次提交，异常时整体回滚
+        - 会话、语音指标和当天汇总要么全部写入，要么全部不写入，失败时不会留下没有语音指标的会话
+        - 提交时不使对象过期，提交后读取刚写入的字段不再逐个对象 SELECT（代替 refresh）
+        - 可以嵌套，只在最外层提交或回滚
+        """
+        logger = logging.getLogger(__name__)
+        self._uow_depth += 1
+        try:
+            yield self
+            if self._uow_depth == 1:
+                expire_on_commit = self.db.expire_on_commit
+                self.db.expire_on_commit = False
+                try:
+                    self.db.commit()
+                finally:
+                    self.db.expire_on_commit = expire_on_commit
+        except Exception as e:
+            if self._uow_depth == 1:
+                self.db.rollback()
+                self._touched_users.clear()
+                logger.error(f"[unit_of_work] 写入失败，已回滚: {str(e)}")
+            raise
+        finally:
+            self._uow_depth -= 1
+        if self._uow_depth == 0:
+            for user_id in self._touched_users:
+                history_total_cache.invalidate(user_id)
+            self._touched_users.clear()
+
+    def add_session(self, user_id: int) -> DiagnosisSession:
+        """在当前写入单元中新建诊断会话并计入当天汇总（flush，不提交）"""
+        session = DiagnosisSession(
+            user_id=user_id,
+            created_at=datetime.utcnow()
+        )
+        self.db.add(session)
+        self.db.flush()
+        StatsRepository(self.db).record_session(user_id, session.created_at)
+        self._touched_users.add(user_id)
+        return session
+
+    def add_voice_metrics(self, session_id: int, user_id: int, items: List[tuple]) -> List[VoiceMetrics]:
+        """
+        在当前写入单元中保存语音指标并计入当天汇总（flush，不提交）
+
+        Args:
+            items: [(features, prediction), ...]
+
+        Returns:
+            新建的语音指标（与 items 顺序一致，已有自增ID）
+        """
+        metrics_list = [
+            self._build_voice_metrics(session_id, user_id, features, prediction)
+            for features, prediction in items
+        ]
+        self.db.add_all(metrics_list)
+        self.db.flush()
+        StatsRepository(self.db).record_metrics(metrics_list)
+        self._touched_users.add(user_id)
+        return metrics_list
     
     def create_voice_metrics(self, user_id: int, voice_file_path: str) -> VoiceMetrics:
         """创建语音指标记录"""
@@ -63,74 +132,55 @@ class DiagnosisRepository:
         self.db.refresh(session)
         return session
     
-    def get_voice_history(self, user_id: int, offset: int, limit: int) -> tuple[List[VoiceMetrics], int]:
-        """获取语音历史记录"""
-        total = self.db.query(VoiceMetrics).filter(
+    def get_voice_history(
+        self,
+        user_id: int,
+        limit: int,
+        cursor: Optional[str] = None,
+        offset: int = 0
+    ) -> Tuple[List[VoiceMetrics], Optional[str]]:
+        """
+        获取一页语音历史记录（按 (created_at, id) 倒序，所属会话通过 JOIN 随记录一起加载）
+
+        Returns:
+            (本页记录, 下一页游标)
+
+        Raises:
+            ValueError: 游标格式错误
+        """
+        query = self.db.query(VoiceMetrics).options(
+            joinedload(VoiceMetrics.session)
+        ).filter(
             VoiceMetrics.user_id == user_id
-        ).count()
-        
-        records = self.db.query(VoiceMetrics).filter(
+        )
+        return keyset_page(query, VoiceMetrics.created_at, VoiceMetrics.id, limit, cursor=cursor, offset=offset)
+
+    def count_voice_history(self, user_id: int) -> int:
+        """语音历史记录总数（进程内缓存，近似值）"""
+        return history_total_cache.get("voice_metrics", user_id, lambda: self.db.query(VoiceMetrics).filter(
             VoiceMetrics.user_id == user_id
-        ).order_by(
-            VoiceMetrics.created_at.desc()
-        ).offset(offset).limit(limit).all()
-        
-        return records, total
+        ).count())
     
     def get_voice_stats(self, user_id: int) -> Dict[str, Any]:
-        """获取语音统计数据"""
-        thirty_days_ago = datetime.now() - timedelta(days=30)
-        
-        # 总分析次数
-        total_analyses = self.db.query(VoiceMetrics).filter(
-            VoiceMetrics.user_id == user_id
-        ).count()
-        
-        # 最近30天分析次数
-        recent_analyses = self.db.query(VoiceMetrics).filter(
-            VoiceMetrics.user_id == user_id,
-            VoiceMetrics.created_at >= thirty_days_ago
-        ).count()
-        
-        # 预测结果分布
-        predictions = self.db.query(
-            VoiceMetrics.model_prediction,
-            func.count(VoiceMetrics.id)
-        ).filter(
-            VoiceMetrics.user_id == user_id,
-            VoiceMetrics.model_prediction.isnot(None)
-        ).group_by(
-            VoiceMetrics.model_prediction
-        ).all()
-        
-        prediction_distribution = {
-            str(pred): int(count) for pred, count in predictions if pred is not None
-        }
-        
-        # 平均置信度
-        avg_confidence = self.db.query(
-            func.avg(VoiceMetrics.model_confidence)
-        ).filter(
-            VoiceMetrics.user_id == user_id,
-            VoiceMetrics.model_confidence.isnot(None)
-        ).scalar() or 0.0
+        """获取语音统计数据（读取按天汇总）"""
+        stats = StatsRepository(self.db)
+        rows = stats.get_days(user_id)
+        overall = stats.summarize(rows)
+        # 最近30天（含今天）
+        recent_start = utc_today() - timedelta(days=29)
+        recent = stats.summarize(row for row in rows if row.day >= recent_start)
         
         return {
-            "total_analyses": total_analyses,
-            "recent_analyses": recent_analyses,
-            "prediction_distribution": prediction_distribution,
-            "average_confidence": avg_confidence
+            "total_analyses": overall["analysis_count"],
+            "recent_analyses": recent["analysis_count"],
+            "prediction_distribution": overall["prediction_distribution"],
+            "average_confidence": overall["confidence"]["mean"] or 0.0
         }
     #主数据流用到
-    def create_session(self, user_id: int):
-        session = DiagnosisSession(
-            user_id=user_id,
-            created_at=datetime.utcnow()
-        )
-        self.db.add(session)
-        self.db.commit()
-        self.db.refresh(session)
-        return session
+    def create_session(self, user_id: int) -> DiagnosisSession:
+        """新建诊断会话并提交"""
+        with self.unit_of_work():
+            return self.add_session(user_id)
     
     def save_voice_file(self, file, session_id: int) -> str:
         """保存上传的语音文件到本地并返回文件路径"""
@@ -142,54 +192,82 @@ class DiagnosisRepository:
             f.write(file.file.read())
         return file_path
 
+    def save_voice_bytes(self, content: bytes, session_id: int, file_ext: str, index: Optional[int] = None) -> str:
+        """将已读入内存的上传内容归档到本地（可在响应返回后由后台任务执行），批量上传时按序号区分"""
+        logger = logging.getLogger(__name__)
+        upload_dir = "uploads"
+        os.makedirs(upload_dir, exist_ok=True)
+        suffix = f"_{index}" if index is not None else ""
+        file_path = os.path.join(upload_dir, f"voice_{session_id}{suffix}{file_ext}")
+        try:
+            with open(file_path, "wb") as f:
+                f.write(content)
+            logger.info(f"[save_voice_bytes] 原始音频归档完成: {file_path}")
+        except Exception as e:
+            logger.error(f"[save_voice_bytes] 原始音频归档失败: {str(e)}", exc_info=True)
+        return file_path
+
+    def archive_voice_file(self, file_path: str, session_id: int, file_ext: str) -> str:
+        """将已落盘的上传文件（如分块上传的结果）移动为会话的归档文件，不再重新写一遍"""
+        logger = logging.getLogger(__name__)
+        upload_dir = "uploads"
+        os.makedirs(upload_dir, exist_ok=True)
+        archive_path = os.path.join(upload_dir, f"voice_{session_id}{file_ext}")
+        try:
+            os.replace(file_path, archive_path)
+            logger.info(f"[archive_voice_file] 原始音频归档完成: {archive_path}")
+        except Exception as e:
+            logger.error(f"[archive_voice_file] 原始音频归档失败: {str(e)}", exc_info=True)
+        return archive_path
+
+    def _build_voice_metrics(self, session_id: int, user_id: int, features: dict, prediction: dict) -> VoiceMetrics:
+        """根据特征字典和预测结果构建语音指标记录（不提交）"""
+        return VoiceMetrics(
+            session_id=session_id,
+            user_id=user_id,
+            feature_vector=features.get("feature_vector"),
+            rms=features.get("rms"),
+            zcr=features.get("zcr"),
+            mel_spectrogram=features.get("mel_spectrogram"),
+            model_prediction=prediction.get("prediction"),
+            model_confidence=prediction.get("confidence"),
+            created_at=datetime.utcnow()
+        )
+
     def save_voice_metrics(self, session_id: int, user_id: int, features: dict, prediction: dict):
+        """保存一条语音指标（在外层写入单元中时随其一起提交）"""
         logger = logging.getLogger(__name__)
         try:
             logger.info(f"[save_voice_metrics] session_id={session_id}, user_id={user_id},  prediction={prediction}")
-            metrics = VoiceMetrics(
-                session_id=session_id,
-                user_id=user_id,
-                mfcc_1=features.get("mfcc", [None]*13)[0],
-                mfcc_2=features.get("mfcc", [None]*13)[1],
-                mfcc_3=features.get("mfcc", [None]*13)[2],
-                mfcc_4=features.get("mfcc", [None]*13)[3],
-                mfcc_5=features.get("mfcc", [None]*13)[4],
-                mfcc_6=features.get("mfcc", [None]*13)[5],
-                mfcc_7=features.get("mfcc", [None]*13)[6],
-                mfcc_8=features.get("mfcc", [None]*13)[7],
-                mfcc_9=features.get("mfcc", [None]*13)[8],
-                mfcc_10=features.get("mfcc", [None]*13)[9],
-                mfcc_11=features.get("mfcc", [None]*13)[10],
-                mfcc_12=features.get("mfcc", [None]*13)[11],
-                mfcc_13=features.get("mfcc", [None]*13)[12],
-                chroma_1=features.get("chroma", [None]*12)[0],
-                chroma_2=features.get("chroma", [None]*12)[1],
-                chroma_3=features.get("chroma", [None]*12)[2],
-                chroma_4=features.get("chroma", [None]*12)[3],
-                chroma_5=features.get("chroma", [None]*12)[4],
-                chroma_6=features.get("chroma", [None]*12)[5],
-                chroma_7=features.get("chroma", [None]*12)[6],
-                chroma_8=features.get("chroma", [None]*12)[7],
-                chroma_9=features.get("chroma", [None]*12)[8],
-                chroma_10=features.get("chroma", [None]*12)[9],
-                chroma_11=features.get("chroma", [None]*12)[10],
-                chroma_12=features.get("chroma", [None]*12)[11],
-                rms=features.get("rms"),
-                zcr=features.get("zcr"),
-                mel_spectrogram=features.get("mel_spectrogram"),
-                model_prediction=prediction.get("prediction"),
-                model_confidence=prediction.get("confidence"),
-                created_at=datetime.utcnow()
-            )
-            self.db.add(metrics)
-            self.db.commit()
-            self.db.refresh(metrics)
+            with self.unit_of_work():
+                metrics = self.add_voice_metrics(session_id, user_id, [(features, prediction)])[0]
             logger.info(f"[save_voice_metrics] 保存成功 metrics_id={metrics.id}")
             return metrics
         except Exception as e:
             logger.error(f"[save_voice_metrics] 保存失败: {str(e)}", exc_info=True)
             raise 
 
+    def save_voice_metrics_batch(self, session_id: int, user_id: int, items: List[tuple]) -> List[int]:
+        """
+        在同一个事务中保存多段音频的语音指标（在外层写入单元中时随其一起提交）
+
+        Args:
+            items: [(features, prediction), ...]
+
+        Returns:
+            新建记录的ID列表（与 items 顺序一致）
+        """
+        logger = logging.getLogger(__name__)
+        try:
+            logger.info(f"[save_voice_metrics_batch] session_id={session_id}, user_id={user_id}, count={len(items)}")
+            with self.unit_of_work():
+                metrics_ids = [m.id for m in self.add_voice_metrics(session_id, user_id, items)]
+            logger.info(f"[save_voice_metrics_batch] 保存成功 metrics_ids={metrics_ids}")
+            return metrics_ids
+        except Exception as e:
+            logger.error(f"[save_voice_metrics_batch] 保存失败: {str(e)}", exc_info=True)
+            raise
+
     def mark_session_completed(self, session_id: int) -> DiagnosisSession:
         """标记诊断会话为已完成"""
         logger = logging.getLogger(__name__)
@@ -212,7 +290,10 @@ class DiagnosisRepository:
             raise
     
     def mark_session_failed(self, session_id: int) -> DiagnosisSession:
-        """标记诊断会话为失败（已移除 error_message 字段，仅更新时间）"""
+        """
+        标记诊断会话为分析失败（异步任务的会话先于分析结果提交）并从当天汇总的会话数中减去，
+        任务状态过期或查询落到其他进程时据此返回失败
+        """
         logger = logging.getLogger(__name__)
         try:
             session = self.db.query(DiagnosisSession).filter(
@@ -221,9 +302,12 @@ class DiagnosisRepository:
             if not session:
                 logger.warning(f"[mark_session_failed] 会话不存在: {session_id}")
                 return None
-            session.completed_at = datetime.utcnow()
-            self.db.commit()
-            self.db.refresh(session)
+            if session.status == SESSION_STATUS_FAILED:
+                return session
+            with self.unit_of_work():
+                session.status = SESSION_STATUS_FAILED
+                StatsRepository(self.db).remove_session(session.user_id, session.created_at)
+                self._touched_users.add(session.user_id)
             logger.info(f"[mark_session_failed] 会话已标记为失败: {session_id}")
             return session
         except Exception as e:
@@ -4,6 +4,8 @@ from sqlalchemy import desc
 from typing import List, Dict, Any, Optional, Tuple
 from datetime import datetime, timedelta
 from app.db.models import DiagnosisSession, VoiceMetrics
+from app.repositories.stats_repository import StatsRepository, utc_today
+from app.utils.pagination import history_total_cache, keyset_page
 import json
 
 # 配置日志
@@ -128,99 +130,107 @@ class LLMRepository:
         }
     #主数据流用到
 
-    def get_analysis_history(self, user_id: int, skip: int, limit: int) -> List[Dict[str, Any]]:
-        """获取分析历史"""
-        sessions = self.db.query(DiagnosisSession).filter(
-            DiagnosisSession.user_id == user_id
+    def _session_prediction(self):
+        """会话第一条语音指标的预测结果（关联子查询，随会话在同一条查询中取回）"""
+        return self.db.query(VoiceMetrics.model_prediction).filter(
+            VoiceMetrics.session_id == DiagnosisSession.id
         ).order_by(
-            DiagnosisSession.created_at.desc()
-        ).offset(skip).limit(limit).all()
+            VoiceMetrics.id
+        ).limit(1).scalar_subquery()
+
+    def get_analysis_history_page(
+        self,
+        user_id: int,
+        limit: int,
+        cursor: Optional[str] = None,
+        skip: int = 0
+    ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """
+        获取一页分析历史（按 (created_at, id) 倒序，会话与预测结果一次查询取回）
+
+        Returns:
+            (本页记录, 下一页游标)
+
+        Raises:
+            ValueError: 游标格式错误
+        """
+        query = self.db.query(
+            DiagnosisSession,
+            self._session_prediction().label("health_status")
+        ).filter(
+            DiagnosisSession.user_id == user_id
+        )
+        rows, next_cursor = keyset_page(
+            query, DiagnosisSession.created_at, DiagnosisSession.id, limit,
+            cursor=cursor, offset=skip, key=lambda row: (row[0].created_at, row[0].id)
+        )
         
         history = []
-        for session in sessions:
-            voice_metrics = self.get_voice_metrics(session.id)
+        for session, health_status in rows:
             history.append({
                 "session_id": session.id,
                 "created_at": session.created_at,
-                "health_status": voice_metrics.model_prediction if voice_metrics else None,
+                "health_status": health_status,
                 "diagnosis_suggestion": session.diagnosis_suggestion,
                 "llm_processed_at": session.created_at
             })
-        return history
+        return history, next_cursor
+
+    def get_analysis_history(self, user_id: int, skip: int, limit: int) -> List[Dict[str, Any]]:
+        """获取分析历史"""
+        return self.get_analysis_history_page(user_id, limit, skip=skip)[0]
+
+    def count_sessions(self, user_id: int) -> int:
+        """诊断会话总数（进程内缓存，近似值）"""
+        return history_total_cache.get("diagnosis_sessions", user_id, lambda: self.db.query(DiagnosisSession).filter(
+            DiagnosisSession.user_id == user_id
+        ).count())
     
     def get_display_summary(self, user_id: int) -> Dict[str, Any]:
-        """获取显示摘要数据"""
-        # 总诊断会话数
-        total_sessions = self.db.query(DiagnosisSession).filter(
-            DiagnosisSession.user_id == user_id
-        ).count()
-        
-        # 今日会话数
-        today = datetime.now().date()
-        today_sessions = self.db.query(DiagnosisSession).filter(
-            DiagnosisSession.user_id == user_id,
-            DiagnosisSession.created_at >= today
-        ).count()
-        
-        # 健康状况分布
-        health_statuses = self.db.query(
-            VoiceMetrics.model_prediction, 
-            self.db.func.count(VoiceMetrics.id)
-        ).join(
-            DiagnosisSession, 
-            VoiceMetrics.session_id == DiagnosisSession.id
-        ).filter(
-            DiagnosisSession.user_id == user_id
-        ).group_by(
-            VoiceMetrics.model_prediction
-        ).all()
-        
-        health_distribution = {status: count for status, count in health_statuses}
-        
-        # 过去一周的会话趋势
-        one_week_ago = datetime.now() - timedelta(days=7)
+        """获取显示摘要数据（读取按天汇总，不再逐天统计会话）"""
+        stats = StatsRepository(self.db)
+        rows = stats.get_days(user_id)
+        summary = stats.summarize(rows)
+        by_day = {row.day: row for row in rows}
+        today = utc_today()
+        
+        # 过去一周（含今天）的会话趋势
         session_trend = []
-        
-        for i in range(7):
-            date = one_week_ago + timedelta(days=i)
-            next_date = date + timedelta(days=1)
-            
-            count = self.db.query(DiagnosisSession).filter(
-                DiagnosisSession.user_id == user_id,
-                DiagnosisSession.created_at >= date,
-                DiagnosisSession.created_at < next_date
-            ).count()
-            
+        for i in range(6, -1, -1):
+            day = today - timedelta(days=i)
             session_trend.append({
-                "date": date.strftime("%Y-%m-%d"),
-                "count": count
+                "date": day.strftime("%Y-%m-%d"),
+                "count": by_day[day].session_count if day in by_day else 0
             })
         
         return {
-            "total_sessions": total_sessions,
-            "today_sessions": today_sessions,
-            "health_distribution": health_distribution,
+            "total_sessions": summary["session_count"],
+            "today_sessions": by_day[today].session_count if today in by_day else 0,
+            "health_distribution": summary["prediction_distribution"],
             "session_trend": session_trend
         }
     
     def get_realtime_data(self, user_id: int) -> Dict[str, Any]:
         """获取实时监控数据"""
-        # 最近的诊断会话
-        recent_sessions = self.db.query(DiagnosisSession).filter(
+        # 最近的诊断会话（会话与预测结果一次查询取回）
+        recent_sessions = self.db.query(
+            DiagnosisSession,
+            self._session_prediction().label("health_status")
+        ).filter(
             DiagnosisSession.user_id == user_id
         ).order_by(
-            DiagnosisSession.created_at.desc()
+            DiagnosisSession.created_at.desc(),
+            DiagnosisSession.id.desc()
         ).limit(5).all()
         
         recent_session_data = []
-        for session in recent_sessions:
-            voice_metrics = self.get_voice_metrics(session.id)
-            
+        for session, health_status in recent_sessions:
+            # 会话没有状态列，已有语音指标即视为已完成
             session_data = {
                 "id": session.id,
                 "timestamp": session.created_at.isoformat(),
-                "status": session.status,
-                "health_status": voice_metrics.model_prediction if voice_metrics else "未分析"
+                "status": "completed" if health_status is not None else "pending",
+                "health_status": health_status if health_status is not None else "未分析"
             }
             
             recent_session_data.append(session_data)
@@ -0,0 +1,231 @@
+"""
+按用户、按天的统计汇总（user_daily_stats）
+仪表盘的总数、近N天趋势、预测分布和均值只读取 O(天数) 行汇总，不再扫描全部会话和语音指标：
+- 创建诊断会话、保存语音指标时，在同一事务中增量更新当天的汇总行（行锁防止并发丢失更新）
+- 置信度、RMS、ZCR 保存计数、和、平方和，可合并任意天数后计算均值和标准差
+- 天按 created_at 的 UTC 日期划分
+- 分析失败的会话不计入会话数（标记失败时减去）
+- rebuild 从原始记录重新计算，用于首次上线回填或修复（scripts/rebuild_daily_stats.py）
+"""
+
+import json
+import logging
+import math
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import func, or_
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.db.models import SESSION_STATUS_FAILED, DiagnosisSession, UserDailyStats, VoiceMetrics
+
+logger = logging.getLogger(__name__)
+
+# 汇总了计数、和、平方和的指标: 名称 -> 语音指标列
+SUMMED_METRICS = {
+    "confidence": VoiceMetrics.model_confidence,
+    "rms": VoiceMetrics.rms,
+    "zcr": VoiceMetrics.zcr
+}
+
+
+def stats_day(created_at: Optional[datetime]) -> date:
+    """记录所属的统计日（UTC）"""
+    return (created_at or datetime.utcnow()).date()
+
+
+def utc_today() -> date:
+    return datetime.utcnow().date()
+
+
+def _as_date(value: Any) -> date:
+    """func.date 在 MySQL 返回 date，在 SQLite 返回字符串"""
+    return value if isinstance(value, date) else date.fromisoformat(str(value))
+
+
+def _empty_row(user_id: int, day: date) -> UserDailyStats:
+    row = UserDailyStats(user_id=user_id, day=day, session_count=0, analysis_count=0, prediction_counts="{}")
+    for name in SUMMED_METRICS:
+        setattr(row, f"{name}_count", 0)
+        setattr(row, f"{name}_sum", 0.0)
+        setattr(row, f"{name}_sumsq", 0.0)
+    return row
+
+
+def prediction_counts(row: UserDailyStats) -> Dict[str, int]:
+    """汇总行的预测结果分布"""
+    return json.loads(row.prediction_counts or "{}")
+
+
+class StatsRepository:
+    def __init__(self, db: Session):
+        self.db = db
+
+    def _locked_day(self, user_id: int, day: date) -> UserDailyStats:
+        """获取（不存在时创建）用户当天的汇总行，并在当前事务中加行锁"""
+        query = self.db.query(UserDailyStats).filter(
+            UserDailyStats.user_id == user_id,
+            UserDailyStats.day == day
+        ).with_for_update()
+        row = query.first()
+        if row is not None:
+            return row
+        row = _empty_row(user_id, day)
+        try:
+            with self.db.begin_nested():
+                self.db.add(row)
+            return row
+        except IntegrityError:
+            # 并发事务已创建该行，改为锁定已有的行
+            return query.one()
+
+    def record_session(self, user_id: int, created_at: Optional[datetime]) -> None:
+        """新建诊断会话计入当天汇总（由调用方提交事务）"""
+        row = self._locked_day(user_id, stats_day(created_at))
+        row.session_count += 1
+
+    def remove_session(self, user_id: int, created_at: Optional[datetime]) -> None:
+        """会话标记为分析失败时从当天汇总中减去（由调用方提交事务）"""
+        row = self._locked_day(user_id, stats_day(created_at))
+        row.session_count = max(row.session_count - 1, 0)
+
+    def record_metrics(self, metrics_list: Iterable[VoiceMetrics]) -> None:
+        """
+        新保存的语音指标计入当天汇总（由调用方提交事务）
+        须在 flush 之后调用，使 created_at 默认值已经生成
+        """
+        grouped: Dict[Tuple[int, date], List[VoiceMetrics]] = defaultdict(list)
+        for metrics in metrics_list:
+            grouped[(metrics.user_id, stats_day(metrics.created_at))].append(metrics)
+        for (user_id, day), items in grouped.items():
+            row = self._locked_day(user_id, day)
+            row.analysis_count += len(items)
+            predictions = prediction_counts(row)
+            for metrics in items:
+                if metrics.model_prediction is not None:
+                    label = str(metrics.model_prediction)
+                    predictions[label] = predictions.get(label, 0) + 1
+                for name, column in SUMMED_METRICS.items():
+                    value = getattr(metrics, column.key)
+                    if value is None or not math.isfinite(value):
+                        continue
+                    setattr(row, f"{name}_count", getattr(row, f"{name}_count") + 1)
+                    setattr(row, f"{name}_sum", getattr(row, f"{name}_sum") + float(value))
+                    setattr(row, f"{name}_sumsq", getattr(row, f"{name}_sumsq") + float(value) ** 2)
+            row.prediction_counts = json.dumps(predictions, ensure_ascii=False)
+
+    def get_days(self, user_id: int, start: Optional[date] = None, end: Optional[date] = None) -> List[UserDailyStats]:
+        """用户在 [start, end] 范围内有记录的汇总行（按日期升序）"""
+        query = self.db.query(UserDailyStats).filter(UserDailyStats.user_id == user_id)
+        if start is not None:
+            query = query.filter(UserDailyStats.day >= start)
+        if end is not None:
+            query = query.filter(UserDailyStats.day <= end)
+        return query.order_by(UserDailyStats.day).all()
+
+    def get_recent_days(self, user_id: int, days: int) -> List[UserDailyStats]:
+        """最近 days 天（含今天）的汇总行"""
+        return self.get_days(user_id, start=utc_today() - timedelta(days=days - 1))
+
+    @staticmethod
+    def summarize(rows: Iterable[UserDailyStats]) -> Dict[str, Any]:
+        """
+        合并多天的汇总
+
+        Returns:
+            session_count、analysis_count、prediction_distribution，
+            以及 confidence、rms、zcr 各自的 {"count", "mean", "std"}（没有数据时 mean、std 为 None）
+        """
+        totals = {"session_count": 0, "analysis_count": 0}
+        distribution: Dict[str, int] = {}
+        sums = {name: [0, 0.0, 0.0] for name in SUMMED_METRICS}
+        for row in rows:
+            totals["session_count"] += row.session_count
+            totals["analysis_count"] += row.analysis_count
+            for label, count in prediction_counts(row).items():
+                distribution[label] = distribution.get(label, 0) + count
+            for name, acc in sums.items():
+                acc[0] += getattr(row, f"{name}_count")
+                acc[1] += getattr(row, f"{name}_sum")
+                acc[2] += getattr(row, f"{name}_sumsq")
+        result: Dict[str, Any] = {**totals, "prediction_distribution": distribution}
+        for name, (count, total, total_sq) in sums.items():
+            mean = total / count if count else None
+            std = math.sqrt(max(total_sq / count - mean ** 2, 0.0)) if count else None
+            result[name] = {"count": count, "mean": mean, "std": std}
+        return result
+
+    def rebuild(self, user_id: Optional[int] = None) -> int:
+        """
+        从原始会话和语音指标重新计算汇总（user_id 为空时重建全部用户）并提交
+
+        Returns:
+            写入的汇总行数
+        """
+        rows: Dict[Tuple[int, date], UserDailyStats] = {}
+
+        def row_for(uid: int, day: Any) -> UserDailyStats:
+            key = (uid, _as_date(day))
+            if key not in rows:
+                rows[key] = _empty_row(*key)
+            return rows[key]
+
+        def scoped(query, column):
+            return query.filter(column == user_id) if user_id is not None else query
+
+        session_day = func.date(DiagnosisSession.created_at)
+        sessions = scoped(self.db.query(
+            DiagnosisSession.user_id, session_day, func.count(DiagnosisSession.id)
+        ).filter(
+            DiagnosisSession.created_at.isnot(None),
+            or_(DiagnosisSession.status.is_(None), DiagnosisSession.status != SESSION_STATUS_FAILED)
+        ), DiagnosisSession.user_id).group_by(
+            DiagnosisSession.user_id, session_day
+        )
+        for uid, day, count in sessions:
+            row_for(uid, day).session_count = int(count)
+
+        metrics_day = func.date(VoiceMetrics.created_at)
+        aggregates = [func.count(VoiceMetrics.id)]
+        for column in SUMMED_METRICS.values():
+            aggregates += [func.count(column), func.sum(column), func.sum(column * column)]
+        metrics = scoped(self.db.query(
+            VoiceMetrics.user_id, metrics_day, *aggregates
+        ).filter(VoiceMetrics.created_at.isnot(None)), VoiceMetrics.user_id).group_by(
+            VoiceMetrics.user_id, metrics_day
+        )
+        for uid, day, count, *values in metrics:
+            row = row_for(uid, day)
+            row.analysis_count = int(count)
+            for i, name in enumerate(SUMMED_METRICS):
+                n, total, total_sq = values[3 * i:3 * i + 3]
+                setattr(row, f"{name}_count", int(n or 0))
+                setattr(row, f"{name}_sum", float(total or 0.0))
+                setattr(row, f"{name}_sumsq", float(total_sq or 0.0))
+
+        predictions = scoped(self.db.query(
+            VoiceMetrics.user_id, metrics_day, VoiceMetrics.model_prediction, func.count(VoiceMetrics.id)
+        ).filter(
+            VoiceMetrics.created_at.isnot(None),
+            VoiceMetrics.model_prediction.isnot(None)
+        ), VoiceMetrics.user_id).group_by(
+            VoiceMetrics.user_id, metrics_day, VoiceMetrics.model_prediction
+        )
+        distributions: Dict[Tuple[int, date], Dict[str, int]] = defaultdict(dict)
+        for uid, day, label, count in predictions:
+            distributions[(uid, _as_date(day))][str(label)] = int(count)
+        for key, distribution in distributions.items():
+            row_for(*key).prediction_counts = json.dumps(distribution, ensure_ascii=False)
+
+        try:
+            scoped(self.db.query(UserDailyStats), UserDailyStats.user_id).delete(synchronize_session=False)
+            self.db.add_all(rows.values())
+            self.db.commit()
+        except Exception as e:
+            self.db.rollback()
+            logger.error(f"[StatsRepository.rebuild] 重建汇总失败: {str(e)}", exc_info=True)
+            raise
+        logger.info(f"[StatsRepository.rebuild] 重建汇总完成: user_id={user_id}, 行数={len(rows)}")
+        return len(rows)
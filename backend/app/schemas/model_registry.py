@@ -0,0 +1,7 @@
+from typing import Optional
+from pydantic import BaseModel, Field
+
+class ModelSwapRequest(BaseModel):
+    """模型热切换请求"""
+    model_file: str = Field(..., description="模型文件名（位于 ml_models/trained/voice_models 目录下）")
+    version: Optional[str] = Field(None, description="版本号，默认按文件内容计算")
@@ -14,14 +14,24 @@ class VoiceHistoryRecord(BaseModel):
 
 class VoiceHistoryResponse(BaseModel):
     """语音历史记录响应"""
-    total: int
+    total: Optional[int] = Field(None, description="记录总数（缓存的近似值），未请求时为空")
     page: int
     size: int
     records: List[VoiceHistoryRecord]
+    next_cursor: Optional[str] = Field(None, description="下一页游标，没有下一页时为空")
 
 class VoiceStatsResponse(BaseModel):
     """语音统计数据响应"""
     total_analyses: int = Field(default=0)
     recent_analyses: int = Field(default=0)
     prediction_distribution: Dict[str, int] = Field(default_factory=dict)
-    average_confidence: float = Field(default=0.0) 
\ No newline at end of file
+    average_confidence: float = Field(default=0.0)
+
+class ChunkedUploadCreate(BaseModel):
+    """创建分块上传请求"""
+    filename: str
+    total_size: Optional[int] = Field(None, ge=1, description="文件总字节数，提供时完成上传前会校验")
+
+class ChunkedUploadFinalize(BaseModel):
+    """完成分块上传请求"""
+    sha256: Optional[str] = Field(None, description="客户端计算的文件SHA-256，提供时完成上传前会校验")
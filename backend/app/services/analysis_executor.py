@@ -0,0 +1,406 @@
+"""
+分析执行器
+在独立的进程池中运行解码、特征提取和预测等CPU密集型任务，避免阻塞事件循环。
+- 任务按类别（麦克风质量检测等交互式检测、上传分析、后台任务）分别排队，只在有空闲工作进程时才交给进程池，
+  按 ANALYSIS_CLASS_WEIGHTS 的权重轮流取任务，上传占满机器时麦克风检测等交互式请求仍能很快执行
+- 每类任务的等待队列有上限，已满时直接拒绝，并提示客户端稍后重试
+- 每个任务有截止时间（ANALYSIS_CLASS_DEADLINES）：提交时预计等待已超过截止时间、或排到时已超过截止时间的任务直接丢弃，
+  不再占用工作进程做客户端已不再等待的计算
+"""
+
+import asyncio
+import functools
+import logging
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from collections import deque
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Deque, Dict, Optional, Set, Tuple
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class AnalysisQueueFullError(Exception):
+    """分析队列已满"""
+
+    def __init__(self, retry_after: int):
+        super().__init__(f"分析任务过多，请{retry_after}秒后重试")
+        self.retry_after = retry_after
+
+
+class AnalysisDeadlineError(AnalysisQueueFullError):
+    """预计或实际排队等待超过该类任务的截止时间，任务未执行即被丢弃（与队列已满同样提示客户端稍后重试）"""
+
+    def __init__(self, retry_after: int, work_class: str):
+        Exception.__init__(self, f"分析任务繁忙，{work_class} 类任务无法在截止时间内开始，请{retry_after}秒后重试")
+        self.retry_after = retry_after
+        self.work_class = work_class
+
+
+# 分析任务类别：交互式检测（麦克风质量检测）、上传分析（含批量、分块和流式录音）、后台任务（异步上传）
+WORK_INTERACTIVE = "interactive"
+WORK_UPLOAD = "upload"
+WORK_BACKGROUND = "background"
+WORK_CLASSES = (WORK_INTERACTIVE, WORK_UPLOAD, WORK_BACKGROUND)
+
+# 任务执行耗时滑动平均的平滑系数
+SERVICE_TIME_ALPHA = 0.2
+
+
+# 确认工作进程就绪时的最多轮数（每轮向每个工作进程各发一次探测任务）
+WARM_UP_ROUNDS = 10
+# 探测任务的停留时间（秒），使同一轮的探测尽量分散到不同的空闲工作进程
+WARM_UP_PROBE_SECONDS = 0.05
+
+
+def _init_worker(blas_threads: int, warm_up: bool = False) -> None:
+    """
+    工作进程初始化：限制BLAS/OpenMP线程数，避免多个进程同时占满所有核心；
+    需要时在接收任务前预热分析流水线（进程池重建时新进程同样先预热）
+    """
+    try:
+        from threadpoolctl import threadpool_limits
+        threadpool_limits(limits=blas_threads)
+    except ImportError:
+        logger.warning("[_init_worker] 未安装threadpoolctl，无法限制BLAS线程数")
+    if warm_up:
+        try:
+            from app.services.analysis_pipeline import warm_up_analysis
+            warm_up_analysis()
+        except Exception as e:
+            # 预热失败不能让初始化抛出异常（否则整个进程池不可用），首个任务按需加载
+            logger.warning(f"[_init_worker] 工作进程预热失败: {str(e)}")
+
+
+def _probe_worker() -> int:
+    """就绪探测任务：返回工作进程号"""
+    time.sleep(WARM_UP_PROBE_SECONDS)
+    return os.getpid()
+
+
+class _QueuedTask:
+    """排队等待工作进程的分析任务"""
+
+    __slots__ = ("fn", "args", "future", "enqueued_at", "deadline")
+
+    def __init__(self, fn: Callable[..., Any], args: Tuple[Any, ...], future: asyncio.Future, deadline: float):
+        self.fn = fn
+        self.args = args
+        self.future = future
+        self.enqueued_at = time.perf_counter()
+        self.deadline = deadline
+
+
+class _WorkClass:
+    """一类分析任务的等待队列和运行指标"""
+
+    def __init__(self, name: str, weight: int, deadline: float):
+        self.name = name
+        self.weight = max(1, int(weight))
+        self.deadline = max(0.0, float(deadline))
+        self.queue: Deque[_QueuedTask] = deque()
+        # 平滑加权轮询的当前权重
+        self.current_weight = 0
+        self.running = 0
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.shed = 0
+        self.started = 0
+        self.total_wait = 0.0
+        self.total_seconds = 0.0
+
+    def stats(self) -> Dict[str, Any]:
+        finished = self.completed + self.failed
+        return {
+            "weight": self.weight,
+            "deadline": self.deadline,
+            "queued": len(self.queue),
+            "running": self.running,
+            "submitted": self.submitted,
+            "completed": self.completed,
+            "failed": self.failed,
+            "rejected": self.rejected,
+            "shed": self.shed,
+            "avg_wait_ms": self.total_wait / self.started * 1000 if self.started else 0.0,
+            "avg_seconds": self.total_seconds / finished if finished else 0.0
+        }
+
+
+class AnalysisExecutor:
+    """CPU密集型分析任务的进程池执行器（按任务类别分别排队、加权调度、超过截止时间的任务直接丢弃）"""
+
+    def __init__(
+        self,
+        max_workers: Optional[int] = None,
+        queue_size: Optional[int] = None,
+        blas_threads: Optional[int] = None,
+        retry_after: Optional[int] = None,
+        warm_up: Optional[bool] = None,
+        weights: Optional[Dict[str, int]] = None,
+        deadlines: Optional[Dict[str, float]] = None
+    ):
+        """
+        初始化执行器（进程池在首次提交时才创建）
+
+        Args:
+            max_workers: 工作进程数，默认按CPU核数
+            queue_size: 工作进程全部繁忙时每类任务允许排队的任务数
+            blas_threads: 每个工作进程的BLAS线程数
+            retry_after: 队列已满时建议的重试间隔（秒）
+            warm_up: 工作进程启动后是否先预热分析流水线
+            weights: 各类任务的调度权重
+            deadlines: 各类任务从提交到开始执行的最长等待（秒），0 表示不限
+        """
+        self.max_workers = max_workers or settings.ANALYSIS_WORKERS or os.cpu_count() or 1
+        self.queue_size = settings.ANALYSIS_QUEUE_SIZE if queue_size is None else queue_size
+        self.blas_threads = blas_threads or settings.ANALYSIS_BLAS_THREADS
+        self.retry_after = retry_after or settings.ANALYSIS_RETRY_AFTER
+        self.warm_up_workers = settings.WARM_UP_ENABLED if warm_up is None else warm_up
+        weights = settings.ANALYSIS_CLASS_WEIGHTS if weights is None else weights
+        deadlines = settings.ANALYSIS_CLASS_DEADLINES if deadlines is None else deadlines
+        self.classes: Dict[str, _WorkClass] = {
+            name: _WorkClass(name, weights.get(name, 1), deadlines.get(name, 0.0)) for name in WORK_CLASSES
+        }
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        # 正在工作进程中执行的任务数（不超过 max_workers，进程池内部不再排队）
+        self._running = 0
+        self._max_queue_depth = 0
+        self._total_seconds = 0.0
+        # 单个任务执行耗时的滑动平均，用于估计排队等待时间
+        self._service_seconds: Optional[float] = None
+
+    @property
+    def queue_depth(self) -> int:
+        """当前排队等待工作进程的任务数（各类合计）"""
+        return sum(len(work_class.queue) for work_class in self.classes.values())
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                # 使用spawn启动，避免在已有线程和数据库连接的进程中fork
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_init_worker,
+                    initargs=(self.blas_threads, self.warm_up_workers)
+                )
+                logger.info(f"[AnalysisExecutor] 创建分析进程池: workers={self.max_workers}, queue_size={self.queue_size}, blas_threads={self.blas_threads}")
+            return self._pool
+
+    def _estimated_wait(self, work_class: _WorkClass) -> float:
+        """
+        新任务预计的排队等待（秒）：同类排在前面的任务按该类在有任务排队的类别中所占权重比例依次获得工作进程，
+        工作进程平均每 _service_seconds / max_workers 秒空出一个（还没有耗时样本时不估计）
+        """
+        if self._service_seconds is None:
+            return 0.0
+        total_weight = sum(c.weight for c in self.classes.values() if c.queue or c is work_class)
+        share = work_class.weight / total_weight
+        return (len(work_class.queue) + 1) / share * self._service_seconds / self.max_workers
+
+    async def submit(
+        self,
+        fn: Callable[..., Any],
+        *args: Any,
+        work_class: str = WORK_UPLOAD,
+        deadline: Optional[float] = None
+    ) -> Any:
+        """
+        按任务类别排队，工作进程空闲时按权重调度执行并等待结果
+
+        Args:
+            work_class: 任务类别（WORK_INTERACTIVE、WORK_UPLOAD、WORK_BACKGROUND）
+            deadline: 从提交到开始执行的最长等待（秒），默认使用该类别的配置，0 表示不限
+
+        Raises:
+            AnalysisQueueFullError: 工作进程全部繁忙且该类任务的等待队列已满
+            AnalysisDeadlineError: 预计或实际等待超过截止时间
+        """
+        queue_class = self.classes[work_class]
+        deadline = queue_class.deadline if deadline is None else deadline
+        name = getattr(getattr(fn, 'func', fn), '__name__', fn)
+        with self._lock:
+            busy = self._running >= self.max_workers
+            if busy and len(queue_class.queue) >= self.queue_size:
+                queue_class.rejected += 1
+                logger.warning(f"[AnalysisExecutor.submit] 分析队列已满，拒绝任务: class={work_class}, queued={len(queue_class.queue)}, queue_size={self.queue_size}")
+                raise AnalysisQueueFullError(self.retry_after)
+            estimated = self._estimated_wait(queue_class) if busy and deadline else 0.0
+            if estimated > deadline > 0:
+                queue_class.shed += 1
+                logger.warning(f"[AnalysisExecutor.submit] 预计等待超过截止时间，拒绝任务: class={work_class}, estimated={estimated:.2f}s, deadline={deadline}s")
+                raise AnalysisDeadlineError(self.retry_after, work_class)
+            task = _QueuedTask(fn, args, asyncio.get_running_loop().create_future(), deadline)
+            queue_class.queue.append(task)
+            queue_class.submitted += 1
+            self._max_queue_depth = max(self._max_queue_depth, self.queue_depth)
+            logger.info(f"[AnalysisExecutor.submit] 提交分析任务: {name}, class={work_class}, running={self._running}, queue_depth={self.queue_depth}")
+
+        self._dispatch()
+        try:
+            return await task.future
+        except asyncio.CancelledError:
+            # 调用方已放弃（如客户端断开），尚未开始执行的任务直接移出队列
+            with self._lock:
+                if task in queue_class.queue:
+                    queue_class.queue.remove(task)
+            raise
+
+    def _next_class(self) -> Optional[_WorkClass]:
+        """平滑加权轮询：在有任务排队的类别中按权重比例交替选取，高权重类别不会连续占满所有名额"""
+        candidates = [c for c in self.classes.values() if c.queue]
+        if not candidates:
+            return None
+        total_weight = sum(c.weight for c in candidates)
+        for c in candidates:
+            c.current_weight += c.weight
+        chosen = max(candidates, key=lambda c: c.current_weight)
+        chosen.current_weight -= total_weight
+        return chosen
+
+    def _dispatch(self) -> None:
+        """工作进程有空闲时按权重从各类队列取任务执行，已超过截止时间的任务直接丢弃"""
+        while True:
+            with self._lock:
+                if self._running >= self.max_workers:
+                    return
+                work_class = self._next_class()
+                if work_class is None:
+                    return
+                task = work_class.queue.popleft()
+                if task.future.done():
+                    continue
+                waited = time.perf_counter() - task.enqueued_at
+                expired = task.deadline > 0 and waited > task.deadline
+                if expired:
+                    work_class.shed += 1
+                else:
+                    self._running += 1
+                    work_class.running += 1
+                    work_class.started += 1
+                    work_class.total_wait += waited
+            if expired:
+                logger.warning(f"[AnalysisExecutor._dispatch] 任务等待超过截止时间，已丢弃: class={work_class.name}, waited={waited:.2f}s, deadline={task.deadline}s")
+                task.future.set_exception(AnalysisDeadlineError(self.retry_after, work_class.name))
+                continue
+            self._start(work_class, task)
+
+    def _start(self, work_class: _WorkClass, task: _QueuedTask) -> None:
+        """把任务交给进程池执行"""
+        start = time.perf_counter()
+        # 首个任务的耗时包含启动工作进程，不计入耗时估计
+        cold = self._pool is None
+        try:
+            future = asyncio.get_running_loop().run_in_executor(self._get_pool(), task.fn, *task.args)
+        except Exception as e:
+            # 进程池已损坏或已关闭时提交本身就会失败
+            future = asyncio.get_running_loop().create_future()
+            future.set_exception(e)
+        future.add_done_callback(functools.partial(self._on_done, work_class, task, start, cold))
+
+    def _on_done(self, work_class: _WorkClass, task: _QueuedTask, start: float, cold: bool, future: asyncio.Future) -> None:
+        """任务结束：记录耗时，交还结果，并调度下一个排队的任务"""
+        elapsed = time.perf_counter() - start
+        error = None if future.cancelled() else future.exception()
+        with self._lock:
+            self._running -= 1
+            work_class.running -= 1
+            work_class.total_seconds += elapsed
+            self._total_seconds += elapsed
+            if error is None and not future.cancelled():
+                work_class.completed += 1
+                if not cold:
+                    self._service_seconds = elapsed if self._service_seconds is None else (
+                        SERVICE_TIME_ALPHA * elapsed + (1 - SERVICE_TIME_ALPHA) * self._service_seconds
+                    )
+            else:
+                work_class.failed += 1
+            if isinstance(error, BrokenProcessPool):
+                # 工作进程异常退出，丢弃旧进程池，下次提交时重建
+                self._pool = None
+        if isinstance(error, BrokenProcessPool):
+            logger.error("[AnalysisExecutor._on_done] 分析进程池已损坏，将重建", exc_info=error)
+        if not task.future.done():
+            if future.cancelled():
+                task.future.cancel()
+            elif error is not None:
+                task.future.set_exception(error)
+            else:
+                task.future.set_result(future.result())
+        self._dispatch()
+
+    async def warm_up(self) -> Dict[str, Any]:
+        """
+        启动全部工作进程并等待其完成初始化（含预热），应用启动时调用
+        进程池按需创建工作进程，同时提交与进程数相同的探测任务即可全部启动；
+        探测任务在初始化完成后才会执行，所有工作进程都返回过探测结果即视为就绪
+
+        Returns:
+            {"workers", "ready"}，ready 为已确认就绪的工作进程数
+
+        Raises:
+            RuntimeError: 探测轮数用完仍有工作进程未确认就绪
+        """
+        loop = asyncio.get_running_loop()
+        ready: Set[int] = set()
+        try:
+            for _ in range(WARM_UP_ROUNDS):
+                pool = self._get_pool()
+                pids = await asyncio.gather(*[
+                    loop.run_in_executor(pool, _probe_worker) for _ in range(self.max_workers)
+                ])
+                ready.update(pids)
+                if len(ready) >= self.max_workers:
+                    break
+        except BrokenProcessPool:
+            logger.error("[AnalysisExecutor.warm_up] 分析进程池已损坏，将重建", exc_info=True)
+            with self._lock:
+                self._pool = None
+            raise
+        logger.info(f"[AnalysisExecutor.warm_up] 分析工作进程就绪: {len(ready)}/{self.max_workers}")
+        if len(ready) < self.max_workers:
+            raise RuntimeError(f"分析工作进程未全部就绪: {len(ready)}/{self.max_workers}")
+        return {"workers": self.max_workers, "ready": len(ready)}
+
+    def stats(self) -> Dict[str, Any]:
+        """执行器运行指标（合计及按任务类别）"""
+        with self._lock:
+            classes = {name: work_class.stats() for name, work_class in self.classes.items()}
+            finished = sum(c["completed"] + c["failed"] for c in classes.values())
+            return {
+                "workers": self.max_workers,
+                "queue_size": self.queue_size,
+                "in_flight": self._running + self.queue_depth,
+                "queue_depth": self.queue_depth,
+                "max_queue_depth": self._max_queue_depth,
+                "submitted": sum(c["submitted"] for c in classes.values()),
+                "completed": sum(c["completed"] for c in classes.values()),
+                "failed": sum(c["failed"] for c in classes.values()),
+                "rejected": sum(c["rejected"] for c in classes.values()),
+                "shed": sum(c["shed"] for c in classes.values()),
+                "avg_seconds": self._total_seconds / finished if finished else 0.0,
+                "classes": classes
+            }
+
+    def shutdown(self) -> None:
+        """关闭进程池，取消仍在排队的任务"""
+        with self._lock:
+            for work_class in self.classes.values():
+                while work_class.queue:
+                    work_class.queue.popleft().future.cancel()
+            if self._pool is not None:
+                self._pool.shutdown(wait=False, cancel_futures=True)
+                self._pool = None
+                logger.info("[AnalysisExecutor] 分析进程池已关闭")
+
+
+# 全局唯一AnalysisExecutor实例
+analysis_executor = AnalysisExecutor()
@@ -0,0 +1,195 @@
+"""
+异步分析任务
+/diagnosis/upload?async=true 时，上传内容落盘并创建诊断会话后立即返回 202 和任务句柄，
+解码、特征提取、预测、存库和LLM分析在后台任务队列中执行，HTTP连接不再等待整条流水线
+（代理和负载均衡不会因分析较慢而超时）：
+- 任务进度以事件形式记录（decoded、features、predicted、stored、llm_done，失败时为 failed），
+  每个事件同时通过 /diagnosis/ws/diagnosis/{user_id} 推送给该用户（type 为 job_progress）
+- 任务句柄即诊断会话ID，可通过 GET /diagnosis/jobs/{job_id} 查询
+- 任务状态保存在当前进程内，已结束的任务保留 ASYNC_JOB_TTL 秒
+"""
+
+import asyncio
+import json
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from app.core.config import settings
+from app.services.analysis_executor import AnalysisQueueFullError
+from app.websockets.manager import websocket_manager
+
+logger = logging.getLogger(__name__)
+
+# 任务状态
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_COMPLETED = "completed"
+JOB_FAILED = "failed"
+
+# 进度事件（按发生顺序）
+JOB_EVENTS = ("decoded", "features", "predicted", "stored", "llm_done")
+
+
+class AnalysisJob:
+    """单个异步分析任务的状态"""
+
+    def __init__(self, job_id: int, user_id: int, filename: str):
+        self.job_id = job_id
+        self.user_id = user_id
+        self.filename = filename
+        self.status = JOB_QUEUED
+        self.events: List[Dict[str, Any]] = []
+        self.result: Optional[Dict[str, Any]] = None
+        self.error: Optional[str] = None
+        self.created_at = time.time()
+        self.updated_at = self.created_at
+
+    @property
+    def finished(self) -> bool:
+        return self.status in (JOB_COMPLETED, JOB_FAILED)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "job_id": self.job_id,
+            "session_id": self.job_id,
+            "filename": self.filename,
+            "status": self.status,
+            "stage": self.events[-1]["event"] if self.events else None,
+            "events": list(self.events),
+            "result": self.result,
+            "error": self.error,
+            "created_at": self.created_at,
+            "updated_at": self.updated_at
+        }
+
+
+class AnalysisJobManager:
+    """异步分析任务队列（任务状态保存在当前进程内）"""
+
+    def __init__(self, workers: Optional[int] = None, queue_size: Optional[int] = None):
+        self.workers = max(1, workers or settings.ASYNC_JOB_WORKERS)
+        self.queue_size = max(1, queue_size or settings.ASYNC_JOB_QUEUE_SIZE)
+        self._jobs: Dict[int, AnalysisJob] = {}
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker_tasks: List[asyncio.Task] = []
+        self._completed = 0
+        self._failed = 0
+
+    def _cleanup_expired(self) -> None:
+        """清理超过保留时间的已结束任务"""
+        deadline = time.time() - settings.ASYNC_JOB_TTL
+        for job_id, job in list(self._jobs.items()):
+            if job.finished and job.updated_at < deadline:
+                del self._jobs[job_id]
+
+    def _ensure_workers(self) -> asyncio.Queue:
+        """首次提交任务时在当前事件循环中启动消费者"""
+        if self._queue is None:
+            self._queue = asyncio.Queue(maxsize=self.queue_size)
+            self._worker_tasks = [asyncio.ensure_future(self._worker()) for _ in range(self.workers)]
+        return self._queue
+
+    def check_capacity(self) -> None:
+        """
+        提交前检查队列是否已满（在创建会话和落盘之前调用）
+
+        Raises:
+            AnalysisQueueFullError: 排队中的任务已达上限
+        """
+        if self._queue is not None and self._queue.full():
+            raise AnalysisQueueFullError(settings.ANALYSIS_RETRY_AFTER)
+
+    def submit(self, job_id: int, user_id: int, filename: str, runner: Callable[[AnalysisJob], Awaitable[None]]) -> AnalysisJob:
+        """
+        创建任务并放入队列，由后台消费者调用 runner(job) 执行
+
+        Raises:
+            AnalysisQueueFullError: 排队中的任务已达上限
+        """
+        self._cleanup_expired()
+        queue = self._ensure_workers()
+        job = AnalysisJob(job_id, user_id, filename)
+        try:
+            queue.put_nowait((job, runner))
+        except asyncio.QueueFull:
+            raise AnalysisQueueFullError(settings.ANALYSIS_RETRY_AFTER)
+        self._jobs[job_id] = job
+        logger.info(f"[AnalysisJobManager.submit] 异步分析任务已排队: job_id={job_id}, user_id={user_id}, 排队数={queue.qsize()}")
+        return job
+
+    def get(self, job_id: int, user_id: int) -> Optional[AnalysisJob]:
+        """获取当前用户的任务（不存在、已过期或不属于该用户时返回 None）"""
+        job = self._jobs.get(job_id)
+        if job is None or job.user_id != user_id:
+            return None
+        return job
+
+    async def publish(self, job: AnalysisJob, event: str, **detail: Any) -> None:
+        """
+        记录进度事件并通过WebSocket推送给任务所属用户
+        stored 事件表示结果已入库（任务完成，detail 中的 result 作为任务结果），failed 事件表示任务失败
+        """
+        now = time.time()
+        result = detail.pop("result", None)
+        if event == "stored":
+            job.status, job.result = JOB_COMPLETED, result
+            self._completed += 1
+        elif event == JOB_FAILED:
+            job.status, job.error = JOB_FAILED, detail.get("error")
+            self._failed += 1
+        job.events.append({"event": event, "at": now, **detail})
+        job.updated_at = now
+        logger.info(f"[AnalysisJobManager.publish] job_id={job.job_id}, event={event}, status={job.status}")
+        message = {"type": "job_progress", "job_id": job.job_id, "session_id": job.job_id, "event": event, "status": job.status, **detail}
+        if result is not None:
+            message["result"] = result
+        try:
+            await websocket_manager.send_message(job.user_id, json.dumps(message, ensure_ascii=False, default=str))
+        except Exception as e:
+            logger.warning(f"[AnalysisJobManager.publish] 进度推送失败: job_id={job.job_id}, {str(e)}")
+
+    async def _worker(self) -> None:
+        """后台消费者：依次执行队列中的任务，runner 未处理的异常记为任务失败"""
+        while True:
+            job, runner = await self._queue.get()
+            job.status = JOB_RUNNING
+            job.updated_at = time.time()
+            try:
+                await runner(job)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"[AnalysisJobManager._worker] 异步分析任务异常: job_id={job.job_id}, {str(e)}", exc_info=True)
+                if not job.finished:
+                    await self.publish(job, JOB_FAILED, error=str(e) or type(e).__name__)
+            finally:
+                self._queue.task_done()
+
+    def stats(self) -> Dict[str, Any]:
+        statuses = [job.status for job in self._jobs.values()]
+        return {
+            "workers": self.workers,
+            "queue_size": self.queue_size,
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "running": statuses.count(JOB_RUNNING),
+            "completed": self._completed,
+            "failed": self._failed,
+            "tracked": len(statuses)
+        }
+
+    async def stop(self) -> None:
+        """停止后台消费者（应用关闭时调用，排队中的任务不再执行）"""
+        for task in self._worker_tasks:
+            task.cancel()
+        for task in self._worker_tasks:
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        self._worker_tasks = []
+        self._queue = None
+
+
+# 全局唯一AnalysisJobManager实例（每个进程各自一份）
+analysis_job_manager = AnalysisJobManager()
@@ -0,0 +1,424 @@
+"""
+语音分析流水线
+解码、特征提取、SVM预测和音频质量评估等CPU密集型步骤。
+本模块中的函数不依赖数据库和事件循环，可在分析进程池的工作进程中直接执行
+"""
+
+import logging
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.core.config import settings
+from app.services.model_service import STAGE_LINEAR, STAGE_SVM, voice_model_service
+from app.utils import quality_engine
+from app.utils.audio_context import AudioAnalysisContext
+from app.utils.analysis_cache import analysis_cache, pcm_hash
+from app.utils.audio_decoder import decode_audio_bytes
+from app.utils.feature_blob import encode_features
+from app.utils.model_registry import ModelRef, model_registry
+from app.utils.streaming_features import to_wav_bytes
+from app.utils.voice_models_utils import AnalysisModel, feature_version
+
+logger = logging.getLogger(__name__)
+
+# 预测失败时的兜底标签（不写入分析缓存）
+UNKNOWN_PREDICTION = "未知"
+
+
+def features_to_dict(features_arr: np.ndarray) -> dict:
+    """
+    将特征向量拆分为存库使用的字典格式（级联第一级未提取的色度特征为 None）
+    feature_vector 为完整特征向量的二进制编码，存入 VoiceMetrics.feature_vector
+    """
+    return {
+        "zcr": float(features_arr[0]),
+        "chroma": [None if np.isnan(x) else float(x) for x in features_arr[1:13]],
+        "mfcc": [float(x) for x in features_arr[13:26]],
+        "rms": float(features_arr[26]),
+        "mel_spectrogram": float(features_arr[27]) if len(features_arr) > 27 else None,
+        "feature_vector": encode_features(features_arr)
+    }
+
+
+def extract_voice_features(context: AudioAnalysisContext, model: Optional[AnalysisModel] = None) -> dict:
+    """使用工具箱中的模型工具提取语音特征"""
+    logger.info(f"[extract_voice_features] 开始从文件提取特征: {context.source}")
+    try:
+        # 从模型注册表获取已加载的模型实例
+        model = model or model_registry.get()
+        logger.info(f"[extract_voice_features] 模型获取成功，调用get_features")
+
+        # 调用模型的get_features方法提取特征（结果缓存在上下文中）
+        features_arr = model.get_features(context)
+        logger.info(f"[extract_voice_features] 特征提取成功，特征数组长度: {len(features_arr)}")
+
+        # 将特征数组拆分为字典格式，便于后续存库
+        features = features_to_dict(features_arr)
+
+        logger.info(f"[extract_voice_features] 特征转换完成: zcr={features['zcr']}, rms={features['rms']}")
+        return features
+    except Exception as e:
+        logger.error(f"[extract_voice_features] 特征提取失败: {str(e)}", exc_info=True)
+        # 返回空特征，避免后续处理崩溃
+        return {
+            "zcr": 0.0,
+            "chroma": [0.0] * 12,
+            "mfcc": [0.0] * 13,
+            "rms": 0.0,
+            "mel_spectrogram": None,
+            "feature_vector": None
+        }
+
+
+def predict_health_status(context: AudioAnalysisContext, model: Optional[AnalysisModel] = None) -> dict:
+    """使用语音模型进行健康状态预测"""
+    logger.info(f"[predict_health_status] 调用voice_models_utils.AnalysisModel.get_pred")
+    try:
+        # 从模型注册表获取已加载的模型实例
+        model = model or model_registry.get()
+        # 使用模型进行预测（特征已缓存在上下文中时不会重新提取）
+        prediction_label = model.get_pred(context)
+
+        # 不再使用固定置信度，而是基于音频质量评估
+        # 评估音频质量并生成置信度分数
+        audio_quality_score = evaluate_audio_quality(context)
+        logger.info(f"[predict_health_status] 音频质量评分: {audio_quality_score}")
+
+        # 将音频质量评分作为置信度返回
+        confidence = audio_quality_score
+
+        logger.info(f"[predict_health_status] 预测结果: {prediction_label}, 置信度(基于音频质量): {confidence}")
+
+        return {
+            "prediction": prediction_label,
+            "confidence": confidence
+        }
+    except Exception as e:
+        logger.error(f"[predict_health_status] 预测失败: {str(e)}", exc_info=True)
+        return {
+            "prediction": UNKNOWN_PREDICTION,
+            "confidence": 0.0
+        }
+
+
+def _log_quality(components: Dict[str, np.ndarray], index: int = 0) -> None:
+    """记录单段音频的质量子评分"""
+    c = {name: float(values[index]) for name, values in components.items()}
+    if c["silence_ratio"] > 0.7:
+        logger.warning(f"[evaluate_audio_quality] 检测到静音比例过高: {c['silence_ratio']:.2f}")
+    elif c["active_frames"] < 0.1:
+        logger.warning(f"[evaluate_audio_quality] 几乎没有检测到声音活动: {c['active_frames']:.2f}")
+    if c["resp_ratio"] < 0.05:
+        logger.warning(f"[evaluate_audio_quality] 呼吸声特征比例过低: {c['resp_ratio']:.4f}")
+    logger.info(f"[evaluate_audio_quality] 音频质量分析: "
+              f"能量={c['energy']:.2f}, "
+              f"长度={c['duration']:.2f}, "
+              f"静音={c['silence']:.2f}, "
+              f"过零={c['zcr']:.2f}, "
+              f"频谱={c['spectral']:.2f}, "
+              f"VAD={c['vad']:.2f}, "
+              f"呼吸={c['respiration']:.2f}, "
+              f"总分={c['score']:.2f}")
+
+
+def evaluate_audio_quality(context: AudioAnalysisContext) -> float:
+    """
+    评估音频质量，生成质量评分 (0-1范围)
+
+    评分标准:
+    - 信噪比 (SNR)
+    - 音频能量和稳定性
+    - 语音频率特征
+    - 静音段比例
+    - 过零率规律性
+    - 语音活动检测 (VAD)
+    - 呼吸声特征验证
+
+    质量越差，分数越低，表示分析结果越不可信
+    各项子评分由向量化质量评分引擎计算（见 app/utils/quality_engine.py），幅度谱与特征提取共用上下文缓存
+    """
+    try:
+        components = quality_engine.quality_components([context])
+        _log_quality(components)
+        return float(components["score"][0])
+    except Exception as e:
+        logger.error(f"[evaluate_audio_quality] 音频质量评估失败: {str(e)}", exc_info=True)
+        # 默认返回中等偏低分数
+        return 0.4
+
+
+def evaluate_audio_quality_batch(contexts: List[AudioAnalysisContext]) -> List[float]:
+    """
+    一次调用批量评估多段音频的质量
+    整批计算失败时（如其中一段过短无法分帧）逐段评估，失败的段返回默认分数
+    """
+    if not contexts:
+        return []
+    try:
+        components = quality_engine.quality_components(contexts)
+    except Exception as e:
+        logger.warning(f"[evaluate_audio_quality_batch] 批量评估失败，改为逐段评估: {str(e)}")
+        return [evaluate_audio_quality(context) for context in contexts]
+    for i in range(len(contexts)):
+        _log_quality(components, i)
+    return [float(score) for score in components["score"]]
+
+
+def _cache_key(context: AudioAnalysisContext, model_ref: ModelRef, model: Optional[AnalysisModel] = None) -> str:
+    """
+    分析结果缓存键（PCM哈希在同一上下文内只计算一次）
+    传入启用了级联的模型时，键中加入第一级模型版本和阈值：第一级判定的条目没有色度特征，与完整特征的条目分开缓存
+    """
+    digest = context.cached("pcm_hash", lambda: pcm_hash(context.y, context.sr))
+    version = feature_version()
+    if model is not None and model.cascade is not None:
+        version = f"{version}-cascade-{model.cascade.digest}-{settings.CASCADE_MARGIN_THRESHOLD:g}"
+    return analysis_cache.make_key(digest, version, model_ref.version)
+
+
+def analyze_context(
+    context: AudioAnalysisContext,
+    model_ref: Optional[ModelRef] = None,
+    predict: bool = True
+) -> Dict[str, Any]:
+    """
+    对已解码的音频执行特征提取、预测和质量评估
+
+    Args:
+        context: 音频分析上下文
+        model_ref: 使用的模型版本（由主进程下发，保证热切换前后提交的任务各自使用对应版本）
+        predict: 是否在本进程内做SVM预测；为 False 时预测标签留空，
+            特征向量和缓存键随结果返回（"vector"、"cache_key"），由主进程的推理合批调度器统一预测并补写缓存中的标签
+
+    Returns:
+        {"features", "prediction", "duration", "cache", "stage"}，cache 为缓存命中层级（memory/disk），未命中为 None；
+        stage 为级联推理的判定层级（linear/svm），命中缓存或未启用级联时为 None；预测标签留空时另有 "vector" 和 "cache_key"
+    """
+    model_ref = model_ref or model_registry.active_ref()
+    model = model_registry.get(model_ref)
+    key = _cache_key(context, model_ref, model)
+    cached = analysis_cache.get(key)
+    if cached is not None:
+        prediction_label = cached["prediction"]
+        if prediction_label is None and predict:
+            # 由批量上传写入的条目只有特征和质量评分，补做一次预测（无需重新提取特征）
+            prediction_label = str(model_registry.get(model_ref).predict_batch(cached["features"])[0])
+            analysis_cache.put(key, cached["features"], prediction_label, cached["confidence"], cached["duration"])
+        logger.info(f"[analyze_context] 命中分析缓存({cached['tier']}): {context.source}")
+        result = {
+            "features": features_to_dict(cached["features"]),
+            "prediction": {"prediction": prediction_label, "confidence": float(cached["confidence"])},
+            "duration": cached["duration"],
+            "cache": cached["tier"],
+            "stage": None
+        }
+        if prediction_label is None:
+            result["vector"] = np.asarray(cached["features"], dtype=np.float64)
+            result["cache_key"] = key
+        return result
+
+    # 级联推理：第一级足够确定时不提取色度特征，也不需要SVM预测
+    decision = voice_model_service.cascade_first_stage(context, model)
+    if decision is not None:
+        vector = context.peek("light_features")
+        prediction = {"prediction": decision[0], "confidence": float(evaluate_audio_quality(context))}
+        analysis_cache.put(key, vector, prediction["prediction"], prediction["confidence"], context.duration)
+        return {
+            "features": features_to_dict(vector),
+            "prediction": prediction,
+            "duration": context.duration,
+            "cache": None,
+            "stage": STAGE_LINEAR
+        }
+
+    features = extract_voice_features(context, model)
+    vector = context.peek("features")
+    if predict:
+        prediction = predict_health_status(context, model)
+        # 预测标签可能是 numpy 字符串，转换为普通类型便于跨进程传输和存库
+        prediction["prediction"] = str(prediction["prediction"])
+    else:
+        # 特征提取失败时没有可预测的向量，与进程内预测失败一致地返回"未知"
+        prediction = {
+            "prediction": None if vector is not None else UNKNOWN_PREDICTION,
+            "confidence": evaluate_audio_quality(context) if vector is not None else 0.0
+        }
+    prediction["confidence"] = float(prediction["confidence"])
+    # 只缓存特征提取和预测都成功的结果，失败时的兜底值不写入缓存
+    if vector is not None and prediction["prediction"] != UNKNOWN_PREDICTION:
+        analysis_cache.put(key, vector, prediction["prediction"], prediction["confidence"], context.duration)
+    result = {
+        "features": features,
+        "prediction": prediction,
+        "duration": context.duration,
+        "cache": None,
+        "stage": STAGE_SVM if model.cascade is not None and vector is not None else None
+    }
+    if prediction["prediction"] is None:
+        result["vector"] = np.asarray(vector, dtype=np.float64)
+        result["cache_key"] = key
+    return result
+
+
+def analyze_audio_bytes(
+    content: bytes,
+    file_ext: Optional[str] = None,
+    source: Optional[str] = None,
+    model_ref: Optional[ModelRef] = None,
+    predict: bool = True
+) -> Dict[str, Any]:
+    """从上传字节解码并完成整条分析流水线（在工作进程中执行）"""
+    context = AudioAnalysisContext.from_bytes(content, file_ext, source=source)
+    return analyze_context(context, model_ref, predict)
+
+
+def analyze_audio_samples(
+    y: np.ndarray,
+    sr: int,
+    source: Optional[str] = None,
+    model_ref: Optional[ModelRef] = None,
+    predict: bool = True
+) -> Dict[str, Any]:
+    """对已解码的信号（如 ffmpeg 兜底解码结果）完成分析流水线（在工作进程中执行）"""
+    return analyze_context(AudioAnalysisContext(y, sr, source=source), model_ref, predict)
+
+
+def analyze_audio_path(
+    file_path: str,
+    file_ext: Optional[str] = None,
+    source: Optional[str] = None,
+    model_ref: Optional[ModelRef] = None,
+    predict: bool = True
+) -> Dict[str, Any]:
+    """在工作进程中读取已落盘的上传文件（如分块上传的结果），按文件头识别格式解码并完成分析"""
+    with open(file_path, "rb") as f:
+        content = f.read()
+    return analyze_audio_bytes(content, file_ext, source or file_path, model_ref, predict)
+
+
+def decode_audio_path(file_path: str, file_ext: Optional[str] = None) -> Tuple[np.ndarray, int]:
+    """
+    在工作进程中读取已落盘的上传文件并解码为流水线采样率的信号
+    （异步上传任务先单独解码以便上报解码完成，再用 analyze_audio_samples 完成分析）
+    """
+    with open(file_path, "rb") as f:
+        content = f.read()
+    return decode_audio_bytes(content, file_ext)
+
+
+def analyze_audio_file(file_path: str, model_ref: Optional[ModelRef] = None) -> Dict[str, Any]:
+    """从本地文件解码并完成整条分析流水线（在工作进程中执行）"""
+    context = AudioAnalysisContext.from_file(file_path)
+    return analyze_context(context, model_ref)
+
+
+def extract_stream_window(y: np.ndarray, sr: int, model_ref: Optional[ModelRef] = None) -> np.ndarray:
+    """
+    流式录音的特征提取窗口收齐后立即提取特征向量（在工作进程中执行）
+    特征只依赖固定窗口内的样本，与录音结束后对完整信号提取的结果相同
+    """
+    model = model_registry.get(model_ref)
+    return np.asarray(model.get_features(AudioAnalysisContext(y, sr, source="stream")), dtype=np.float64)
+
+
+def analyze_stream(
+    y: np.ndarray,
+    sr: int,
+    features: Optional[np.ndarray] = None,
+    model_ref: Optional[ModelRef] = None,
+    predict: bool = True
+) -> Dict[str, Any]:
+    """
+    流式录音结束后完成分析流水线（在工作进程中执行）
+    录音过程中已提取的特征向量预先放入上下文，这里只剩SVM预测和质量评估
+    """
+    context = AudioAnalysisContext(y, sr, source="stream")
+    if features is not None:
+        context.cached("features", lambda: features)
+    return analyze_context(context, model_ref, predict)
+
+
+def extract_clip(context: AudioAnalysisContext, model_ref: Optional[ModelRef] = None) -> Dict[str, Any]:
+    """
+    批量上传中单段音频的特征提取和质量评估（不做预测）
+    特征向量随结果返回，由 predict_clips 统一做一次批量预测
+    """
+    model_ref = model_ref or model_registry.active_ref()
+    key = _cache_key(context, model_ref)
+    cached = analysis_cache.get(key)
+    if cached is not None:
+        logger.info(f"[extract_clip] 命中分析缓存({cached['tier']}): {context.source}")
+        return {
+            "vector": cached["features"],
+            "features": features_to_dict(cached["features"]),
+            "confidence": float(cached["confidence"]),
+            "duration": cached["duration"],
+            "cache": cached["tier"]
+        }
+
+    model = model_registry.get(model_ref)
+    vector = model.get_features(context)
+    confidence = float(evaluate_audio_quality(context))
+    analysis_cache.put(key, vector, None, confidence, context.duration)
+    return {
+        "vector": np.asarray(vector, dtype=np.float64),
+        "features": features_to_dict(vector),
+        "confidence": confidence,
+        "duration": context.duration,
+        "cache": None
+    }
+
+
+def extract_clip_bytes(
+    content: bytes,
+    file_ext: Optional[str] = None,
+    source: Optional[str] = None,
+    model_ref: Optional[ModelRef] = None
+) -> Dict[str, Any]:
+    """从上传字节解码并提取单段音频特征（在工作进程中执行）"""
+    return extract_clip(AudioAnalysisContext.from_bytes(content, file_ext, source=source), model_ref)
+
+
+def extract_clip_samples(
+    y: np.ndarray,
+    sr: int,
+    source: Optional[str] = None,
+    model_ref: Optional[ModelRef] = None
+) -> Dict[str, Any]:
+    """对已解码的信号提取单段音频特征（在工作进程中执行）"""
+    return extract_clip(AudioAnalysisContext(y, sr, source=source), model_ref)
+
+
+def predict_clips(vectors: np.ndarray, model_ref: Optional[ModelRef] = None) -> List[str]:
+    """将多段音频的特征向量堆叠为矩阵，只调用一次SVM预测"""
+    model = model_registry.get(model_ref)
+    return [str(label) for label in model.predict_batch(vectors)]
+
+
+# 预热用合成录音的参数（44.1kHz 录音，覆盖解码重采样和特征提取窗口）
+WARM_UP_SAMPLE_RATE = 44100
+WARM_UP_SECONDS = 4.0
+
+
+def warm_up_analysis() -> Dict[str, Any]:
+    """
+    用一段合成录音走一遍解码、特征提取、SVM预测和质量评估（应用启动时和工作进程初始化时调用），
+    触发模型加载、numba JIT 编译（或从编译缓存加载）以及各库的首次调用开销。
+    不经过分析结果缓存，不会写入缓存条目
+
+    Returns:
+        {"model_version", "seconds"}
+    """
+    start = time.perf_counter()
+    rng = np.random.default_rng(0)
+    t = np.arange(int(WARM_UP_SECONDS * WARM_UP_SAMPLE_RATE)) / WARM_UP_SAMPLE_RATE
+    y = 0.2 * np.sin(2 * np.pi * 220 * t) * (1 + 0.5 * np.sin(2 * np.pi * 0.5 * t)) + 0.01 * rng.standard_normal(len(t))
+    context = AudioAnalysisContext.from_bytes(to_wav_bytes(y.astype(np.float32), WARM_UP_SAMPLE_RATE), ".wav", source="warm-up")
+    model_ref = model_registry.warm_up()
+    model_registry.get(model_ref).get_pred(context)
+    evaluate_audio_quality(context)
+    seconds = time.perf_counter() - start
+    logger.info(f"[warm_up_analysis] 分析流水线预热完成: model_version={model_ref.version}, 耗时={seconds:.3f}s")
+    return {"model_version": model_ref.version, "seconds": seconds}
@@ -0,0 +1,201 @@
+"""
+分块续传上传
+长录音或弱网环境下，客户端按偏移量分块上传音频：
+创建上传 -> 按偏移量追加分块（可断点续传）-> 完成上传并进入分析流水线。
+分块直接流式写入磁盘，同时滚动计算SHA-256，服务器不在内存中缓存整个文件
+"""
+
+import asyncio
+import hashlib
+import logging
+import os
+import time
+import uuid
+from typing import Any, AsyncIterator, Dict, Optional
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class ChunkedUploadError(Exception):
+    """分块上传错误"""
+    pass
+
+
+class UploadNotFoundError(ChunkedUploadError):
+    """上传不存在、已过期或不属于当前用户"""
+    pass
+
+
+class UploadOffsetMismatchError(ChunkedUploadError):
+    """分块偏移量与服务器已接收的字节数不一致"""
+
+    def __init__(self, expected: int):
+        super().__init__(f"偏移量不匹配，服务器已接收 {expected} 字节")
+        self.expected = expected
+
+
+class UploadTooLargeError(ChunkedUploadError):
+    """超过上传大小上限"""
+    pass
+
+
+class UploadChecksumError(ChunkedUploadError):
+    """完成上传时校验和不一致"""
+    pass
+
+
+class UploadBusyError(ChunkedUploadError):
+    """上传已完成、正在分析中，不能再追加或重复完成"""
+    pass
+
+
+class ChunkedUpload:
+    """单个分块上传的状态"""
+
+    def __init__(self, upload_id: str, user_id: int, filename: str, path: str, total_size: Optional[int]):
+        self.upload_id = upload_id
+        self.user_id = user_id
+        self.filename = filename
+        self.path = path
+        self.total_size = total_size
+        self.offset = 0
+        self.hasher = hashlib.sha256()
+        self.created_at = time.time()
+        self.updated_at = self.created_at
+        # 已通过校验、正在分析中（分析成功前上传和临时文件一直保留，失败时可重新完成）
+        self.finalizing = False
+        # 同一上传的分块串行写入
+        self.lock = asyncio.Lock()
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "upload_id": self.upload_id,
+            "filename": self.filename,
+            "offset": self.offset,
+            "total_size": self.total_size,
+            "max_size": settings.CHUNKED_UPLOAD_MAX_SIZE,
+            "sha256": self.hasher.hexdigest()
+        }
+
+
+class ChunkedUploadManager:
+    """分块上传管理器（上传状态保存在当前进程内）"""
+
+    def __init__(self, upload_dir: Optional[str] = None):
+        self.upload_dir = upload_dir or settings.CHUNKED_UPLOAD_DIR
+        self._uploads: Dict[str, ChunkedUpload] = {}
+
+    def _cleanup_expired(self) -> None:
+        """清理超时未完成的上传及其临时文件"""
+        deadline = time.time() - settings.CHUNKED_UPLOAD_TTL
+        for upload_id, upload in list(self._uploads.items()):
+            if upload.updated_at < deadline and not upload.lock.locked() and not upload.finalizing:
+                self.discard(upload_id)
+                logger.info(f"[ChunkedUploadManager] 清理过期上传: {upload_id}")
+
+    def create(self, user_id: int, filename: str, total_size: Optional[int] = None) -> ChunkedUpload:
+        """
+        创建分块上传
+
+        Raises:
+            UploadTooLargeError: 声明的文件大小超过上限
+        """
+        self._cleanup_expired()
+        if total_size is not None and total_size > settings.CHUNKED_UPLOAD_MAX_SIZE:
+            raise UploadTooLargeError(f"文件大小超过上限 {settings.CHUNKED_UPLOAD_MAX_SIZE} 字节")
+        os.makedirs(self.upload_dir, exist_ok=True)
+        upload_id = uuid.uuid4().hex
+        path = os.path.join(self.upload_dir, f"{upload_id}.part")
+        open(path, "wb").close()
+        upload = ChunkedUpload(upload_id, user_id, filename, path, total_size)
+        self._uploads[upload_id] = upload
+        logger.info(f"[ChunkedUploadManager.create] 创建分块上传: {upload_id}, user_id={user_id}, filename={filename}, total_size={total_size}")
+        return upload
+
+    def get(self, upload_id: str, user_id: int) -> ChunkedUpload:
+        """获取当前用户的上传"""
+        upload = self._uploads.get(upload_id)
+        if upload is None or upload.user_id != user_id:
+            raise UploadNotFoundError("上传不存在或已过期")
+        return upload
+
+    async def append(self, upload_id: str, user_id: int, offset: int, chunks: AsyncIterator[bytes]) -> ChunkedUpload:
+        """
+        在指定偏移量处追加分块，边接收边写盘并更新滚动哈希
+
+        客户端连接中断时，已写入的部分仍然有效，可通过查询上传状态获取偏移量后续传
+
+        Raises:
+            UploadOffsetMismatchError: 偏移量与已接收字节数不一致
+            UploadTooLargeError: 超过大小上限
+            UploadBusyError: 上传正在分析中
+        """
+        upload = self.get(upload_id, user_id)
+        async with upload.lock:
+            if upload.finalizing:
+                raise UploadBusyError("上传正在分析中，不能再追加分块")
+            if offset != upload.offset:
+                raise UploadOffsetMismatchError(upload.offset)
+            limit = min(settings.CHUNKED_UPLOAD_MAX_SIZE, upload.total_size or settings.CHUNKED_UPLOAD_MAX_SIZE)
+            with open(upload.path, "r+b") as f:
+                f.seek(upload.offset)
+                f.truncate()
+                async for chunk in chunks:
+                    if not chunk:
+                        continue
+                    if upload.offset + len(chunk) > limit:
+                        raise UploadTooLargeError(f"文件大小超过上限 {limit} 字节")
+                    f.write(chunk)
+                    upload.hasher.update(chunk)
+                    upload.offset += len(chunk)
+                    upload.updated_at = time.time()
+            logger.info(f"[ChunkedUploadManager.append] 分块写入完成: {upload_id}, offset={upload.offset}")
+            return upload
+
+    async def finalize(self, upload_id: str, user_id: int, sha256: Optional[str] = None) -> ChunkedUpload:
+        """
+        完成上传，校验大小和SHA-256后标记为分析中，上传仍保留在管理器中：
+        分析结果保存后由调用方 complete，暂时失败（队列已满等）时 reopen 以便客户端重试，永久失败时 discard
+
+        Raises:
+            UploadChecksumError: 大小或校验和不一致
+            UploadBusyError: 上传正在分析中
+        """
+        upload = self.get(upload_id, user_id)
+        async with upload.lock:
+            if upload.finalizing:
+                raise UploadBusyError("上传正在分析中")
+            if upload.total_size is not None and upload.offset != upload.total_size:
+                raise UploadChecksumError(f"上传未完成，已接收 {upload.offset}/{upload.total_size} 字节")
+            if sha256 and sha256.lower() != upload.hasher.hexdigest():
+                raise UploadChecksumError("文件校验和不一致")
+            upload.finalizing = True
+        logger.info(f"[ChunkedUploadManager.finalize] 分块上传完成: {upload_id}, size={upload.offset}")
+        return upload
+
+    def complete(self, upload_id: str) -> None:
+        """分析结果已保存、临时文件已交给归档任务，将上传从管理器中移除（不删除临时文件）"""
+        self._uploads.pop(upload_id, None)
+
+    def reopen(self, upload_id: str) -> None:
+        """分析暂时失败时保留上传和临时文件，客户端可稍后重新完成上传（过期时间从现在重新计算）"""
+        upload = self._uploads.get(upload_id)
+        if upload is not None:
+            upload.finalizing = False
+            upload.updated_at = time.time()
+            logger.info(f"[ChunkedUploadManager.reopen] 保留上传以便重试: {upload_id}")
+
+    def discard(self, upload_id: str) -> None:
+        """删除上传及其临时文件"""
+        upload = self._uploads.pop(upload_id, None)
+        if upload is not None and os.path.exists(upload.path):
+            try:
+                os.remove(upload.path)
+            except OSError as e:
+                logger.warning(f"[ChunkedUploadManager.discard] 删除临时文件失败: {upload.path}, {str(e)}")
+
+
+# 全局唯一ChunkedUploadManager实例
+chunked_upload_manager = ChunkedUploadManager()
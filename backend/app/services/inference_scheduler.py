@@ -0,0 +1,192 @@
+"""
+推理合批调度器
+并发上传的SVM预测不再各自做一次单行 predict：
+- 工作进程只做解码、特征提取和质量评估，特征向量交回主进程
+- 同一模型版本的预测请求合并后在线程池中做一次向量化预测，再按行拆分结果交还各调用方
+- 该版本没有正在进行的预测时，请求在本轮事件循环结束时立即发出（同一轮到达的请求合为一批），低负载下不增加延迟；
+  已有批次在预测时，新请求排队到该批完成、等待满 INFERENCE_BATCH_WINDOW_MS 或凑满 INFERENCE_BATCH_MAX_SIZE 行为止
+- 批大小、排队等待时间和预测耗时以直方图形式记录，通过 /analysis-status 查看
+"""
+
+import asyncio
+import bisect
+import logging
+import threading
+import time
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence
+
+import numpy as np
+
+from app.core.config import settings
+from app.utils.model_registry import ModelRef, model_registry
+
+logger = logging.getLogger(__name__)
+
+# 直方图分桶上界
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128)
+WAIT_MS_BUCKETS = (0.5, 1, 2, 5, 10, 20, 50, 100)
+PREDICT_MS_BUCKETS = (0.1, 0.25, 0.5, 1, 2, 5, 10, 25, 50)
+
+
+class Histogram:
+    """固定分桶的直方图（线程安全）"""
+
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets = tuple(buckets)
+        self._counts = [0] * (len(self.buckets) + 1)
+        self._count = 0
+        self._sum = 0.0
+        self._max = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        with self._lock:
+            self._counts[bisect.bisect_left(self.buckets, value)] += 1
+            self._count += 1
+            self._sum += value
+            self._max = max(self._max, value)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """各桶计数（键为桶上界，最后一桶为超出最大上界的部分）及汇总值"""
+        with self._lock:
+            labels = [f"<={bound:g}" for bound in self.buckets] + [f">{self.buckets[-1]:g}"]
+            return {
+                "buckets": dict(zip(labels, self._counts)),
+                "count": self._count,
+                "mean": self._sum / self._count if self._count else 0.0,
+                "max": self._max
+            }
+
+
+class _PendingRequest(NamedTuple):
+    """等待合批的预测请求"""
+    X: np.ndarray
+    future: asyncio.Future
+    enqueued_at: float
+
+
+class InferenceScheduler:
+    """主进程内的SVM推理合批调度器（在事件循环中使用）"""
+
+    def __init__(self, window_ms: Optional[float] = None, max_batch: Optional[int] = None):
+        """
+        Args:
+            window_ms: 已有批次在预测时，新请求等待合批的最长时间（毫秒）
+            max_batch: 单批最多样本行数，达到后立即预测
+        """
+        self.window_ms = settings.INFERENCE_BATCH_WINDOW_MS if window_ms is None else window_ms
+        self.max_batch = max(1, max_batch or settings.INFERENCE_BATCH_MAX_SIZE)
+        # 按模型版本分别排队，热切换前后提交的请求各自使用对应版本
+        self._pending: Dict[str, List[_PendingRequest]] = {}
+        self._refs: Dict[str, ModelRef] = {}
+        self._timers: Dict[str, asyncio.Handle] = {}
+        self._running: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._batches = 0
+        self._requests = 0
+        self._rows = 0
+        self._failed = 0
+        self.batch_sizes = Histogram(BATCH_SIZE_BUCKETS)
+        self.wait_ms = Histogram(WAIT_MS_BUCKETS)
+        self.predict_ms = Histogram(PREDICT_MS_BUCKETS)
+
+    async def predict(self, vectors: Any, model_ref: Optional[ModelRef] = None) -> List[str]:
+        """
+        提交一行或多行特征向量，等待所在批次完成预测
+
+        Args:
+            vectors: (n_features,) 或 (n_rows, n_features) 特征
+            model_ref: 使用的模型版本，默认为当前版本
+
+        Returns:
+            与输入行一一对应的预测标签
+        """
+        X = np.atleast_2d(np.asarray(vectors, dtype=np.float64))
+        ref = model_ref or model_registry.active_ref()
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        queue = self._pending.setdefault(ref.version, [])
+        self._refs[ref.version] = ref
+        queue.append(_PendingRequest(X, future, time.perf_counter()))
+        if sum(len(request.X) for request in queue) >= self.max_batch:
+            self._flush(ref.version)
+        elif len(queue) == 1:
+            if self._running.get(ref.version, 0) == 0:
+                self._timers[ref.version] = loop.call_soon(self._flush, ref.version)
+            else:
+                self._timers[ref.version] = loop.call_later(self.window_ms / 1000, self._flush, ref.version)
+        return await future
+
+    def _flush(self, version: str) -> None:
+        """取出该版本排队中的请求，交给后台任务做一次批量预测"""
+        timer = self._timers.pop(version, None)
+        if timer is not None:
+            timer.cancel()
+        requests = self._pending.pop(version, [])
+        if requests:
+            self._running[version] = self._running.get(version, 0) + 1
+            asyncio.ensure_future(self._run_batch(self._refs[version], requests))
+
+    async def _run_batch(self, ref: ModelRef, requests: List[_PendingRequest]) -> None:
+        """批量预测并按行拆分结果"""
+        X = np.vstack([request.X for request in requests])
+        start = time.perf_counter()
+        for request in requests:
+            self.wait_ms.observe((start - request.enqueued_at) * 1000)
+        try:
+            loop = asyncio.get_running_loop()
+            labels = await loop.run_in_executor(None, self._predict, ref, X)
+        except Exception as e:
+            self._batch_done(ref.version)
+            logger.error(f"[InferenceScheduler._run_batch] 批量预测失败: rows={len(X)}, {str(e)}", exc_info=True)
+            with self._lock:
+                self._failed += 1
+            for request in requests:
+                if not request.future.done():
+                    request.future.set_exception(e)
+            return
+        self._batch_done(ref.version)
+        self.predict_ms.observe((time.perf_counter() - start) * 1000)
+        self.batch_sizes.observe(len(X))
+        with self._lock:
+            self._batches += 1
+            self._requests += len(requests)
+            self._rows += len(X)
+        offset = 0
+        for request in requests:
+            if not request.future.done():
+                request.future.set_result(labels[offset:offset + len(request.X)])
+            offset += len(request.X)
+
+    def _batch_done(self, version: str) -> None:
+        """批次完成后，若该版本已无进行中的预测，立即发出排队中的请求"""
+        self._running[version] -= 1
+        if self._running[version] == 0 and self._pending.get(version):
+            self._flush(version)
+
+    @staticmethod
+    def _predict(ref: ModelRef, X: np.ndarray) -> List[str]:
+        # 预测标签可能是 numpy 字符串，转换为普通类型便于序列化和存库
+        return [str(label) for label in model_registry.get(ref).predict_batch(X)]
+
+    def stats(self) -> Dict[str, Any]:
+        """调度器运行指标"""
+        with self._lock:
+            summary = {
+                "enabled": settings.INFERENCE_BATCHING,
+                "window_ms": self.window_ms,
+                "max_batch": self.max_batch,
+                "batches": self._batches,
+                "requests": self._requests,
+                "rows": self._rows,
+                "failed": self._failed,
+                "avg_batch_size": self._rows / self._batches if self._batches else 0.0
+            }
+        summary["batch_size"] = self.batch_sizes.snapshot()
+        summary["wait_ms"] = self.wait_ms.snapshot()
+        summary["predict_ms"] = self.predict_ms.snapshot()
+        return summary
+
+
+# 全局唯一InferenceScheduler实例
+inference_scheduler = InferenceScheduler()
@@ -14,6 +14,7 @@ from app.repositories.llm_repository import LLMRepository
 from app.core.llm import LLMClient, get_llm_client
 from app.core.config import settings
 from app.websockets.manager import websocket_manager
+from app.services.llm_wait_service import llm_result_waiter
 
 # 配置日志
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -133,14 +134,28 @@ class LLMService:
         self,
         user_id: int,
         skip: int = 0,
-        limit: int = 10
-    ) -> List[Dict[str, Any]]:
-        """获取分析历史"""
+        limit: int = 10,
+        cursor: Optional[str] = None,
+        with_total: bool = False
+    ) -> Dict[str, Any]:
+        """
+        获取一页分析历史
+
+        Args:
+            cursor: 上一页返回的游标，提供时忽略 skip
+            with_total: 是否返回总数（进程内缓存的近似值）
+
+        Returns:
+            {"records": 本页记录, "next_cursor": 下一页游标, "total": 总数}
+        """
         try:
-            logger.info(f"[LLMService.get_analysis_history] 获取分析历史: user_id={user_id}, skip={skip}, limit={limit}")
-            result = self.repository.get_analysis_history(user_id, skip, limit)
-            logger.info(f"[LLMService.get_analysis_history] 获取分析历史成功: user_id={user_id}, 记录数={len(result)}")
-            return result
+            logger.info(f"[LLMService.get_analysis_history] 获取分析历史: user_id={user_id}, skip={skip}, limit={limit}, cursor={cursor}")
+            records, next_cursor = self.repository.get_analysis_history_page(user_id, limit, cursor=cursor, skip=skip)
+            total = self.repository.count_sessions(user_id) if with_total else None
+            logger.info(f"[LLMService.get_analysis_history] 获取分析历史成功: user_id={user_id}, 记录数={len(records)}")
+            return {"records": records, "next_cursor": next_cursor, "total": total}
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
         except Exception as e:
             logger.error(f"[LLMService.get_analysis_history] 获取分析历史失败: {str(e)}", exc_info=True)
             raise
@@ -421,8 +436,8 @@ class LLMService:
 当前语音指标：
 - 预测结果: {voice_metrics.model_prediction}
 - 音频质量得分（满分为100%）: {voice_metrics.model_confidence}
-- MFCC: {[getattr(voice_metrics, f'mfcc_{i}') for i in range(1, 14)]}
-- Chroma: {[getattr(voice_metrics, f'chroma_{i}') for i in range(1, 13)]}
+- MFCC: {voice_metrics.mfcc}
+- Chroma: {voice_metrics.chroma}
 - RMS: {voice_metrics.rms}
 - ZCR: {voice_metrics.zcr}
 - Mel Spectrogram: {voice_metrics.mel_spectrogram}
@@ -528,6 +543,47 @@ class LLMService:
         self,
         session_id: int,
         user_id: int
+    ) -> dict:
+        """对诊断会话进行LLM分析，完成后唤醒等待该会话结果的长轮询请求"""
+        result = await self._analyze_with_llm(session_id, user_id)
+        # 会话存在时（含LLM调用失败）才发布结果，会话不存在的请求由等待接口自行返回404
+        if result.get("session_id") is not None:
+            llm_result_waiter.publish(session_id, user_id, result)
+        return result
+
+    async def wait_for_analysis(self, session_id: int, user_id: int, timeout: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """
+        等待诊断会话的LLM分析完成（长轮询）
+        只在开始等待前按主键确认一次会话归属，等待期间不查询数据库；
+        结果已不在进程内（超过 LLM_WAIT_RESULT_TTL、服务重启或由其他进程分析）但会话已有诊断建议时直接返回
+
+        Returns:
+            分析结果；超时返回 None
+        """
+        timeout = min(timeout or settings.LLM_WAIT_DEFAULT_TIMEOUT, settings.LLM_WAIT_MAX_TIMEOUT)
+        result = llm_result_waiter.result(session_id, user_id)
+        if result is not None:
+            return result
+        session = self.repository.get_session_by_id(session_id, user_id)
+        if not session:
+            raise HTTPException(status_code=404, detail="诊断会话不存在")
+        if session.diagnosis_suggestion:
+            # 与 analyze_with_llm 发布的结果格式一致，提示词未入库
+            return {
+                "session_id": session_id,
+                "analysis": session.diagnosis_suggestion,
+                "prompt": None,
+                "timestamp": datetime.now()
+            }
+        # 归还数据库连接，挂起期间不占用连接池
+        self.db.close()
+        logger.info(f"[LLMService.wait_for_analysis] 等待LLM分析结果: session_id={session_id}, timeout={timeout}")
+        return await llm_result_waiter.wait(session_id, user_id, timeout)
+
+    async def _analyze_with_llm(
+        self,
+        session_id: int,
+        user_id: int
     ) -> dict:
         try:
             # 获取会话信息
@@ -543,7 +599,7 @@ class LLMService:
             # 获取历史诊断建议（最近3条）
             history = self.repository.get_analysis_history(user_id, skip=0, limit=3)
             history_suggestions = [item['diagnosis_suggestion'] for item in history if item.get('diagnosis_suggestion')] if history else []
-            logger.info(f"[analyze_with_llm] 当前语音指标: prediction={voice_metrics.model_prediction}, confidence={voice_metrics.model_confidence}, mfcc={[getattr(voice_metrics, f'mfcc_{i}') for i in range(1, 14)]}, chroma={[getattr(voice_metrics, f'chroma_{i}') for i in range(1, 13)]}, rms={voice_metrics.rms}, zcr={voice_metrics.zcr}, mel_spectrogram={voice_metrics.mel_spectrogram}")
+            logger.info(f"[analyze_with_llm] 当前语音指标: prediction={voice_metrics.model_prediction}, confidence={voice_metrics.model_confidence}, mfcc={voice_metrics.mfcc}, chroma={voice_metrics.chroma}, rms={voice_metrics.rms}, zcr={voice_metrics.zcr}, mel_spectrogram={voice_metrics.mel_spectrogram}")
             logger.info(f"[analyze_with_llm] 历史诊断建议: {history_suggestions}")
             # 构建提示词
             prompt = self._build_analysis_prompt(voice_metrics, history_suggestions)
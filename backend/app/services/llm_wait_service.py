@@ -0,0 +1,96 @@
+"""
+LLM分析结果的长轮询等待
+仪表盘不再反复轮询 /diagnosis/latest、/dashboard/latest-session（每次都是一条 ORDER BY created_at DESC LIMIT 1 查询），
+而是调用 GET /diagnosis/{session_id}/wait 挂起请求：
+- 请求挂在以会话ID为键的 asyncio.Event 上，analyze_with_llm 完成（成功或失败）时立即唤醒并返回结果，超时返回204
+- 等待期间不查询数据库；结果在进程内保留 LLM_WAIT_RESULT_TTL 秒，分析先于等待请求完成时直接返回
+- 事件和结果只在当前进程内，LLM分析在其他工作进程执行时等待请求会超时，客户端回退为查询一次最新结果
+"""
+
+import asyncio
+import logging
+import time
+from typing import Any, Dict, Optional, Tuple
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class LLMResultWaiter:
+    """按会话ID等待LLM分析结果（在事件循环中使用）"""
+
+    def __init__(self):
+        self._events: Dict[int, asyncio.Event] = {}
+        # 会话ID -> 等待中的请求数
+        self._waiters: Dict[int, int] = {}
+        # 会话ID -> (用户ID, 分析结果, 完成时间)
+        self._results: Dict[int, Tuple[int, Dict[str, Any], float]] = {}
+        self._woken = 0
+        self._timeouts = 0
+
+    def _cleanup_expired(self) -> None:
+        """清理超过保留时间的结果"""
+        deadline = time.time() - settings.LLM_WAIT_RESULT_TTL
+        for session_id, (_, _, finished_at) in list(self._results.items()):
+            if finished_at < deadline:
+                del self._results[session_id]
+
+    def result(self, session_id: int, user_id: int) -> Optional[Dict[str, Any]]:
+        """已完成的分析结果（未完成、已过期或不属于该用户时返回 None）"""
+        entry = self._results.get(session_id)
+        if entry is None or entry[0] != user_id:
+            return None
+        return entry[1]
+
+    def publish(self, session_id: int, user_id: int, result: Dict[str, Any]) -> None:
+        """记录分析结果并唤醒等待该会话的请求"""
+        self._cleanup_expired()
+        self._results[session_id] = (user_id, result, time.time())
+        event = self._events.pop(session_id, None)
+        if event is not None:
+            event.set()
+            logger.info(f"[LLMResultWaiter.publish] 唤醒等待中的请求: session_id={session_id}")
+
+    async def wait(self, session_id: int, user_id: int, timeout: float) -> Optional[Dict[str, Any]]:
+        """
+        等待会话的LLM分析完成
+
+        Args:
+            timeout: 最长等待时间（秒）
+
+        Returns:
+            分析结果；超时返回 None
+        """
+        result = self.result(session_id, user_id)
+        if result is not None:
+            return result
+        event = self._events.setdefault(session_id, asyncio.Event())
+        self._waiters[session_id] = self._waiters.get(session_id, 0) + 1
+        try:
+            await asyncio.wait_for(event.wait(), timeout)
+        except asyncio.TimeoutError:
+            self._timeouts += 1
+            return None
+        finally:
+            self._waiters[session_id] -= 1
+            if self._waiters[session_id] == 0:
+                del self._waiters[session_id]
+                # 最后一个等待者超时或断开时移除未触发的事件，避免遗留
+                if self._events.get(session_id) is event:
+                    del self._events[session_id]
+        self._woken += 1
+        return self.result(session_id, user_id)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "waiting": sum(self._waiters.values()),
+            "sessions": len(self._events),
+            "results": len(self._results),
+            "woken": self._woken,
+            "timeouts": self._timeouts
+        }
+
+
+# 全局唯一LLMResultWaiter实例（每个进程各自一份）
+llm_result_waiter = LLMResultWaiter()
@@ -3,29 +3,94 @@
 负责加载和使用语音诊断模型
 """
 
-import os
 import logging
-from typing import Dict, Any, List
+import threading
+from typing import Dict, Any, List, Optional, Tuple
 
 # 配置日志
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+from app.core.config import settings
 from app.utils.voice_models_utils import AnalysisModel
+from app.utils.model_registry import model_registry
+from app.utils.audio_context import AudioAnalysisContext
+
+# 级联推理的判定层级
+STAGE_LINEAR = "linear"
+STAGE_SVM = "svm"
+
+
+class CascadeStats:
+    """级联推理各层级的命中计数（主进程中按分析结果汇总，线程安全）"""
+
+    def __init__(self):
+        self._counts = {STAGE_LINEAR: 0, STAGE_SVM: 0}
+        self._lock = threading.Lock()
+
+    def record(self, stage: Optional[str]) -> None:
+        """记录一次判定所在的层级（命中分析缓存或未启用级联时为 None，不计数）"""
+        if stage in self._counts:
+            with self._lock:
+                self._counts[stage] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            counts = dict(self._counts)
+        total = sum(counts.values())
+        return {
+            "enabled": settings.MODEL_CASCADE,
+            "margin_threshold": settings.CASCADE_MARGIN_THRESHOLD,
+            "total": total,
+            "stages": counts,
+            "linear_hit_rate": counts[STAGE_LINEAR] / total if total else 0.0
+        }
+
+
+# 全局唯一CascadeStats实例
+cascade_stats = CascadeStats()
+
 
 class VoiceModelService:
     """语音模型服务，负责加载和使用语音诊断模型"""
     
     def __init__(self):
-        """初始化模型服务"""
-        # 获取项目根目录
-        current_dir = os.path.dirname(os.path.abspath(__file__))
-        project_root = os.path.abspath(os.path.join(current_dir, '..', '..', '..'))
-        
-        # 初始化模型
-        model_path = os.path.join(project_root, 'ml_models', 'trained', 'voice_models', 'svm_model.pkl')
-        self.model = AnalysisModel(model_path)
+        """初始化模型服务（模型由进程内的模型注册表统一加载，不在此处重复加载）"""
         logger.info("初始化语音模型服务")
+
+    @property
+    def model(self) -> AnalysisModel:
+        """当前生效的模型（热切换后自动使用新版本）"""
+        return model_registry.get()
+
+    def cascade_first_stage(self, context: AudioAnalysisContext, model: Optional[AnalysisModel] = None) -> Optional[Tuple[str, float]]:
+        """
+        级联推理的第一级：只提取低成本特征组（ZCR/MFCC/RMS），由线性模型判断
+
+        Args:
+            context: 音频分析上下文，低成本特征缓存在其中，回退SVM时只需补算色度特征
+            model: 使用的模型版本，默认为当前版本
+
+        Returns:
+            置信间隔不低于 CASCADE_MARGIN_THRESHOLD 时返回 (预测标签, 置信间隔)；
+            未启用级联、模型没有对应的第一级模型、上下文中已有完整特征（如流式录音）、
+            第一级不够确定或提取失败时返回 None，由完整特征和SVM判断
+        """
+        model = model or self.model
+        if model.cascade is None or context.peek("features") is not None:
+            return None
+        try:
+            light = model.get_features(context, with_chroma=False)
+            labels, margins = model.cascade.decide(light)
+        except Exception as e:
+            logger.warning(f"[cascade_first_stage] 第一级判断失败，回退SVM: {str(e)}")
+            return None
+        margin = float(margins[0])
+        if margin < settings.CASCADE_MARGIN_THRESHOLD:
+            logger.info(f"[cascade_first_stage] 第一级置信间隔不足({margin:.3f})，回退SVM: {context.source}")
+            return None
+        logger.info(f"[cascade_first_stage] 第一级判定: {labels[0]}, 置信间隔={margin:.3f}: {context.source}")
+        return str(labels[0]), margin
         
     def analyze_voice(self, audio_path: str) -> Dict[str, Any]:
         """
@@ -38,15 +103,27 @@ class VoiceModelService:
             分析结果，包含预测标签、置信度、特征和建议
         """
         try:
-            # 使用模型进行预测
-            prediction = self.model.get_pred(audio_path)
+            # 解码一次，预测与特征提取共享同一分析上下文
+            context = AudioAnalysisContext.from_file(audio_path)
             
-            # 获取特征
-            features = self.model.get_features(audio_path)
+            # 预测和特征提取使用同一模型版本，避免中途热切换
+            model = self.model
+            
+            # 使用模型进行预测（启用级联时第一级足够确定则不提取色度特征、不调用SVM）
+            decision = self.cascade_first_stage(context, model)
+            if decision is not None:
+                prediction, stage = decision[0], STAGE_LINEAR
+                features = model.get_features(context, with_chroma=False)
+            else:
+                prediction, stage = model.get_pred(context), STAGE_SVM if model.cascade is not None else None
+                # 获取特征（直接复用预测时缓存的特征）
+                features = model.get_features(context)
+            cascade_stats.record(stage)
     
             # 构建结果
             result = {
                 "prediction": prediction,
+                "stage": stage,
                 "confidence": 1.0,  # 由于新模型不支持概率预测，暂时设为1.0
                 "status": "success",
                 "features": {
@@ -83,4 +160,8 @@ class VoiceModelService:
                 "保持充分的水分摄入",
                 "避免在嘈杂环境中提高嗓音",
                 "如症状持续，建议咨询专业医生"
-            ] 
\ No newline at end of file
+            ]
+
+
+# 全局唯一VoiceModelService实例（分析流水线在工作进程中通过它执行级联推理）
+voice_model_service = VoiceModelService()
@@ -1,23 +1,51 @@
-from typing import Dict, Any, Optional
+from typing import Any, Callable, Dict, List, Optional
 from datetime import datetime, timezone
 from sqlalchemy.orm import Session
-from fastapi import HTTPException, status, UploadFile, BackgroundTasks
-from app.db.models import VoiceMetrics, DiagnosisSession
-from app.services.model_service import VoiceModelService
+from fastapi import HTTPException, status, UploadFile, BackgroundTasks, WebSocket, WebSocketDisconnect
+from fastapi.encoders import jsonable_encoder
+from app.db.models import SESSION_STATUS_FAILED, VoiceMetrics, DiagnosisSession
+from app.services.model_service import VoiceModelService, cascade_stats
 from app.services.llm_service import LLMService
+import asyncio
+import functools
 import logging
 import os
-import subprocess
-import tempfile
 import re
 import json
-import numpy as np
-import librosa
 
 from app.repositories.diagnosis_repository import DiagnosisRepository
 from app.core.llm import LLMClient, get_llm_client
 from app.schemas.voice import VoiceHistoryResponse, VoiceStatsResponse
-from app.utils.voice_models_utils import create_model
+from app.utils.audio_decoder import AudioDecodeError, UnsupportedAudioFormatError, decode_with_ffmpeg_stream
+from app.services.analysis_executor import analysis_executor, AnalysisQueueFullError, WORK_BACKGROUND
+from app.services.inference_scheduler import inference_scheduler
+from app.services.analysis_job_service import JOB_COMPLETED, JOB_FAILED, AnalysisJob, analysis_job_manager
+from app.db.session import SessionLocal
+from app.services.analysis_pipeline import (
+    analyze_audio_bytes,
+    analyze_audio_path,
+    analyze_audio_samples,
+    analyze_stream,
+    decode_audio_path,
+    extract_clip_bytes,
+    extract_clip_samples,
+    extract_stream_window,
+    predict_clips,
+    UNKNOWN_PREDICTION
+)
+from app.core.config import settings
+import numpy as np
+from app.utils.model_registry import ModelRef, model_registry
+from app.utils.analysis_cache import analysis_cache
+from app.utils.streaming_features import StreamingFeatureAccumulator, StreamTooLongError, to_wav_bytes
+from app.services.chunked_upload_service import (
+    chunked_upload_manager,
+    ChunkedUploadError,
+    UploadBusyError,
+    UploadNotFoundError,
+    UploadOffsetMismatchError,
+    UploadTooLargeError
+)
 
 logger = logging.getLogger(__name__)
 
@@ -49,6 +77,49 @@ class VoiceAnalysisService:
             logger.error(f"文件名验证失败: {str(e)}")
             return False
 
+    def _pipeline_fn(self, fn: Callable[..., Dict[str, Any]]) -> Callable[..., Dict[str, Any]]:
+        """
+        启用推理合批时，工作进程只做解码、特征提取和质量评估，
+        预测留给主进程的推理调度器（见 _await_analysis）
+        """
+        if settings.INFERENCE_BATCHING:
+            return functools.partial(fn, predict=False)
+        return fn
+
+    async def _submit_with_fallback(self, bytes_fn, samples_fn, content: bytes, file_ext: str, filename: str, model_ref):
+        """
+        提交分析任务到进程池：优先在工作进程内直接解码上传字节，
+        进程内解码器无法处理的少见格式改用 ffmpeg 异步子进程流式解码后再提交
+        """
+        try:
+            return await analysis_executor.submit(bytes_fn, content, file_ext, filename, model_ref)
+        except UnsupportedAudioFormatError as e:
+            logger.warning(f"[_submit_with_fallback] 进程内解码失败，使用ffmpeg兜底: {filename}, {str(e)}")
+            y, sr = await decode_with_ffmpeg_stream(content)
+            return await analysis_executor.submit(samples_fn, y, sr, filename, model_ref)
+
+    async def _read_upload(self, file: UploadFile):
+        """校验文件名并读取上传内容，返回 (内容, 小写扩展名)"""
+        # 验证文件名
+        if not self.validate_filename(file.filename):
+            logger.warning(f"[_read_upload] 文件名无效: {file.filename}")
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"无效的文件名格式。文件名只能包含字母、数字和下划线，必须以支持的音频格式结尾: {', '.join(self.supported_formats)}"
+            )
+        # 读取文件内容
+        content = await file.read()
+        logger.info(f"[_read_upload] 文件大小: {len(content)} bytes")
+        
+        # 检查文件大小
+        if len(content) < 100:  # 文件太小，可能不是有效的音频文件
+            logger.warning(f"[_read_upload] 文件太小，可能不是有效的音频文件: {len(content)} bytes")
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="上传的文件太小，不是有效的音频文件"
+            )
+        return content, os.path.splitext(file.filename)[-1].lower()
+
   #主要变换流中心
     async def handle_voice_upload(
         self,
@@ -56,141 +127,663 @@ class VoiceAnalysisService:
         user_id: int,
         background_tasks: BackgroundTasks
     ) -> Dict[str, Any]:
-        """同步处理语音文件上传、特征提取、预测、存库、返回KPI，LLM分析异步执行，支持webm转码"""
+        """同步处理语音文件上传、特征提取、预测、存库、返回KPI，LLM分析异步执行，支持webm等压缩格式"""
         try:
             logger.info(f"[handle_voice_upload] 开始处理文件上传: {file.filename}")
-            # 验证文件名
-            if not self.validate_filename(file.filename):
-                logger.warning(f"[handle_voice_upload] 文件名无效: {file.filename}")
+            content, file_ext = await self._read_upload(file)
+            
+            # 1-2. 解码、特征提取、健康预测和质量评估在分析进程池中执行，不阻塞事件循环
+            #      直接从内存中的上传内容解码（不再经过磁盘和临时WAV文件）
+            # 提交时确定模型版本，热切换期间已提交的任务仍使用原版本
+            model_ref = model_registry.active_ref()
+            logger.info(f"[handle_voice_upload] 提交分析任务到进程池, model_version={model_ref.version}")
+            analysis = await self._await_analysis(self._submit_with_fallback(
+                self._pipeline_fn(analyze_audio_bytes), self._pipeline_fn(analyze_audio_samples),
+                content, file_ext, file.filename, model_ref
+            ), model_ref)
+            
+            # 原始文件归档不在关键路径上，响应返回后由后台任务写盘
+            return self._store_analysis_result(
+                analysis,
+                user_id,
+                background_tasks,
+                archive=lambda session_id: background_tasks.add_task(self.repository.save_voice_bytes, content, session_id, file_ext)
+            )
+        except HTTPException:
+            raise
+        except Exception as e:
+            logger.error(f"[handle_voice_upload] 处理语音文件上传失败: {str(e)}", exc_info=True)
+            raise HTTPException(
+                status_code=500,
+                detail=f"处理失败: {str(e)}"
+            )
+
+    async def handle_voice_upload_async(self, file: UploadFile, user_id: int) -> Dict[str, Any]:
+        """
+        异步上传：校验并归档上传文件、创建诊断会话后立即返回任务句柄（由接口层返回202），
+        解码、特征提取、预测、存库和LLM分析在后台任务队列中执行，
+        进度通过WebSocket推送并可通过 GET /diagnosis/jobs/{job_id} 查询
+        """
+        logger.info(f"[handle_voice_upload_async] 开始处理异步上传: {file.filename}")
+        content, file_ext = await self._read_upload(file)
+        try:
+            analysis_job_manager.check_capacity()
+        except AnalysisQueueFullError as e:
+            raise self._queue_full_error(e)
+
+        session = self.repository.create_session(user_id)
+        loop = asyncio.get_running_loop()
+        file_path = await loop.run_in_executor(None, self.repository.save_voice_bytes, content, session.id, file_ext)
+        try:
+            job = analysis_job_manager.submit(
+                session.id, user_id, file.filename,
+                functools.partial(VoiceAnalysisService._run_upload_job, file_path=file_path, file_ext=file_ext)
+            )
+        except AnalysisQueueFullError as e:
+            self.repository.mark_session_failed(session.id)
+            raise self._queue_full_error(e)
+        return {
+            "job_id": job.job_id,
+            "session_id": session.id,
+            "status": job.status,
+            "created_at": session.created_at,
+            "status_url": f"{settings.API_V1_STR}/diagnosis/jobs/{job.job_id}"
+        }
+
+    @staticmethod
+    def _queue_full_error(e: AnalysisQueueFullError) -> HTTPException:
+        logger.warning(f"[_queue_full_error] 分析队列已满: {str(e)}")
+        return HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(e),
+            headers={"Retry-After": str(e.retry_after)}
+        )
+
+    @classmethod
+    async def _run_upload_job(cls, job: AnalysisJob, file_path: str, file_ext: str) -> None:
+        """在后台任务队列中执行异步上传的分析（请求的数据库会话已关闭，使用独立的会话）"""
+        db = SessionLocal()
+        try:
+            await cls(db)._process_upload_job(job, file_path, file_ext)
+        finally:
+            db.close()
+
+    async def _submit_job_step(self, fn: Callable[..., Any], *args: Any) -> Any:
+        """异步任务的分析步骤：按后台任务类别调度（上传和交互式检测优先），分析队列已满时不失败，等待建议的间隔后重新提交"""
+        while True:
+            try:
+                return await analysis_executor.submit(fn, *args, work_class=WORK_BACKGROUND)
+            except AnalysisQueueFullError as e:
+                logger.warning(f"[_submit_job_step] 分析队列已满，{e.retry_after}秒后重试")
+                await asyncio.sleep(e.retry_after)
+
+    async def _process_upload_job(self, job: AnalysisJob, file_path: str, file_ext: str) -> None:
+        """异步上传任务：解码、特征提取、预测、存库、LLM分析，每完成一步发布一次进度事件"""
+        model_ref = model_registry.active_ref()
+        try:
+            try:
+                y, sr = await self._submit_job_step(decode_audio_path, file_path, file_ext)
+            except UnsupportedAudioFormatError as e:
+                logger.warning(f"[_process_upload_job] 进程内解码失败，使用ffmpeg兜底: {job.filename}, {str(e)}")
+                with open(file_path, "rb") as f:
+                    content = f.read()
+                y, sr = await decode_with_ffmpeg_stream(content)
+            await analysis_job_manager.publish(job, "decoded", duration=len(y) / sr if sr else 0.0)
+
+            analysis = await self._submit_job_step(self._pipeline_fn(analyze_audio_samples), y, sr, job.filename, model_ref)
+            await analysis_job_manager.publish(job, "features", cache=analysis.get("cache"))
+
+            analysis = await self._finish_analysis(analysis, model_ref)
+            await analysis_job_manager.publish(job, "predicted", **analysis["prediction"])
+
+            kpi = self._save_session_metrics(analysis, job.job_id, job.user_id)
+            await analysis_job_manager.publish(job, "stored", metrics_id=kpi["metrics_id"], result=jsonable_encoder(kpi))
+        except Exception as e:
+            if isinstance(e, AudioDecodeError):
+                logger.error(f"[_process_upload_job] 音频解码失败: job_id={job.job_id}, {str(e)}")
+                error = "音频文件格式无效或已损坏，无法处理"
+            else:
+                logger.error(f"[_process_upload_job] 异步分析失败: job_id={job.job_id}, {str(e)}", exc_info=True)
+                error = f"处理失败: {str(e)}"
+            try:
+                self.repository.mark_session_failed(job.job_id)
+            except Exception as mark_e:
+                logger.error(f"[_process_upload_job] 标记会话失败时出错: {str(mark_e)}")
+            await analysis_job_manager.publish(job, JOB_FAILED, error=error)
+            return
+
+        # 结果已入库，LLM分析失败不影响任务状态
+        try:
+            llm_result = await self.analyze_with_llm(job.job_id, job.user_id)
+            llm_error = llm_result.get("error") if isinstance(llm_result, dict) else None
+        except Exception as e:
+            logger.error(f"[_process_upload_job] LLM分析失败: job_id={job.job_id}, {str(e)}", exc_info=True)
+            llm_error = str(e)
+        await analysis_job_manager.publish(job, "llm_done", error=llm_error)
+
+    def get_analysis_job(self, job_id: int, user_id: int) -> Dict[str, Any]:
+        """
+        查询异步分析任务
+        任务状态只保存在处理该任务的进程内；请求落到其他进程或状态已过期时，根据会话和语音指标推断：
+        有语音指标为已完成，没有语音指标（已标记失败，或处理进程中断）为失败
+        """
+        job = analysis_job_manager.get(job_id, user_id)
+        if job is not None:
+            return job.to_dict()
+        session = self.repository.get_session_by_id(job_id, user_id)
+        if session is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="任务不存在")
+        metrics = self.repository.get_voice_metrics(job_id)
+        created_at = session.created_at.replace(tzinfo=timezone.utc).timestamp() if session.created_at else None
+        if metrics:
+            error = None
+        elif session.status == SESSION_STATUS_FAILED:
+            error = "分析失败"
+        else:
+            error = "分析任务已中断"
+        return {
+            "job_id": job_id,
+            "session_id": job_id,
+            "filename": None,
+            "status": JOB_COMPLETED if metrics else JOB_FAILED,
+            "stage": "stored" if metrics else None,
+            "events": [],
+            "result": {"metrics_id": metrics.id, "voice_metrics": self._voice_metrics_kpi(metrics)} if metrics else None,
+            "error": error,
+            "created_at": created_at,
+            "updated_at": created_at
+        }
+
+    async def handle_chunked_upload(
+        self,
+        file_path: str,
+        filename: str,
+        user_id: int,
+        background_tasks: BackgroundTasks
+    ) -> Dict[str, Any]:
+        """
+        处理分块上传完成后的音频文件：由工作进程直接从磁盘读取并分析，
+        主进程不再把整个文件读入内存；分析完成后已落盘的文件直接移动为归档文件
+        """
+        try:
+            logger.info(f"[handle_chunked_upload] 开始处理分块上传文件: {filename}, path={file_path}")
+            file_ext = os.path.splitext(filename)[-1].lower()
+            model_ref = model_registry.active_ref()
+
+            async def _submit():
+                try:
+                    return await analysis_executor.submit(self._pipeline_fn(analyze_audio_path), file_path, file_ext, filename, model_ref)
+                except UnsupportedAudioFormatError as e:
+                    logger.warning(f"[handle_chunked_upload] 进程内解码失败，使用ffmpeg兜底: {filename}, {str(e)}")
+                    with open(file_path, "rb") as f:
+                        y, sr = await decode_with_ffmpeg_stream(f.read())
+                    return await analysis_executor.submit(self._pipeline_fn(analyze_audio_samples), y, sr, filename, model_ref)
+
+            analysis = await self._await_analysis(_submit(), model_ref)
+            return self._store_analysis_result(
+                analysis,
+                user_id,
+                background_tasks,
+                archive=lambda session_id: background_tasks.add_task(self.repository.archive_voice_file, file_path, session_id, file_ext)
+            )
+        except HTTPException:
+            raise
+        except Exception as e:
+            logger.error(f"[handle_chunked_upload] 处理分块上传文件失败: {str(e)}", exc_info=True)
+            raise HTTPException(
+                status_code=500,
+                detail=f"处理失败: {str(e)}"
+            )
+
+    def _chunked_upload_http_error(self, e: ChunkedUploadError) -> HTTPException:
+        """将分块上传错误转换为对应的HTTP错误"""
+        if isinstance(e, UploadNotFoundError):
+            return HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
+        if isinstance(e, UploadOffsetMismatchError):
+            return HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail=str(e),
+                headers={"Upload-Offset": str(e.expected)}
+            )
+        if isinstance(e, UploadTooLargeError):
+            return HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail=str(e))
+        if isinstance(e, UploadBusyError):
+            return HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+        return HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+    def create_chunked_upload(self, user_id: int, filename: str, total_size: Optional[int] = None) -> Dict[str, Any]:
+        """创建分块上传"""
+        if not self.validate_filename(filename):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"无效的文件名格式。文件名只能包含字母、数字和下划线，必须以支持的音频格式结尾: {', '.join(self.supported_formats)}"
+            )
+        try:
+            return chunked_upload_manager.create(user_id, filename, total_size).to_dict()
+        except ChunkedUploadError as e:
+            raise self._chunked_upload_http_error(e)
+
+    def get_chunked_upload(self, upload_id: str, user_id: int) -> Dict[str, Any]:
+        """查询分块上传状态（断点续传时获取服务器已接收的偏移量）"""
+        try:
+            return chunked_upload_manager.get(upload_id, user_id).to_dict()
+        except ChunkedUploadError as e:
+            raise self._chunked_upload_http_error(e)
+
+    async def append_chunked_upload(self, upload_id: str, user_id: int, offset: int, chunks) -> Dict[str, Any]:
+        """按偏移量追加分块"""
+        try:
+            upload = await chunked_upload_manager.append(upload_id, user_id, offset, chunks)
+            return upload.to_dict()
+        except ChunkedUploadError as e:
+            raise self._chunked_upload_http_error(e)
+
+    async def finalize_chunked_upload(
+        self,
+        upload_id: str,
+        user_id: int,
+        sha256: Optional[str],
+        background_tasks: BackgroundTasks
+    ) -> Dict[str, Any]:
+        """
+        完成分块上传，校验后进入分析流水线
+        分析结果保存后临时文件由归档任务移动；队列已满等暂时性错误（5xx）时保留上传和临时文件，
+        客户端按 Retry-After 重新完成即可，无需重传；解码失败等永久错误（4xx）时删除
+        """
+        try:
+            upload = await chunked_upload_manager.finalize(upload_id, user_id, sha256)
+        except ChunkedUploadError as e:
+            raise self._chunked_upload_http_error(e)
+        try:
+            result = await self.handle_chunked_upload(upload.path, upload.filename, user_id, background_tasks)
+        except HTTPException as e:
+            if e.status_code < 500:
+                chunked_upload_manager.discard(upload_id)
+            else:
+                chunked_upload_manager.reopen(upload_id)
+            raise
+        except BaseException:
+            chunked_upload_manager.reopen(upload_id)
+            raise
+        chunked_upload_manager.complete(upload_id)
+        return result
+
+    async def handle_voice_stream(self, websocket: WebSocket, user_id: int) -> None:
+        """
+        流式录音分析：客户端边录音边发送 PCM 帧，服务器逐帧累加统计量并推送实时质量提示，
+        特征提取窗口收齐后立即在进程池中提取特征，录音结束时只剩预测和质量评估
+
+        协议：
+            客户端 -> {"type": "start", "sample_rate": 48000, "format": "s16le"}
+            服务器 -> {"type": "ready", ...}
+            客户端 -> 二进制 PCM 帧（单声道、小端）
+            服务器 -> {"type": "hint", ...}（每 STREAM_HINT_INTERVAL 秒音频推送一次）
+            客户端 -> {"type": "stop"}
+            服务器 -> {"type": "result", ...} 后关闭连接，出错时推送 {"type": "error", "detail": ...}
+        """
+        accumulator: Optional[StreamingFeatureAccumulator] = None
+        window_task: Optional[asyncio.Future] = None
+        # 连接开始时确定模型版本，热切换期间本次录音始终使用同一版本
+        model_ref = model_registry.active_ref()
+
+        async def _send_error(detail: str) -> None:
+            await websocket.send_json({"type": "error", "detail": detail})
+            await websocket.close()
+
+        try:
+            while True:
+                message = await websocket.receive()
+                if message["type"] == "websocket.disconnect":
+                    logger.info(f"[handle_voice_stream] 客户端断开，放弃本次录音: user_id={user_id}")
+                    return
+                if message.get("bytes") is not None:
+                    if accumulator is None:
+                        await websocket.send_json({"type": "error", "detail": "请先发送start消息"})
+                        continue
+                    try:
+                        accumulator.feed(message["bytes"])
+                    except StreamTooLongError as e:
+                        # 超过最长时长按结束录音处理，已接收的部分照常分析
+                        await websocket.send_json({"type": "error", "detail": str(e)})
+                        break
+                    if window_task is None and accumulator.window_ready:
+                        window = accumulator.signal()[:accumulator.window_samples].copy()
+                        window_task = asyncio.ensure_future(
+                            analysis_executor.submit(extract_stream_window, window, accumulator.sr, model_ref)
+                        )
+                        logger.info(f"[handle_voice_stream] 特征窗口已收齐，提交特征提取: user_id={user_id}")
+                    if accumulator.should_hint():
+                        await websocket.send_json(accumulator.hint())
+                    continue
+
+                try:
+                    control = json.loads(message.get("text") or "")
+                except ValueError:
+                    await websocket.send_json({"type": "error", "detail": "无效的控制消息"})
+                    continue
+                if control.get("type") == "start" and accumulator is None:
+                    try:
+                        accumulator = StreamingFeatureAccumulator(control.get("sample_rate"), control.get("format", "f32le"))
+                    except (TypeError, ValueError) as e:
+                        await _send_error(str(e))
+                        return
+                    logger.info(f"[handle_voice_stream] 开始流式录音: user_id={user_id}, sample_rate={accumulator.input_sr}, format={accumulator.sample_format}")
+                    await websocket.send_json({
+                        "type": "ready",
+                        "sample_rate": accumulator.sr,
+                        "window_seconds": accumulator.window_samples / accumulator.sr,
+                        "max_seconds": settings.STREAM_MAX_SECONDS
+                    })
+                elif control.get("type") == "stop":
+                    break
+                else:
+                    await websocket.send_json({"type": "error", "detail": f"未知的控制消息: {control.get('type')}"})
+
+            if accumulator is None or accumulator.n_samples == 0:
+                await _send_error("未收到音频数据")
+                return
+            accumulator.finish()
+            y = accumulator.signal()
+            logger.info(f"[handle_voice_stream] 录音结束: user_id={user_id}, 时长={accumulator.duration:.2f}s")
+
+            features = None
+            if window_task is not None:
+                try:
+                    features = await window_task
+                except Exception as e:
+                    # 录音过程中的特征提取失败时，由结束时的分析任务重新提取
+                    logger.warning(f"[handle_voice_stream] 录音过程中特征提取失败: {str(e)}")
+            try:
+                analysis = await self._await_analysis(
+                    analysis_executor.submit(self._pipeline_fn(analyze_stream), y, accumulator.sr, features, model_ref),
+                    model_ref
+                )
+            except HTTPException as e:
+                await _send_error(str(e.detail))
+                return
+
+            background_tasks = BackgroundTasks()
+            result = self._store_analysis_result(
+                analysis,
+                user_id,
+                background_tasks,
+                archive=lambda session_id: background_tasks.add_task(self._archive_stream, y, accumulator.sr, session_id)
+            )
+            await websocket.send_json(jsonable_encoder({"type": "result", **result}))
+            await websocket.close()
+            # 连接关闭后再执行归档和LLM分析
+            await background_tasks()
+        except WebSocketDisconnect:
+            logger.info(f"[handle_voice_stream] 客户端断开: user_id={user_id}")
+        finally:
+            if window_task is not None and not window_task.done():
+                window_task.cancel()
+
+    def _archive_stream(self, y: np.ndarray, sr: int, session_id: int) -> None:
+        """将流式录音编码为WAV归档"""
+        self.repository.save_voice_bytes(to_wav_bytes(y, sr), session_id, ".wav")
+
+    async def _await_analysis(self, submission, model_ref: Optional[ModelRef] = None) -> Dict[str, Any]:
+        """
+        等待分析任务完成，并将队列已满、解码失败等错误转换为对应的HTTP错误；
+        工作进程未做预测时（推理合批），由推理调度器与其他并发请求合并预测
+        """
+        try:
+            analysis = await submission
+        except AnalysisQueueFullError as e:
+            raise self._queue_full_error(e)
+        except AudioDecodeError as e:
+            logger.error(f"[_await_analysis] 音频解码失败: {str(e)}")
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="音频文件格式无效或已损坏，无法处理"
+            )
+        return await self._finish_analysis(analysis, model_ref)
+
+    async def _finish_analysis(self, analysis: Dict[str, Any], model_ref: Optional[ModelRef] = None) -> Dict[str, Any]:
+        """
+        记录缓存和级联命中；工作进程未做预测时（推理合批），由推理调度器与其他并发请求合并预测，
+        并把标签补写到分析缓存；预测失败时与工作进程内预测一致地返回"未知"，不写入缓存
+        """
+        analysis_cache.record(analysis.get("cache"))
+        cascade_stats.record(analysis.get("stage"))
+        vector = analysis.pop("vector", None)
+        cache_key = analysis.pop("cache_key", None)
+        if vector is None:
+            return analysis
+        prediction = analysis["prediction"]
+        try:
+            labels = await inference_scheduler.predict(vector, model_ref)
+        except Exception as e:
+            logger.error(f"[_finish_analysis] 合批预测失败: {str(e)}", exc_info=True)
+            prediction["prediction"], prediction["confidence"] = UNKNOWN_PREDICTION, 0.0
+            return analysis
+        prediction["prediction"] = labels[0]
+        if cache_key is not None:
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(
+                None, analysis_cache.put, cache_key, vector, labels[0], prediction["confidence"], analysis["duration"]
+            )
+        return analysis
+
+    def _store_analysis_result(
+        self,
+        analysis: Dict[str, Any],
+        user_id: int,
+        background_tasks: BackgroundTasks,
+        archive: Callable[[int], Any]
+    ) -> Dict[str, Any]:
+        """
+        创建会话、保存语音指标并返回KPI，LLM分析在后台执行
+        会话、语音指标和当天汇总在同一个事务中写入，失败时整体回滚，不留下没有结果的会话
+
+        Args:
+            analysis: 分析流水线的结果
+            archive: 以会话ID为参数的原始音频归档回调（提交成功后才调用）
+        """
+        # 3-4. 创建诊断会话并保存语音指标（一次提交）
+        with self.repository.unit_of_work():
+            session = self.repository.add_session(user_id)
+            logger.info(f"[_store_analysis_result] 创建诊断会话: {session.id}")
+            kpi = self._save_session_metrics(analysis, session.id, user_id)
+        
+        archive(session.id)
+        
+        # 5. 异步调用LLM分析
+        logger.info(f"[_store_analysis_result] 添加后台LLM分析任务")
+        background_tasks.add_task(self.analyze_with_llm, session.id, user_id)
+        
+        # 6. 同步返回KPI和预测结果给仪表盘
+        return {
+            "session_id": session.id,
+            "metrics_id": kpi["metrics_id"],
+            "created_at": session.created_at,
+            "voice_metrics": kpi["voice_metrics"]
+        }
+    
+    def _save_session_metrics(self, analysis: Dict[str, Any], session_id: int, user_id: int) -> Dict[str, Any]:
+        """保存语音指标（会话有语音指标即为已完成），返回 {"metrics_id", "voice_metrics"}"""
+        features = analysis["features"]
+        prediction = analysis["prediction"]
+        logger.info(f"[_save_session_metrics] 特征提取完成: { {k: v for k, v in features.items() if k != 'feature_vector'} }")
+        logger.info(f"[_save_session_metrics] 健康预测完成: {prediction}")
+        metrics = self.repository.save_voice_metrics(
+            session_id=session_id,
+            user_id=user_id,
+            features=features,
+            prediction=prediction
+        )
+        logger.info(f"[_save_session_metrics] 语音指标保存完成 metrics_id={metrics.id}")
+        return {"metrics_id": metrics.id, "voice_metrics": self._voice_metrics_kpi(metrics)}
+
+    @staticmethod
+    def _voice_metrics_kpi(metrics: VoiceMetrics) -> Dict[str, Any]:
+        """返回给仪表盘的KPI和预测结果"""
+        return {
+            "prediction": metrics.model_prediction,
+            "confidence": metrics.model_confidence,
+            "mfcc": metrics.mfcc,
+            "chroma": metrics.chroma,
+            "rms": metrics.rms,
+            "zcr": metrics.zcr,
+            "mel_spectrogram": metrics.mel_spectrogram
+        }
+    
+    async def handle_voice_batch_upload(
+        self,
+        files: List[UploadFile],
+        user_id: int,
+        background_tasks: BackgroundTasks
+    ) -> Dict[str, Any]:
+        """
+        批量处理同一次就诊的多段录音：
+        各段并行解码和提取特征，堆叠为矩阵后只做一次SVM预测，
+        所有语音指标在同一个事务中保存，返回逐段结果和会话级汇总
+        """
+        try:
+            logger.info(f"[handle_voice_batch_upload] 开始处理批量上传: {len(files)} 个文件")
+            if not files:
                 raise HTTPException(
                     status_code=status.HTTP_400_BAD_REQUEST,
-                    detail=f"无效的文件名格式。文件名只能包含字母、数字和下划线，必须以支持的音频格式结尾: {', '.join(self.supported_formats)}"
+                    detail="请至少上传一个音频文件"
                 )
-            # 读取文件内容
-            content = await file.read()
-            logger.info(f"[handle_voice_upload] 文件大小: {len(content)} bytes")
-            
-            # 检查文件大小
-            if len(content) < 100:  # 文件太小，可能不是有效的音频文件
-                logger.warning(f"[handle_voice_upload] 文件太小，可能不是有效的音频文件: {len(content)} bytes")
+            if len(files) > settings.BATCH_UPLOAD_MAX_FILES:
                 raise HTTPException(
                     status_code=status.HTTP_400_BAD_REQUEST,
-                    detail="上传的文件太小，不是有效的音频文件"
+                    detail=f"单次最多上传 {settings.BATCH_UPLOAD_MAX_FILES} 个文件"
                 )
-            
-            # 创建诊断会话
-            session = self.repository.create_session(user_id)
-            logger.info(f"[handle_voice_upload] 创建诊断会话成功: {session.id}")
-            
-            # 保存文件
-            file.file.seek(0)  # 重置文件指针
-            file_path = self.repository.save_voice_file(file, session.id)
-            logger.info(f"[handle_voice_upload] 文件保存成功: {file_path}")
-            
-            # 如果是webm，自动转码为wav
-            wav_path = file_path
-            if file_path.lower().endswith('.webm'):
-                wav_path = file_path.rsplit('.', 1)[0] + '.wav'
-                logger.info(f"[handle_voice_upload] 检测到webm，开始转码为wav: {wav_path}")
-                try:
-                    # 使用更多参数以提高转换成功率
-                    cmd = [
-                        'ffmpeg',
-                        '-i', file_path,
-                        '-acodec', 'pcm_s16le',  # 指定音频编解码器
-                        '-ar', '44100',          # 采样率
-                        '-ac', '1',              # 单声道
-                        wav_path,
-                        '-y'
-                    ]
-                    process = subprocess.run(
-                        cmd,
-                        check=True,
-                        capture_output=True,
-                        text=True
-                    )
-                    logger.info(f"[handle_voice_upload] 转码完成，后续分析用: {wav_path}")
-                    logger.debug(f"[handle_voice_upload] ffmpeg输出: {process.stdout}")
-                except subprocess.CalledProcessError as e:
-                    logger.error(f"[handle_voice_upload] 转码失败: {str(e)}")
-                    logger.error(f"[handle_voice_upload] ffmpeg错误输出: {e.stderr}")
-                    
-                    # 标记会话为失败
-                    self.repository.mark_session_failed(session.id)
-                    
+            for file in files:
+                if not self.validate_filename(file.filename):
                     raise HTTPException(
                         status_code=status.HTTP_400_BAD_REQUEST,
-                        detail="音频文件格式无效或已损坏，无法处理"
+                        detail=f"无效的文件名格式: {file.filename}。文件名只能包含字母、数字和下划线，必须以支持的音频格式结尾: {', '.join(self.supported_formats)}"
                     )
-                
-                # 检查wav文件是否成功创建
-                if not os.path.exists(wav_path) or os.path.getsize(wav_path) < 1000:
-                    logger.error(f"[handle_voice_upload] WAV文件创建失败或太小: {wav_path}")
-                    self.repository.mark_session_failed(session.id)
-                    raise HTTPException(
-                        status_code=status.HTTP_400_BAD_REQUEST,
-                        detail="音频转换失败，请上传其他格式的音频文件"
+
+            contents = [await file.read() for file in files]
+            file_exts = [os.path.splitext(file.filename)[-1].lower() for file in files]
+            model_ref = model_registry.active_ref()
+
+            async def _extract(index: int):
+                if len(contents[index]) < 100:
+                    return {"error": "上传的文件太小，不是有效的音频文件"}
+                try:
+                    return await self._submit_with_fallback(
+                        extract_clip_bytes, extract_clip_samples,
+                        contents[index], file_exts[index], files[index].filename, model_ref
                     )
-            
-            # 1. 同步特征提取
-            logger.info(f"[handle_voice_upload] 开始特征提取")
-            features = await self._extract_voice_features(wav_path)
-            logger.info(f"[handle_voice_upload] 特征提取完成: {features}")
-            
-            # 2. 同步调用语音模型进行健康预测
-            logger.info(f"[handle_voice_upload] 开始健康预测")
-            prediction = await self._predict_health_status(wav_path)  # 传入文件路径而不是特征
-            logger.info(f"[handle_voice_upload] 健康预测完成: {prediction}")
-            
-            # 3. 保存语音指标到数据库
-            logger.info(f"[handle_voice_upload] 保存语音指标到数据库")
-            metrics = self.repository.save_voice_metrics(
-                session_id=session.id,
-                user_id=user_id,
-                features=features,
-                prediction=prediction
-            )
-            logger.info(f"[handle_voice_upload] 语音指标保存完成 metrics_id={metrics.id}")
-            
-            # 4. 标记会话为已完成
-            self.repository.mark_session_completed(session.id)
-            logger.info(f"[handle_voice_upload] 会话标记为已完成")
-            
-            # 5. 异步调用LLM分析
-            logger.info(f"[handle_voice_upload] 添加后台LLM分析任务")
+                except AudioDecodeError as e:
+                    logger.error(f"[handle_voice_batch_upload] 音频解码失败: {files[index].filename}, {str(e)}")
+                    return {"error": "音频文件格式无效或已损坏，无法处理"}
+
+            # 1. 各段音频并行解码和提取特征
+            extractions = [asyncio.ensure_future(_extract(i)) for i in range(len(files))]
+            try:
+                try:
+                    clips = await asyncio.gather(*extractions)
+                except BaseException:
+                    # 任一段失败（如分析队列已满）时整批失败，取消其余各段：尚未开始执行的提交直接移出分析队列
+                    for extraction in extractions:
+                        extraction.cancel()
+                    await asyncio.gather(*extractions, return_exceptions=True)
+                    raise
+            except AnalysisQueueFullError as e:
+                logger.warning(f"[handle_voice_batch_upload] 分析队列已满: {str(e)}")
+                raise HTTPException(
+                    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                    detail=str(e),
+                    headers={"Retry-After": str(e.retry_after)}
+                )
+            for clip in clips:
+                if "error" not in clip:
+                    analysis_cache.record(clip.get("cache"))
+            valid = [i for i, clip in enumerate(clips) if "error" not in clip]
+            if not valid:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail="所有音频文件均无法处理"
+                )
+
+            # 2. 特征向量堆叠为矩阵，一次批量预测
+            vectors = np.vstack([clips[i]["vector"] for i in valid])
+            if settings.INFERENCE_BATCHING:
+                labels = await inference_scheduler.predict(vectors, model_ref)
+            else:
+                labels = await analysis_executor.submit(predict_clips, vectors, model_ref)
+            logger.info(f"[handle_voice_batch_upload] 批量预测完成: {labels}")
+
+            # 3. 创建会话，会话和所有语音指标在同一个事务中保存
+            items = [
+                (clips[i]["features"], {"prediction": label, "confidence": clips[i]["confidence"]})
+                for i, label in zip(valid, labels)
+            ]
+            with self.repository.unit_of_work():
+                session = self.repository.add_session(user_id)
+                metrics_ids = self.repository.save_voice_metrics_batch(session.id, user_id, items)
+            logger.info(f"[handle_voice_batch_upload] 创建诊断会话成功: {session.id}")
+
+            for i in valid:
+                background_tasks.add_task(self.repository.save_voice_bytes, contents[i], session.id, file_exts[i], i)
             background_tasks.add_task(self.analyze_with_llm, session.id, user_id)
-            
-            # 6. 同步返回KPI和预测结果给仪表盘
+
+            # 4. 组装逐段结果和会话级汇总
+            results = []
+            saved = dict(zip(valid, zip(metrics_ids, items)))
+            for i, file in enumerate(files):
+                if i not in saved:
+                    results.append({"index": i, "filename": file.filename, "error": clips[i]["error"]})
+                    continue
+                metrics_id, (features, prediction) = saved[i]
+                results.append({
+                    "index": i,
+                    "filename": file.filename,
+                    "metrics_id": metrics_id,
+                    "duration": clips[i]["duration"],
+                    "voice_metrics": {
+                        "prediction": prediction["prediction"],
+                        "confidence": prediction["confidence"],
+                        "mfcc": features["mfcc"],
+                        "chroma": features["chroma"],
+                        "rms": features["rms"],
+                        "zcr": features["zcr"],
+                        "mel_spectrogram": features["mel_spectrogram"]
+                    }
+                })
+
             return {
                 "session_id": session.id,
-                "metrics_id": metrics.id,
                 "created_at": session.created_at,
-                "voice_metrics": {
-                    "prediction": metrics.model_prediction,
-                    "confidence": metrics.model_confidence,
-                    "mfcc": [getattr(metrics, f"mfcc_{i}") for i in range(1, 14)],
-                    "chroma": [getattr(metrics, f"chroma_{i}") for i in range(1, 13)],
-                    "rms": metrics.rms,
-                    "zcr": metrics.zcr,
-                    "mel_spectrogram": metrics.mel_spectrogram
-                }
+                "clips": results,
+                "aggregate": self._aggregate_clips([item[1] for item in items], [clips[i]["duration"] for i in valid], len(files))
             }
         except HTTPException:
             raise
         except Exception as e:
-            logger.error(f"[handle_voice_upload] 处理语音文件上传失败: {str(e)}", exc_info=True)
-            # 如果会话已创建，标记为失败
-            if 'session' in locals() and session:
-                try:
-                    self.repository.mark_session_failed(session.id)
-                except Exception as mark_e:
-                    logger.error(f"[handle_voice_upload] 标记会话失败时出错: {str(mark_e)}")
-            
+            logger.error(f"[handle_voice_batch_upload] 批量上传处理失败: {str(e)}", exc_info=True)
             raise HTTPException(
                 status_code=500,
                 detail=f"处理失败: {str(e)}"
             )
-    
+
+    def _aggregate_clips(self, predictions: List[Dict[str, Any]], durations: List[float], total: int) -> Dict[str, Any]:
+        """会话级汇总：按多数票确定整体预测，票数相同时取平均置信度更高的标签"""
+        distribution: Dict[str, int] = {}
+        confidence_sum: Dict[str, float] = {}
+        for item in predictions:
+            label = item["prediction"]
+            distribution[label] = distribution.get(label, 0) + 1
+            confidence_sum[label] = confidence_sum.get(label, 0.0) + item["confidence"]
+        overall = max(distribution, key=lambda label: (distribution[label], confidence_sum[label] / distribution[label]))
+        return {
+            "prediction": overall,
+            "confidence": confidence_sum[overall] / distribution[overall],
+            "prediction_distribution": distribution,
+            "average_confidence": sum(confidence_sum.values()) / len(predictions),
+            "total_duration": sum(durations),
+            "clip_count": total,
+            "analyzed_count": len(predictions),
+            "failed_count": total - len(predictions)
+        }
+
     async def get_session(self, db: Session, session_id: int, user_id: int) -> DiagnosisSession:
         """获取诊断会话"""
         session = db.query(DiagnosisSession).filter(
@@ -251,19 +844,8 @@ class VoiceAnalysisService:
                     "prediction": voice_metrics.model_prediction,
                     "confidence": voice_metrics.model_confidence,
                     "features": {
-                        "mfcc": [
-                            voice_metrics.mfcc_1, voice_metrics.mfcc_2, voice_metrics.mfcc_3,
-                            voice_metrics.mfcc_4, voice_metrics.mfcc_5, voice_metrics.mfcc_6,
-                            voice_metrics.mfcc_7, voice_metrics.mfcc_8, voice_metrics.mfcc_9,
-                            voice_metrics.mfcc_10, voice_metrics.mfcc_11, voice_metrics.mfcc_12,
-                            voice_metrics.mfcc_13
-                        ],
-                        "chroma": [
-                            voice_metrics.chroma_1, voice_metrics.chroma_2, voice_metrics.chroma_3,
-                            voice_metrics.chroma_4, voice_metrics.chroma_5, voice_metrics.chroma_6,
-                            voice_metrics.chroma_7, voice_metrics.chroma_8, voice_metrics.chroma_9,
-                            voice_metrics.chroma_10, voice_metrics.chroma_11, voice_metrics.chroma_12
-                        ],
+                        "mfcc": voice_metrics.mfcc,
+                        "chroma": voice_metrics.chroma,
                         "rms": voice_metrics.rms,
                         "zcr": voice_metrics.zcr
                     }
@@ -322,46 +904,58 @@ class VoiceAnalysisService:
         """使用 LLMService 对诊断会话进行分析"""
         return await self.llm_service.analyze_with_llm(session_id, user_id)
     
+    @staticmethod
+    def history_record(record: VoiceMetrics) -> Dict[str, Any]:
+        """语音历史记录的一条（使用已加载的 record.session，不再查询会话）"""
+        session = record.session
+        return {
+            "id": int(record.id),
+            "session_id": int(record.session_id) if record.session_id else 0,
+            "created_at": record.created_at,
+            "prediction": str(record.model_prediction) if record.model_prediction else "",
+            "confidence": float(record.model_confidence) if record.model_confidence is not None else 0.0,
+            "diagnosis_suggestion": str(session.diagnosis_suggestion) if session and session.diagnosis_suggestion else None,
+            # 会话没有单独的LLM处理时间列，与分析历史一致使用会话时间
+            "llm_processed_at": session.created_at if session else None
+        }
+
     async def get_voice_history(
         self,
         user_id: int,
         page: int,
-        size: int
+        size: int,
+        cursor: Optional[str] = None,
+        with_total: bool = True,
+        offset: Optional[int] = None
     ) -> VoiceHistoryResponse:
-        """获取用户的语音分析历史记录"""
+        """
+        获取用户的语音分析历史记录
+
+        Args:
+            cursor: 上一页返回的游标，提供时忽略页码
+            with_total: 是否返回总数（进程内缓存的近似值）
+            offset: 直接指定偏移量（未提供时按页码计算）
+        """
         try:
-            # 计算分页偏移量
-            offset = (page - 1) * size
-            
-            # 获取历史记录
-            records, total = self.repository.get_voice_history(user_id, offset, size)
+            # 没有游标时按页码计算偏移量（兼容旧参数）
+            if offset is None:
+                offset = (page - 1) * size
             
-            # 构建响应数据
-            history = []
-            for record in records:
-                try:
-                    session = self.repository.get_session_by_id(record.id, user_id)
-                    
-                    history_record = {
-                        "id": int(record.id),
-                        "session_id": int(session.id) if session and session.id else 0,
-                        "created_at": record.created_at,
-                        "prediction": str(record.model_prediction) if record.model_prediction else "",
-                        "confidence": float(record.model_confidence) if record.model_confidence is not None else 0.0,
-                        "llm_suggestion": str(session.diagnosis_suggestion) if session and session.diagnosis_suggestion else None,
-                        "llm_processed_at": session.llm_processed_at if session else None
-                    }
-                    history.append(history_record)
-                except Exception as e:
-                    continue
+            # 获取历史记录（record.session 已随记录加载）
+            records, next_cursor = self.repository.get_voice_history(user_id, size, cursor=cursor, offset=offset)
+            history = [self.history_record(record) for record in records]
+            total = self.repository.count_voice_history(user_id) if with_total else None
             
             return VoiceHistoryResponse(
-                total=int(total),
+                total=total,
                 page=int(page),
                 size=int(size),
-                records=history
+                records=history,
+                next_cursor=next_cursor
             )
             
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
         except Exception as e:
             logger.error(f"获取语音历史记录失败: {str(e)}", exc_info=True)
             raise HTTPException(
@@ -391,270 +985,11 @@ class VoiceAnalysisService:
                 detail=f"获取失败: {str(e)}"
             )
     
-    async def _process_voice_file(
-        self,
-        file_path: str,
-        session_id: int,
-        user_id: int
-    ) -> None:
-        """处理语音文件（后台任务）"""
-        try:
-            logger.info(f"[_process_voice_file] 开始处理 session_id={session_id}, file_path={file_path}")
-            # 提取语音特征
-            logger.info(f"[_process_voice_file] 开始特征提取")
-            features = await self._extract_voice_features(file_path)
-            logger.info(f"[_process_voice_file] 特征提取完成: {features}")
-            # 使用模型进行预测
-            logger.info(f"[_process_voice_file] 开始健康预测")
-            prediction = await self._predict_health_status(file_path)
-            logger.info(f"[_process_voice_file] 健康预测完成: {prediction}")
-            # 保存语音指标
-            logger.info(f"[_process_voice_file] 保存语音指标到数据库")
-            self.repository.save_voice_metrics(
-                session_id=session_id,
-                user_id=user_id,
-                features=features,
-                prediction=prediction
-            )
-            logger.info(f"[_process_voice_file] 语音指标保存完成")
-            # 标记会话为已完成
-            self.repository.mark_session_completed(session_id)
-            logger.info(f"[_process_voice_file] 会话标记为已完成")
-            # 自动调用LLM分析并保存结果
-            try:
-                logger.info(f"[_process_voice_file] 开始自动调用LLM分析")
-                llm_result = await self.analyze_with_llm(session_id, user_id)
-                logger.info(f"[_process_voice_file] LLM分析完成: {llm_result}")
-            except Exception as llm_e:
-                logger.error(f"[_process_voice_file] 自动调用LLM分析失败: {str(llm_e)}", exc_info=True)
-        except Exception as e:
-            logger.error(f"[_process_voice_file] 处理语音文件失败: {str(e)}", exc_info=True)
-            # 标记会话为失败
-            self.repository.mark_session_failed(session_id)
-    
-    async def _extract_voice_features(self, file_path: str) -> dict:
-        """使用工具箱中的模型工具提取语音特征"""
-        logger.info(f"[_extract_voice_features] 开始从文件提取特征: {file_path}")
-        try:
-            # 使用工具箱中的create_model创建模型实例
-            model = create_model()
-            logger.info(f"[_extract_voice_features] 模型创建成功，调用get_features")
-            
-            # 调用模型的get_features方法提取特征
-            features_arr = model.get_features(file_path)
-            logger.info(f"[_extract_voice_features] 特征提取成功，特征数组长度: {len(features_arr)}")
-            
-            # 将特征数组拆分为字典格式，便于后续存库
-            features = {
-                "zcr": float(features_arr[0]),
-                "chroma": [float(x) for x in features_arr[1:13]],
-                "mfcc": [float(x) for x in features_arr[13:26]],
-                "rms": float(features_arr[26]),
-                "mel_spectrogram": float(features_arr[27]) if len(features_arr) > 27 else None
-            }
-            
-            logger.info(f"[_extract_voice_features] 特征转换完成: zcr={features['zcr']}, rms={features['rms']}")
-            return features
-        except Exception as e:
-            logger.error(f"[_extract_voice_features] 特征提取失败: {str(e)}", exc_info=True)
-            # 返回空特征，避免后续处理崩溃
-            return {
-                "zcr": 0.0,
-                "chroma": [0.0] * 12,
-                "mfcc": [0.0] * 13,
-                "rms": 0.0,
-                "mel_spectrogram": None
-            }
-
-    async def _predict_health_status(self, file_path: str) -> dict:
-        """使用语音模型进行健康状态预测"""
-        logger.info(f"[_predict_health_status] 调用voice_models_utils.AnalysisModel.get_pred")
-        try:
-            # 创建模型实例
-            model = create_model()
-            # 使用模型进行预测
-            prediction_label = model.get_pred(file_path)
-            
-            # 不再使用固定置信度，而是基于音频质量评估
-            # 评估音频质量并生成置信度分数
-            audio_quality_score = await self._evaluate_audio_quality(file_path)
-            logger.info(f"[_predict_health_status] 音频质量评分: {audio_quality_score}")
-            
-            # 将音频质量评分作为置信度返回
-            confidence = audio_quality_score
-            
-            logger.info(f"[_predict_health_status] 预测结果: {prediction_label}, 置信度(基于音频质量): {confidence}")
-            
-            return {
-                "prediction": prediction_label,
-                "confidence": confidence
-            }
-        except Exception as e:
-            logger.error(f"[_predict_health_status] 预测失败: {str(e)}", exc_info=True)
-            return {
-                "prediction": "未知",
-                "confidence": 0.0
-            }
-            
-    async def _evaluate_audio_quality(self, file_path: str) -> float:
-        """
-        评估音频质量，生成质量评分 (0-1范围)
-        
-        评分标准:
-        - 信噪比 (SNR)
-        - 音频能量和稳定性
-        - 语音频率特征
-        - 静音段比例
-        - 过零率规律性
-        - 语音活动检测 (VAD)
-        - 呼吸声特征验证
-        
-        质量越差，分数越低，表示分析结果越不可信
-        """
-        try:
-            # 加载音频文件
-            y, sr = librosa.load(file_path, sr=None)
-            
-            # 1. 计算信噪比 (估计值)
-            # 使用短时能量方差作为噪声水平评估
-            frame_length = int(sr * 0.025)  # 25ms 帧
-            hop_length = int(sr * 0.010)    # 10ms 跨步
-            
-            # 计算短时能量
-            energy = np.array([
-                sum(abs(y[i:i+frame_length]**2)) 
-                for i in range(0, len(y)-frame_length, hop_length)
-            ])
-            
-            # 使用能量方差评估噪声
-            energy_mean = np.mean(energy)
-            energy_std = np.std(energy)
-            energy_var = energy_std / energy_mean if energy_mean > 0 else 0
-            
-            # 将方差归一化为质量分数 (方差越大，质量越差)
-            energy_score = max(0, 1 - min(1, energy_var * 2))
-            
-            # 2. 评估音频长度是否足够
-            duration = len(y) / sr
-            duration_score = min(1.0, duration / 2.0)
-            
-            # 3. 静音段比例 (静音太多质量差)
-            silence_threshold = 0.01 * np.max(np.abs(y))
-            silence_ratio = np.sum(np.abs(y) < silence_threshold) / len(y)
-            silence_score = 1.0 - max(0, min(1.0, (silence_ratio - 0.2) / 0.6))
-            
-            # 如果静音比例过高，直接判定为低质量录音
-            if silence_ratio > 0.7:  # 超过70%是静音
-                logger.warning(f"[_evaluate_audio_quality] 检测到静音比例过高: {silence_ratio:.2f}")
-                return 0.3  # 返回较低的质量分数
-            
-            # 4. 过零率规律性 (语音应该有一定规律性)
-            zcr = librosa.feature.zero_crossing_rate(y)[0]
-            zcr_std = np.std(zcr)
-            zcr_score = min(1.0, zcr_std * 25)
-            
-            # 5. 频谱质心的变化 (自然语音有丰富的变化)
-            spectral_centroid = librosa.feature.spectral_centroid(y=y, sr=sr)[0]
-            spectral_score = min(1.0, np.std(spectral_centroid) / 400)
-            
-            # 6. **新增**: 语音活动检测 (VAD)
-            # 使用短时能量和过零率特征进行简单VAD
-            energy_frames = librosa.feature.rms(y=y, frame_length=frame_length, hop_length=hop_length)[0]
-            
-            # 设置能量阈值 (基于音频能量分布)
-            energy_threshold = 0.05 * np.max(energy_frames)
-            
-            # 计算声音活动帧的比例
-            active_frames = np.sum(energy_frames > energy_threshold) / len(energy_frames)
-            
-            # VAD得分: 至少要有一定比例的有声帧才能得到高分
-            vad_score = min(1.0, active_frames / 0.3)  # 要求至少30%的帧有声音活动
-            
-            # 如果几乎没有声音活动，大幅降低总评分
-            if active_frames < 0.1:  # 不足10%的帧有声音活动
-                logger.warning(f"[_evaluate_audio_quality] 几乎没有检测到声音活动: {active_frames:.2f}")
-                return 0.3  # 返回较低的质量分数
-            
-            # 7. **新增**: 呼吸声特征验证
-            # 计算呼吸声频率范围内的能量 (典型呼吸声频率为200-800Hz)
-            respiration_band = [200, 800]
-            
-            # 计算FFT
-            n_fft = 2048
-            D = np.abs(librosa.stft(y, n_fft=n_fft))
-            
-            # 获取频率范围
-            freqs = librosa.fft_frequencies(sr=sr, n_fft=n_fft)
-            
-            # 提取呼吸声频率范围内的能量
-            resp_mask = (freqs >= respiration_band[0]) & (freqs <= respiration_band[1])
-            resp_energy = np.mean(D[resp_mask, :])
-            
-            # 计算总能量
-            total_energy = np.mean(D)
-            
-            # 呼吸特征比例 (呼吸声频率范围内的能量占比)
-            resp_ratio = resp_energy / total_energy if total_energy > 0 else 0
-            
-            # 呼吸声特征得分 (在呼吸声典型频率范围内应有一定能量)
-            respiration_score = min(1.0, resp_ratio * 10)
-            
-            # 如果呼吸频率范围的能量占比太低，可能不是呼吸声或语音
-            if resp_ratio < 0.05:  # 小于5%的能量在呼吸声频率范围
-                logger.warning(f"[_evaluate_audio_quality] 呼吸声特征比例过低: {resp_ratio:.4f}")
-                # 降低分数，但不要完全否决
-                respiration_score = respiration_score * 0.5
-            
-            # 综合得分 (调整权重，加入VAD和呼吸声特征)
-            weights = {
-                'energy': 0.15,      # 降低原始指标权重
-                'duration': 0.10,
-                'silence': 0.15,
-                'zcr': 0.10,
-                'spectral': 0.10,
-                'vad': 0.25,         # 语音活动检测权重较高
-                'respiration': 0.15  # 呼吸声特征检测
-            }
-            
-            quality_score = (
-                weights['energy'] * energy_score +
-                weights['duration'] * duration_score +
-                weights['silence'] * silence_score +
-                weights['zcr'] * zcr_score +
-                weights['spectral'] * spectral_score +
-                weights['vad'] * vad_score +
-                weights['respiration'] * respiration_score
-            )
-            
-            # 调整基础分数，考虑VAD和呼吸声特征的重要性
-            base_score = 0.3
-            quality_score = base_score + (1.0 - base_score) * quality_score
-            
-            # 应用更严格的最低标准
-            quality_score = max(0.2, min(0.95, quality_score))
-            
-            logger.info(f"[_evaluate_audio_quality] 音频质量分析: "
-                      f"能量={energy_score:.2f}, "
-                      f"长度={duration_score:.2f}, "
-                      f"静音={silence_score:.2f}, "
-                      f"过零={zcr_score:.2f}, "
-                      f"频谱={spectral_score:.2f}, "
-                      f"VAD={vad_score:.2f}, "
-                      f"呼吸={respiration_score:.2f}, "
-                      f"总分={quality_score:.2f}")
-                      
-            return quality_score
-            
-        except Exception as e:
-            logger.error(f"[_evaluate_audio_quality] 音频质量评估失败: {str(e)}", exc_info=True)
-            # 默认返回中等偏低分数
-            return 0.4
-    
     def _build_analysis_prompt(self, voice_metrics: VoiceMetrics) -> str:
         """构建分析提示词"""
         # 获取语音特征
-        mfcc_values = [getattr(voice_metrics, f"mfcc_{i}") for i in range(1, 14)]
-        chroma_values = [getattr(voice_metrics, f"chroma_{i}") for i in range(1, 13)]
+        mfcc_values = voice_metrics.mfcc
+        chroma_values = voice_metrics.chroma
         
         # 构建提示词
         prompt = f"""
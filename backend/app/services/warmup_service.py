@@ -0,0 +1,149 @@
+"""
+启动预热与就绪状态
+应用启动后在后台并发预热各组件，必需项全部完成前 /readyz 返回 503，
+滚动发布时负载均衡不会把流量转发到未预热的进程：
+- database: 建立连接池中的全部常驻连接
+- model: 主进程加载并预热模型注册表，同时走一遍解码、特征提取（numba JIT）和质量评估
+- workers: 启动分析进程池的全部工作进程，每个进程初始化时各自预热
+- llm: 预先建立到LLM API的连接（可选项，失败不影响就绪）
+必需项预热失败时按 WARM_UP_RETRY_INTERVAL 在后台重试，直到成功
+"""
+
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from sqlalchemy import text
+
+from app.core.config import settings
+from app.core.llm import get_llm_client
+from app.db.session import engine
+from app.services.analysis_executor import analysis_executor
+from app.services.analysis_pipeline import warm_up_analysis
+
+logger = logging.getLogger(__name__)
+
+
+def _warm_up_database() -> Dict[str, Any]:
+    """建立连接池中的全部常驻连接并各执行一次查询，归还后留在池中供请求复用"""
+    size = engine.pool.size() if hasattr(engine.pool, "size") else 1
+    connections = []
+    try:
+        for _ in range(size):
+            connection = engine.connect()
+            connections.append(connection)
+            connection.execute(text("SELECT 1"))
+    except Exception:
+        logger.warning("[_warm_up_database] 请确保MySQL服务正在运行并且已经初始化数据库，可以使用 'python init_mysql_db.py' 初始化数据库")
+        raise
+    finally:
+        for connection in connections:
+            connection.close()
+    logger.info(f"[_warm_up_database] 成功连接到MySQL数据库: {settings.MYSQL_DATABASE}, 连接数={len(connections)}")
+    return {"connections": len(connections)}
+
+
+async def _run_blocking(fn: Callable[[], Any]) -> Any:
+    """在线程池中执行阻塞的预热步骤，不阻塞事件循环"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(None, fn)
+
+
+class WarmUpService:
+    """进程内的启动预热与就绪状态"""
+
+    def __init__(self):
+        self.started_at = time.time()
+        self.warm_up_finished_at: Optional[float] = None
+        self._components: Dict[str, Dict[str, Any]] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    def _steps(self) -> Dict[str, Tuple[Callable[[], Awaitable[Any]], bool]]:
+        """预热步骤：名称 -> (异步预热函数, 是否为就绪必需项)"""
+        return {
+            "database": (lambda: _run_blocking(_warm_up_database), True),
+            "model": (lambda: _run_blocking(warm_up_analysis), True),
+            "workers": (analysis_executor.warm_up, True),
+            "llm": (get_llm_client().warm_up, False)
+        }
+
+    def start(self) -> None:
+        """在后台开始预热（应用启动时调用，不阻塞启动，/healthz 立即可用）"""
+        steps = self._steps()
+        for name, (_, required) in steps.items():
+            self._components[name] = {
+                "status": "pending" if settings.WARM_UP_ENABLED else "skipped",
+                "required": required,
+                "attempts": 0,
+                "seconds": None,
+                "detail": None,
+                "error": None
+            }
+        if not settings.WARM_UP_ENABLED:
+            logger.info("[WarmUpService.start] 未启用启动预热")
+            self.warm_up_finished_at = time.time()
+            return
+        self._task = asyncio.create_task(self._run(steps))
+
+    async def _warm(self, name: str, step: Callable[[], Awaitable[Any]]) -> None:
+        """执行单项预热并记录结果"""
+        component = self._components[name]
+        component["status"] = "warming"
+        component["attempts"] += 1
+        start = time.perf_counter()
+        try:
+            component["detail"] = await asyncio.wait_for(step(), timeout=settings.WARM_UP_TIMEOUT)
+            component["status"] = "ready"
+            component["error"] = None
+            logger.info(f"[WarmUpService._warm] 预热完成: {name}, 耗时={time.perf_counter() - start:.3f}s")
+        except Exception as e:
+            component["status"] = "failed"
+            component["error"] = str(e) or type(e).__name__
+            logger.error(f"[WarmUpService._warm] 预热失败: {name}, 第{component['attempts']}次, {component['error']}")
+        finally:
+            component["seconds"] = time.perf_counter() - start
+
+    async def _run(self, steps: Dict[str, Tuple[Callable[[], Awaitable[Any]], bool]]) -> None:
+        """并发执行全部预热步骤，必需项失败时定期重试"""
+        start = time.perf_counter()
+        await asyncio.gather(*[self._warm(name, step) for name, (step, _) in steps.items()])
+        while not self.ready:
+            await asyncio.sleep(settings.WARM_UP_RETRY_INTERVAL)
+            await asyncio.gather(*[
+                self._warm(name, step) for name, (step, required) in steps.items()
+                if required and self._components[name]["status"] != "ready"
+            ])
+        self.warm_up_finished_at = time.time()
+        logger.info(f"[WarmUpService._run] 启动预热全部完成，耗时={time.perf_counter() - start:.3f}s")
+
+    @property
+    def ready(self) -> bool:
+        """必需项是否全部预热完成"""
+        return bool(self._components) and all(
+            component["status"] in ("ready", "skipped")
+            for component in self._components.values() if component["required"]
+        )
+
+    def info(self) -> Dict[str, Any]:
+        """预热状态"""
+        return {
+            "ready": self.ready,
+            "uptime": time.time() - self.started_at,
+            "warm_up_finished_at": self.warm_up_finished_at,
+            "components": {name: dict(component) for name, component in self._components.items()}
+        }
+
+    async def stop(self) -> None:
+        """停止尚未完成的预热并关闭LLM HTTP客户端（应用关闭时调用）"""
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        await get_llm_client().aclose()
+
+
+# 全局唯一WarmUpService实例（每个进程各自一份）
+warm_up_service = WarmUpService()
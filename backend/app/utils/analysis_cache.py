@@ -0,0 +1,218 @@
+"""
+分析结果缓存
+以解码后PCM的内容哈希 + 特征版本 + 模型版本为键，缓存特征向量、SVM预测标签和音频质量评分。
+客户端超时重试上传相同音频时，直接返回缓存结果，不再重新跑特征提取流水线。
+- 内存层：进程内有界LRU
+- 磁盘层：SQLite（WAL模式），分析进程池的各工作进程共享，进程重启后仍然有效
+"""
+
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# 磁盘层每写入多少条检查一次容量上限
+DISK_TRIM_INTERVAL = 100
+
+
+def pcm_hash(y: np.ndarray, sr: int) -> str:
+    """解码后PCM信号的内容哈希"""
+    digest = hashlib.sha256()
+    digest.update(str(int(sr)).encode())
+    digest.update(np.ascontiguousarray(y, dtype=np.float32).tobytes())
+    return digest.hexdigest()
+
+
+class AnalysisCache:
+    """两级（内存LRU + SQLite）分析结果缓存"""
+
+    def __init__(
+        self,
+        max_entries: Optional[int] = None,
+        disk_path: Optional[str] = None,
+        disk_max_entries: Optional[int] = None,
+        enabled: Optional[bool] = None
+    ):
+        """
+        初始化缓存（SQLite连接在首次访问时才建立）
+
+        Args:
+            max_entries: 内存层最多缓存的条目数
+            disk_path: SQLite文件路径，为空时不启用磁盘层
+            disk_max_entries: 磁盘层最多保留的条目数
+            enabled: 是否启用缓存
+        """
+        self.enabled = settings.ANALYSIS_CACHE_ENABLED if enabled is None else enabled
+        self.max_entries = settings.ANALYSIS_CACHE_SIZE if max_entries is None else max_entries
+        self.disk_path = settings.ANALYSIS_CACHE_PATH if disk_path is None else disk_path
+        self.disk_max_entries = disk_max_entries or settings.ANALYSIS_CACHE_DISK_MAX_ENTRIES
+        self._lock = threading.Lock()
+        self._memory: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._disk_writes = 0
+        self._hits_memory = 0
+        self._hits_disk = 0
+        self._misses = 0
+
+    @staticmethod
+    def make_key(pcm_digest: str, feature_version: str, model_version: str) -> str:
+        """缓存键：PCM哈希 + 特征版本 + 模型版本"""
+        return f"{pcm_digest}:{feature_version}:{model_version}"
+
+    def _get_conn(self) -> Optional[sqlite3.Connection]:
+        if not self.disk_path:
+            return None
+        if self._conn is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.disk_path)), exist_ok=True)
+            conn = sqlite3.connect(self.disk_path, timeout=5, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS analysis_cache ("
+                "key TEXT PRIMARY KEY, "
+                "features BLOB NOT NULL, "
+                "prediction TEXT, "
+                "confidence REAL, "
+                "duration REAL, "
+                "created_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS ix_analysis_cache_created_at ON analysis_cache (created_at)")
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    def _remember(self, key: str, entry: Dict[str, Any]) -> None:
+        """写入内存层并按LRU淘汰（调用方持有锁）"""
+        self._memory[key] = entry
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """
+        查询缓存
+
+        Returns:
+            {"features", "prediction", "confidence", "duration", "tier"}，未命中返回 None
+        """
+        if not self.enabled:
+            return None
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                self._memory.move_to_end(key)
+                self._hits_memory += 1
+                return dict(entry, tier="memory")
+            try:
+                conn = self._get_conn()
+                row = conn.execute(
+                    "SELECT features, prediction, confidence, duration FROM analysis_cache WHERE key = ?",
+                    (key,)
+                ).fetchone() if conn is not None else None
+            except sqlite3.Error as e:
+                logger.warning(f"[AnalysisCache.get] 读取磁盘缓存失败: {str(e)}")
+                row = None
+            if row is None:
+                self._misses += 1
+                return None
+            entry = {
+                "features": np.frombuffer(row[0], dtype=np.float64),
+                "prediction": row[1],
+                "confidence": row[2],
+                "duration": row[3]
+            }
+            self._remember(key, entry)
+            self._hits_disk += 1
+            return dict(entry, tier="disk")
+
+    def put(
+        self,
+        key: str,
+        features: np.ndarray,
+        prediction: Optional[str],
+        confidence: Optional[float],
+        duration: Optional[float]
+    ) -> None:
+        """写入缓存（内存层和磁盘层）"""
+        if not self.enabled:
+            return
+        features = np.ascontiguousarray(features, dtype=np.float64)
+        entry = {
+            "features": features,
+            "prediction": prediction,
+            "confidence": confidence,
+            "duration": duration
+        }
+        with self._lock:
+            self._remember(key, entry)
+            try:
+                conn = self._get_conn()
+                if conn is None:
+                    return
+                conn.execute(
+                    "INSERT OR REPLACE INTO analysis_cache (key, features, prediction, confidence, duration, created_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (key, features.tobytes(), prediction, confidence, duration, time.time())
+                )
+                self._disk_writes += 1
+                if self._disk_writes % DISK_TRIM_INTERVAL == 0:
+                    self._trim_disk(conn)
+                conn.commit()
+            except sqlite3.Error as e:
+                logger.warning(f"[AnalysisCache.put] 写入磁盘缓存失败: {str(e)}")
+
+    def _trim_disk(self, conn: sqlite3.Connection) -> None:
+        """磁盘层超过容量上限时删除最早写入的条目"""
+        count = conn.execute("SELECT COUNT(*) FROM analysis_cache").fetchone()[0]
+        overflow = count - self.disk_max_entries
+        if overflow > 0:
+            conn.execute(
+                "DELETE FROM analysis_cache WHERE key IN "
+                "(SELECT key FROM analysis_cache ORDER BY created_at ASC LIMIT ?)",
+                (overflow,)
+            )
+            logger.info(f"[AnalysisCache._trim_disk] 淘汰磁盘缓存 {overflow} 条")
+
+    def record(self, tier: Optional[str]) -> None:
+        """
+        记录一次在其他进程中完成的缓存查询结果
+        （分析在工作进程中执行，主进程根据返回的命中层级汇总计数）
+        """
+        with self._lock:
+            if tier == "memory":
+                self._hits_memory += 1
+            elif tier == "disk":
+                self._hits_disk += 1
+            else:
+                self._misses += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """缓存命中统计"""
+        with self._lock:
+            hits = self._hits_memory + self._hits_disk
+            lookups = hits + self._misses
+            return {
+                "enabled": self.enabled,
+                "memory_entries": len(self._memory),
+                "max_entries": self.max_entries,
+                "disk_path": self.disk_path,
+                "hits": hits,
+                "hits_memory": self._hits_memory,
+                "hits_disk": self._hits_disk,
+                "misses": self._misses,
+                "hit_rate": hits / lookups if lookups else 0.0
+            }
+
+
+# 全局唯一AnalysisCache实例（每个进程各自的内存层，共享同一个磁盘层）
+analysis_cache = AnalysisCache()
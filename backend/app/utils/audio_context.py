@@ -0,0 +1,129 @@
+"""
+音频分析上下文
+一次解码音频，惰性缓存分帧信号、幅度谱(STFT)和梅尔功率谱，
+供特征提取、SVM预测和音频质量评估共享使用
+"""
+
+import logging
+import os
+from typing import Any, Callable, Dict, Hashable, Optional
+
+import librosa
+import numpy as np
+
+from app.core.config import settings
+from app.utils import feature_engine
+from app.utils.audio_decoder import decode_audio_bytes, resample
+
+logger = logging.getLogger(__name__)
+
+
+class AudioAnalysisContext:
+    """单次上传的音频分析上下文（同一音频只解码一次）"""
+
+    def __init__(self, y: np.ndarray, sr: int, source: Optional[str] = None):
+        """
+        初始化分析上下文
+
+        Args:
+            y: 单声道音频信号
+            sr: 采样率
+            source: 音频来源（文件路径等，仅用于日志）
+        """
+        self.y = np.ascontiguousarray(y, dtype=np.float32)
+        self.sr = int(sr)
+        self.source = source
+        self._cache: Dict[Hashable, Any] = {}
+
+    @classmethod
+    def from_file(cls, path: str, sr: Optional[int] = None) -> "AudioAnalysisContext":
+        """从音频文件解码（默认解码为流水线采样率，与上传字节走同一套解码后端）"""
+        with open(path, "rb") as f:
+            content = f.read()
+        y, sample_rate = decode_audio_bytes(content, os.path.splitext(path)[-1], sr)
+        logger.info(f"[AudioAnalysisContext.from_file] 解码完成: {path}, sr={sample_rate}, samples={len(y)}")
+        return cls(y, sample_rate, source=path)
+
+    @classmethod
+    def from_bytes(
+        cls,
+        content: bytes,
+        file_ext: Optional[str] = None,
+        source: Optional[str] = None
+    ) -> "AudioAnalysisContext":
+        """直接从上传的字节在内存中解码（默认解码为流水线采样率）"""
+        y, sample_rate = decode_audio_bytes(content, file_ext)
+        logger.info(f"[AudioAnalysisContext.from_bytes] 解码完成: ext={file_ext}, sr={sample_rate}, samples={len(y)}")
+        return cls(y, sample_rate, source=source)
+
+    @property
+    def duration(self) -> float:
+        """音频时长（秒）"""
+        return len(self.y) / self.sr if self.sr else 0.0
+
+    def cached(self, key: Hashable, factory: Callable[[], Any]) -> Any:
+        """按键缓存任意派生结果，首次访问时计算"""
+        if key not in self._cache:
+            self._cache[key] = factory()
+        return self._cache[key]
+
+    def peek(self, key: Hashable) -> Any:
+        """读取已缓存的派生结果，未计算过时返回 None"""
+        return self._cache.get(key)
+
+    def frames(
+        self,
+        frame_length: int = 2048,
+        hop_length: int = 512,
+        center: bool = True,
+        pad_mode: str = "constant"
+    ) -> np.ndarray:
+        """分帧后的信号 (frame_length, n_frames)，与 librosa.feature.rms 的分帧方式一致"""
+        def _frame():
+            y = self.y
+            if center:
+                pad = frame_length // 2
+                y = np.pad(y, (pad, pad), mode=pad_mode)
+            # stride 视图分帧，与 librosa.util.frame 结果相同，但不会触发 librosa.util 的 numba 初始化
+            return feature_engine.frame_signal(y, frame_length, hop_length).T
+        return self.cached(("frames", frame_length, hop_length, center, pad_mode), _frame)
+
+    def stft_magnitude(self, n_fft: int = 2048, hop_length: int = 512) -> np.ndarray:
+        """幅度谱 |STFT|（按配置的特征提取引擎计算）"""
+        def _stft():
+            if settings.FEATURE_ENGINE == "numpy":
+                return feature_engine.stft_magnitude(self.y, n_fft, hop_length)
+            return np.abs(librosa.stft(self.y, n_fft=n_fft, hop_length=hop_length))
+        return self.cached(("stft", n_fft, hop_length), _stft)
+
+    def mel_power(self, n_fft: int = 2048, hop_length: int = 512, n_mels: int = 128) -> np.ndarray:
+        """梅尔功率谱，复用同一份幅度谱"""
+        def _mel():
+            S = self.stft_magnitude(n_fft, hop_length)
+            if settings.FEATURE_ENGINE == "numpy":
+                return feature_engine.mel_power(S, self.sr, n_fft, n_mels)
+            return librosa.feature.melspectrogram(
+                S=S ** 2,
+                sr=self.sr,
+                n_fft=n_fft,
+                hop_length=hop_length,
+                n_mels=n_mels
+            )
+        return self.cached(("mel", n_fft, hop_length, n_mels), _mel)
+
+    def segment(self, offset: float, duration: float, sr: int) -> "AudioAnalysisContext":
+        """
+        截取片段并重采样为新的上下文（与 librosa.load(offset=, duration=, sr=) 的取样方式一致）
+
+        Args:
+            offset: 起始时间（秒）
+            duration: 片段时长（秒）
+            sr: 目标采样率
+        """
+        def _segment():
+            start = int(offset * self.sr)
+            end = start + int(duration * self.sr)
+            # 流水线采样率与目标采样率一致时（默认配置）不再重采样
+            y = resample(self.y[start:end], self.sr, sr)
+            return AudioAnalysisContext(y, sr, source=self.source)
+        return self.cached(("segment", offset, duration, sr), _segment)
@@ -0,0 +1,204 @@
+"""
+内存音频解码
+直接从上传的字节解码为 float32 单声道 NumPy 数组，不再经过磁盘中转。
+解码后端按文件头（magic bytes）选择，而不是依赖文件名：
+- wav/flac/ogg/aiff 通过 soundfile 读取内存缓冲区
+- webm/opus/mp3/mp4 通过 PyAV 在进程内解码并重采样
+- 以上都无法处理的格式，由调用方使用 ffmpeg 异步子进程流式解码兜底
+所有后端都直接输出统一的流水线采样率（settings.PIPELINE_SAMPLE_RATE），
+后续特征提取、质量评估和麦克风测试不再各自重采样
+"""
+
+import asyncio
+import io
+import logging
+from typing import Optional, Tuple
+
+import librosa
+import numpy as np
+import soundfile as sf
+
+try:
+    import av  # PyAV 为可选依赖，缺失时压缩格式走 ffmpeg 子进程兜底
+except ImportError:
+    av = None
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# soundfile(libsndfile) 原生支持的格式
+SOUNDFILE_FORMATS = {"wav", "flac", "ogg", "aiff"}
+
+# ffmpeg 流式解码时每次读取的字节数
+FFMPEG_READ_CHUNK = 64 * 1024
+
+
+class AudioDecodeError(Exception):
+    """音频无法解码"""
+    pass
+
+
+class UnsupportedAudioFormatError(AudioDecodeError):
+    """进程内解码器不支持该格式，需要使用 ffmpeg 子进程兜底"""
+    pass
+
+
+def sniff_audio_format(content: bytes) -> Optional[str]:
+    """
+    根据文件头识别音频格式
+
+    Returns:
+        格式名（wav/flac/ogg/opus/aiff/webm/mp3/mp4），无法识别时返回 None
+    """
+    header = bytes(content[:64])
+    if header[:4] == b"RIFF" and header[8:12] == b"WAVE":
+        return "wav"
+    if header[:4] == b"fLaC":
+        return "flac"
+    if header[:4] == b"OggS":
+        # Ogg 容器内可能是 Vorbis 或 Opus，Opus 的首个数据包以 OpusHead 开头
+        return "opus" if b"OpusHead" in header else "ogg"
+    if header[:4] == b"FORM" and header[8:12] in (b"AIFF", b"AIFC"):
+        return "aiff"
+    if header[:4] == b"\x1a\x45\xdf\xa3":
+        # EBML 头（webm/matroska）
+        return "webm"
+    if header[4:8] == b"ftyp":
+        return "mp4"
+    if header[:3] == b"ID3" or (len(header) > 1 and header[0] == 0xFF and (header[1] & 0xE0) == 0xE0):
+        return "mp3"
+    return None
+
+
+def _to_mono(data: np.ndarray) -> np.ndarray:
+    """多声道取均值转为单声道（与 librosa.to_mono 一致）"""
+    y = data[:, 0] if data.shape[1] == 1 else np.mean(data, axis=1)
+    return np.ascontiguousarray(y, dtype=np.float32)
+
+
+def resample(y: np.ndarray, orig_sr: int, target_sr: int, quality: Optional[str] = None) -> np.ndarray:
+    """
+    按配置的重采样质量重采样（采样率相同时直接返回）
+
+    Args:
+        quality: librosa 的 res_type（如 soxr_hq、soxr_qq），默认使用 settings.RESAMPLE_QUALITY
+    """
+    if orig_sr == target_sr:
+        return y
+    return librosa.resample(y, orig_sr=orig_sr, target_sr=target_sr, res_type=quality or settings.RESAMPLE_QUALITY)
+
+
+def decode_with_soundfile(content: bytes, sr: Optional[int] = None) -> Tuple[np.ndarray, int]:
+    """使用 soundfile 从内存缓冲区解码，并重采样到流水线采样率"""
+    data, native_sr = sf.read(io.BytesIO(content), dtype="float32", always_2d=True)
+    target_sr = sr or settings.PIPELINE_SAMPLE_RATE
+    return resample(_to_mono(data), int(native_sr), target_sr), target_sr
+
+
+def decode_with_pyav(content: bytes, sr: Optional[int] = None) -> Tuple[np.ndarray, int]:
+    """使用 PyAV 在进程内解码压缩音频，解码时直接重采样为流水线采样率的单声道 float32"""
+    if av is None:
+        raise UnsupportedAudioFormatError("未安装PyAV，无法在进程内解码该格式")
+    try:
+        with av.open(io.BytesIO(content), mode="r") as container:
+            if not container.streams.audio:
+                raise AudioDecodeError("文件中没有音频流")
+            stream = container.streams.audio[0]
+            target_sr = sr or settings.PIPELINE_SAMPLE_RATE
+            resampler = av.AudioResampler(format="flt", layout="mono", rate=target_sr)
+            chunks = []
+            for frame in container.decode(stream):
+                for out in resampler.resample(frame):
+                    chunks.append(out.to_ndarray().reshape(-1))
+            # 取出重采样器中剩余的样本
+            for out in resampler.resample(None):
+                chunks.append(out.to_ndarray().reshape(-1))
+    except AudioDecodeError:
+        raise
+    except Exception as e:
+        raise UnsupportedAudioFormatError(f"PyAV解码失败: {str(e)}")
+    if not chunks:
+        raise AudioDecodeError("解码结果为空，音频文件可能已损坏")
+    return np.concatenate(chunks).astype(np.float32, copy=False), int(target_sr)
+
+
+def decode_audio_bytes(content: bytes, file_ext: Optional[str] = None, sr: Optional[int] = None) -> Tuple[np.ndarray, int]:
+    """
+    在进程内将上传的音频字节解码为单声道 float32 信号
+
+    Args:
+        content: 音频文件内容
+        file_ext: 文件扩展名，仅在无法从文件头识别格式时作为参考
+        sr: 目标采样率，默认使用 settings.PIPELINE_SAMPLE_RATE
+
+    Returns:
+        (信号, 采样率)
+
+    Raises:
+        UnsupportedAudioFormatError: 进程内无法解码，需要调用 decode_with_ffmpeg_stream 兜底
+    """
+    fmt = sniff_audio_format(content) or (file_ext or "").lower().lstrip(".") or None
+    logger.info(f"[decode_audio_bytes] 识别音频格式: {fmt}")
+    if fmt in SOUNDFILE_FORMATS:
+        try:
+            return decode_with_soundfile(content, sr)
+        except Exception as e:
+            logger.warning(f"[decode_audio_bytes] soundfile解码失败，尝试PyAV: {str(e)}")
+    return decode_with_pyav(content, sr)
+
+
+async def decode_with_ffmpeg_stream(content: bytes, sr: Optional[int] = None) -> Tuple[np.ndarray, int]:
+    """
+    通过 ffmpeg 异步子进程流式解码（兜底方案，不阻塞事件循环）
+    输入经 stdin 写入，32 位浮点 PCM 从 stdout 分块读取，ffmpeg 直接输出流水线采样率
+    """
+    sr = sr or settings.PIPELINE_SAMPLE_RATE
+    cmd = [
+        "ffmpeg",
+        "-hide_banner",
+        "-loglevel", "error",
+        "-i", "pipe:0",
+        "-f", "f32le",          # 原始 32 位浮点 PCM
+        "-acodec", "pcm_f32le",
+        "-ar", str(sr),         # 采样率
+        "-ac", "1",             # 单声道
+        "pipe:1"
+    ]
+    try:
+        process = await asyncio.create_subprocess_exec(
+            *cmd,
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE
+        )
+    except FileNotFoundError:
+        raise AudioDecodeError("未找到ffmpeg，无法解码该格式")
+
+    async def _feed():
+        try:
+            process.stdin.write(content)
+            await process.stdin.drain()
+        except (BrokenPipeError, ConnectionResetError):
+            # ffmpeg 提前退出，错误信息由返回码和 stderr 给出
+            pass
+        finally:
+            process.stdin.close()
+
+    async def _read():
+        buffer = bytearray()
+        while True:
+            chunk = await process.stdout.read(FFMPEG_READ_CHUNK)
+            if not chunk:
+                return buffer
+            buffer.extend(chunk)
+
+    _, pcm, stderr = await asyncio.gather(_feed(), _read(), process.stderr.read())
+    returncode = await process.wait()
+    if returncode != 0:
+        raise AudioDecodeError(f"ffmpeg解码失败: {stderr.decode('utf-8', errors='ignore')}")
+    # 可用样本按 4 字节对齐，直接在读取缓冲区上构建数组
+    y = np.frombuffer(pcm, dtype=np.float32, count=len(pcm) // 4)
+    if len(y) == 0:
+        raise AudioDecodeError("解码结果为空，音频文件可能已损坏")
+    return y, sr
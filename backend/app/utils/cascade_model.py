@@ -0,0 +1,152 @@
+"""
+级联推理的第一级模型
+只使用低成本特征组（ZCR、MFCC、RMS，不需要色度特征）的线性分类器，置信间隔足够大时直接给出结果，
+其余样本再补算色度特征并交给SVM判断。
+- 由 scripts/train_cascade_model.py 在有标注的数据集上训练 StandardScaler + LogisticRegression，
+  导出为SVM模型文件旁的 <模型名>_cascade.npz
+- 导出只依赖估计器的属性，推理只依赖 NumPy（与 svm_inference 相同），工作进程无需导入 scikit-learn
+- 推理文件记录训练时对应的SVM模型文件哈希，模型热切换后旧的第一级模型不再生效
+"""
+
+import logging
+import os
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+
+from app.utils.feature_engine import FEATURE_GROUPS
+from app.utils.svm_inference import save_artifact, scaler_affine, source_digest
+
+logger = logging.getLogger(__name__)
+
+# 第一级推理文件格式版本，字段或计算方式变化时递增
+CASCADE_FORMAT = 1
+CASCADE_SUFFIX = "_cascade.npz"
+
+CHROMA_SLICE = FEATURE_GROUPS["chroma"]
+# 第一级使用的低成本特征：ZCR、MFCC、RMS
+LIGHT_FEATURE_INDICES = np.r_[FEATURE_GROUPS["zcr"], FEATURE_GROUPS["mfcc"], FEATURE_GROUPS["rms"]]
+
+
+def cascade_path(model_path: str) -> str:
+    """SVM模型文件对应的第一级模型文件路径（同目录，<模型名>_cascade.npz）"""
+    return os.path.splitext(model_path)[0] + CASCADE_SUFFIX
+
+
+def export_linear_stage(estimator: Any, source_version: str = "", feature_engine: str = "") -> Dict[str, np.ndarray]:
+    """
+    将已训练的 LogisticRegression（或以其结尾、前置缩放器的 Pipeline）导出为推理所需的数组
+
+    Args:
+        estimator: 在 LIGHT_FEATURE_INDICES 选出的特征上训练的分类器
+        source_version: 对应SVM模型文件的哈希
+        feature_engine: 训练时使用的特征提取引擎（仅用于记录）
+
+    Raises:
+        ValueError: 估计器或预处理步骤不受支持
+    """
+    steps = list(estimator.steps) if hasattr(estimator, "steps") else [(None, estimator)]
+    classifier = steps[-1][1]
+    kind = type(classifier).__name__
+    if kind != "LogisticRegression":
+        raise ValueError(f"不支持导出的第一级估计器: {kind}")
+    classes = np.asarray(classifier.classes_)
+    if classes.dtype == object:
+        classes = classes.astype(str)
+
+    coef = np.asarray(classifier.coef_, dtype=np.float64)
+    scale, offset = np.ones(coef.shape[1]), np.zeros(coef.shape[1])
+    for _, step in steps[:-1]:
+        if step is None or step == "passthrough":
+            continue
+        step_scale, step_offset = scaler_affine(step)
+        scale, offset = scale * step_scale, offset * step_scale + step_offset
+
+    return {
+        "format": np.array(CASCADE_FORMAT),
+        "source_version": np.array(source_version),
+        "feature_engine": np.array(feature_engine),
+        "feature_indices": LIGHT_FEATURE_INDICES.astype(np.int32),
+        "classes": classes,
+        "coef": coef,
+        "intercept": np.asarray(classifier.intercept_, dtype=np.float64),
+        "scale": scale,
+        "offset": offset
+    }
+
+
+class LinearStage:
+    """由导出数组构建的第一级线性分类器（仅依赖 NumPy）"""
+
+    def __init__(self, arrays: Dict[str, np.ndarray], digest: str = ""):
+        if int(arrays["format"]) != CASCADE_FORMAT:
+            raise ValueError(f"第一级模型文件格式版本不匹配: {int(arrays['format'])}")
+        self.digest = digest
+        self.source_version = str(arrays["source_version"])
+        self.feature_engine = str(arrays["feature_engine"])
+        self.feature_indices = np.asarray(arrays["feature_indices"], dtype=np.intp)
+        self.classes_ = arrays["classes"]
+        self.coef = np.asarray(arrays["coef"], dtype=np.float64)
+        self.intercept = np.asarray(arrays["intercept"], dtype=np.float64)
+        self.scale = np.asarray(arrays["scale"], dtype=np.float64)
+        self.offset = np.asarray(arrays["offset"], dtype=np.float64)
+
+    @classmethod
+    def load(cls, path: str) -> "LinearStage":
+        """从 .npz 文件加载，文件哈希作为第一级模型的版本"""
+        with np.load(path, allow_pickle=False) as data:
+            return cls({name: data[name] for name in data.files}, source_digest(path))
+
+    def predict_proba(self, X: Any) -> np.ndarray:
+        """
+        各类别概率
+
+        Args:
+            X: 162 维布局的特征向量（一行或多行），只读取低成本特征组，色度位置可以为 NaN
+        """
+        X = np.atleast_2d(np.asarray(X, dtype=np.float64))
+        Z = X[:, self.feature_indices] * self.scale + self.offset
+        scores = Z @ self.coef.T + self.intercept
+        if len(self.classes_) == 2:
+            positive = 1.0 / (1.0 + np.exp(-scores[:, 0]))
+            return np.column_stack((1.0 - positive, positive))
+        scores -= scores.max(axis=1, keepdims=True)
+        exp_scores = np.exp(scores)
+        return exp_scores / exp_scores.sum(axis=1, keepdims=True)
+
+    def decide(self, X: Any) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        预测标签及置信间隔（最高与次高类别概率之差，0-1）
+
+        Returns:
+            (labels, margins)
+        """
+        proba = self.predict_proba(X)
+        ordered = np.sort(proba, axis=1)
+        return self.classes_[np.argmax(proba, axis=1)], ordered[:, -1] - ordered[:, -2]
+
+
+def load_linear_stage(model_path: str) -> Optional[LinearStage]:
+    """
+    加载SVM模型文件对应的第一级模型
+
+    Returns:
+        LinearStage；文件不存在、格式不符或与SVM模型文件不一致时返回 None
+    """
+    path = cascade_path(model_path)
+    if not os.path.exists(path):
+        return None
+    try:
+        stage = LinearStage.load(path)
+    except Exception as e:
+        logger.warning(f"[load_linear_stage] 第一级模型文件无法加载: {path}, {str(e)}")
+        return None
+    if stage.source_version != source_digest(model_path):
+        logger.warning(f"[load_linear_stage] 第一级模型与SVM模型文件不一致，需要重新训练: {path}")
+        return None
+    return stage
+
+
+def save_linear_stage(arrays: Dict[str, np.ndarray], model_path: str) -> str:
+    """写入SVM模型文件旁的第一级模型文件"""
+    return save_artifact(arrays, cascade_path(model_path))
@@ -0,0 +1,68 @@
+"""
+特征向量的紧凑二进制存储
+VoiceMetrics.feature_vector 保存完整的 162 维特征向量（原先只有 MFCC 前13维、色度12维各占一列，其余梅尔谱等特征被丢弃）：
+- 格式：4 字节头（魔数 b"FV"、格式版本、数据类型代码）+ 小端 float32（或 float16）数组
+- 读取用 np.frombuffer 直接构造只读视图，不逐列重建列表、不复制数据
+- 级联推理第一级未提取的色度特征以 NaN 保存，读出时为 None
+- 由迁移回填的旧记录只有原先各列对应的位置有值，其余为 NaN
+"""
+
+import struct
+from typing import Any, List, Optional
+
+import numpy as np
+
+from app.core.config import settings
+from app.utils.feature_engine import FEATURE_GROUPS
+
+# 格式版本，头部或布局变化时递增
+FEATURE_BLOB_VERSION = 1
+FEATURE_BLOB_MAGIC = b"FV"
+_HEADER = struct.Struct("<2sBB")
+# 数据类型代码
+_DTYPES = {1: np.dtype("<f4"), 2: np.dtype("<f2")}
+_DTYPE_CODES = {"float32": 1, "float16": 2}
+
+# 接口中返回的 MFCC 为前13维（与原 mfcc_1..mfcc_13 列一致）
+N_STORED_MFCC = 13
+MFCC_SLICE = slice(FEATURE_GROUPS["mfcc"].start, FEATURE_GROUPS["mfcc"].start + N_STORED_MFCC)
+CHROMA_SLICE = FEATURE_GROUPS["chroma"]
+
+
+def encode_features(vector: Any, dtype: Optional[str] = None) -> bytes:
+    """
+    编码特征向量
+
+    Args:
+        vector: 一维特征向量
+        dtype: float32 或 float16，默认使用 FEATURE_BLOB_DTYPE
+    """
+    code = _DTYPE_CODES[dtype or settings.FEATURE_BLOB_DTYPE]
+    array = np.ascontiguousarray(np.ravel(vector), dtype=_DTYPES[code])
+    return _HEADER.pack(FEATURE_BLOB_MAGIC, FEATURE_BLOB_VERSION, code) + array.tobytes()
+
+
+def decode_features(blob: Optional[bytes]) -> Optional[np.ndarray]:
+    """
+    解码为只读特征向量视图（不复制）
+
+    Returns:
+        特征向量；blob 为空时返回 None
+
+    Raises:
+        ValueError: 魔数、格式版本或数据类型不受支持
+    """
+    if not blob:
+        return None
+    magic, version, code = _HEADER.unpack_from(blob)
+    if magic != FEATURE_BLOB_MAGIC or version != FEATURE_BLOB_VERSION or code not in _DTYPES:
+        raise ValueError(f"不支持的特征向量格式: magic={magic!r}, version={version}, dtype={code}")
+    return np.frombuffer(blob, dtype=_DTYPES[code], offset=_HEADER.size)
+
+
+def feature_values(vector: Optional[np.ndarray], group: slice) -> List[Optional[float]]:
+    """取出一组特征转换为列表（NaN 或没有特征向量时为 None）"""
+    size = len(range(*group.indices(group.stop)))
+    if vector is None or len(vector) < group.stop:
+        return [None] * size
+    return [None if np.isnan(x) else float(x) for x in vector[group].tolist()]
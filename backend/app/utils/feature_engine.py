@@ -0,0 +1,233 @@
+"""
+NumPy/SciPy 特征提取引擎
+与 librosa 引擎计算同一组特征（过零率、色度、MFCC、RMS、梅尔谱），但不触发 numba JIT 编译：
+- 分帧使用 stride 视图，不复制信号
+- STFT 使用 scipy.fft（可配置线程数）
+- 梅尔、色度（按调音偏移缓存）和 DCT 滤波器组矩阵只构建一次，构建方式移植自 librosa.filters
+  （librosa.util 在导入时即加载 numba 编译缓存，本模块不导入 librosa）
+- 色度的调音估计（piptrack + 直方图）以向量化 NumPy 实现
+与 librosa 引擎的差异仅来自浮点运算顺序，误差上限见 PARITY_RTOL（由 scripts/check_feature_engine.py 校验）
+"""
+
+import logging
+from functools import lru_cache
+from typing import Tuple
+
+import numpy as np
+import scipy.fft
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# 与 librosa 默认参数一致
+N_FFT = 2048
+HOP_LENGTH = 512
+N_MELS = 128
+N_MFCC = 20
+N_CHROMA = 12
+
+# 162 维特征向量中各组特征的位置（两种引擎相同）
+FEATURE_GROUPS = {
+    "zcr": slice(0, 1),
+    "chroma": slice(1, 1 + N_CHROMA),
+    "mfcc": slice(1 + N_CHROMA, 1 + N_CHROMA + N_MFCC),
+    "rms": slice(1 + N_CHROMA + N_MFCC, 2 + N_CHROMA + N_MFCC),
+    "mel": slice(2 + N_CHROMA + N_MFCC, 2 + N_CHROMA + N_MFCC + N_MELS)
+}
+
+# 色度调音估计参数（与 librosa.estimate_tuning / piptrack 默认值一致）
+TUNING_RESOLUTION = 0.01
+PIPTRACK_FMIN = 150.0
+PIPTRACK_FMAX = 4000.0
+PIPTRACK_THRESHOLD = 0.1
+
+# 与 librosa 引擎的允许误差：每组特征的相对误差 ||a - b|| / ||b||
+PARITY_RTOL = 1e-4
+
+
+@lru_cache(maxsize=None)
+def hann_window(n_fft: int) -> np.ndarray:
+    """周期 Hann 窗（与 librosa.stft 默认窗一致）"""
+    return (0.5 - 0.5 * np.cos(2.0 * np.pi * np.arange(n_fft) / n_fft)).astype(np.float32)
+
+
+def _hz_to_mel(frequencies: np.ndarray) -> np.ndarray:
+    """Slaney 梅尔刻度：1kHz 以下线性，以上对数"""
+    frequencies = np.atleast_1d(np.asarray(frequencies, dtype=np.float64))
+    mels = frequencies / (200.0 / 3)
+    log_region = frequencies >= 1000.0
+    mels[log_region] = 15.0 + np.log(frequencies[log_region] / 1000.0) / (np.log(6.4) / 27.0)
+    return mels
+
+
+def _mel_to_hz(mels: np.ndarray) -> np.ndarray:
+    """Slaney 梅尔刻度的逆变换"""
+    freqs = (200.0 / 3) * mels
+    log_region = mels >= 15.0
+    freqs[log_region] = 1000.0 * np.exp((np.log(6.4) / 27.0) * (mels[log_region] - 15.0))
+    return freqs
+
+
+def _hz_to_octs(frequencies: np.ndarray, tuning: float = 0.0, bins_per_octave: int = N_CHROMA) -> np.ndarray:
+    """频率转换为以 C0 为起点的八度数"""
+    a440 = 440.0 * 2.0 ** (tuning / bins_per_octave)
+    return np.log2(np.asarray(frequencies) / (a440 / 16))
+
+
+@lru_cache(maxsize=None)
+def mel_basis(sr: int, n_fft: int, n_mels: int) -> np.ndarray:
+    """梅尔滤波器组 (n_mels, 1 + n_fft // 2)，Slaney 归一化（与 librosa.filters.mel 默认参数一致）"""
+    fftfreqs = fft_frequencies(sr, n_fft)
+    min_mel, max_mel = _hz_to_mel([0.0, sr / 2.0])
+    mel_f = _mel_to_hz(np.linspace(min_mel, max_mel, n_mels + 2))
+    fdiff = np.diff(mel_f)
+    ramps = np.subtract.outer(mel_f, fftfreqs)
+    lower = -ramps[:-2] / fdiff[:-1, None]
+    upper = ramps[2:] / fdiff[1:, None]
+    weights = np.maximum(0, np.minimum(lower, upper))
+    weights *= (2.0 / (mel_f[2:] - mel_f[:-2]))[:, None]
+    return weights.astype(np.float32)
+
+
+@lru_cache(maxsize=256)
+def chroma_basis(sr: int, n_fft: int, tuning: float) -> np.ndarray:
+    """
+    色度滤波器组 (12, 1 + n_fft // 2)（与 librosa.filters.chroma 默认参数一致）
+    调音偏移按 TUNING_RESOLUTION 量化，取值有限，按偏移缓存
+    """
+    frequencies = np.linspace(0, sr, n_fft, endpoint=False)[1:]
+    frqbins = N_CHROMA * _hz_to_octs(frequencies, tuning=tuning)
+    frqbins = np.concatenate(([frqbins[0] - 1.5 * N_CHROMA], frqbins))
+    binwidthbins = np.concatenate((np.maximum(frqbins[1:] - frqbins[:-1], 1.0), [1]))
+    D = np.subtract.outer(frqbins, np.arange(0, N_CHROMA, dtype="d")).T
+    half = np.round(float(N_CHROMA) / 2)
+    D = np.remainder(D + half + 10 * N_CHROMA, N_CHROMA) - half
+    wts = np.exp(-0.5 * (2 * D / binwidthbins[None, :]) ** 2)
+    # 每个频点的权重按 L2 范数归一化
+    length = np.sqrt(np.sum(wts ** 2, axis=0, keepdims=True))
+    length[length < np.finfo(wts.dtype).tiny] = 1.0
+    wts = wts / length
+    # 以 5 个八度为中心、宽 2 个八度的高斯加权
+    wts *= np.exp(-0.5 * (((frqbins / N_CHROMA - 5.0) / 2.0) ** 2))[None, :]
+    # 以 C 为第一个色度
+    wts = np.roll(wts, -3, axis=0)
+    return np.ascontiguousarray(wts[:, : int(1 + n_fft / 2)], dtype=np.float32)
+
+
+@lru_cache(maxsize=None)
+def dct_basis(n_mels: int, n_mfcc: int) -> np.ndarray:
+    """正交 DCT-II 矩阵 (n_mfcc, n_mels)，MFCC = dct_basis @ log_mel"""
+    return scipy.fft.dct(np.eye(n_mels, dtype=np.float32), type=2, norm="ortho", axis=0)[:n_mfcc]
+
+
+@lru_cache(maxsize=None)
+def fft_frequencies(sr: int, n_fft: int) -> np.ndarray:
+    """各 FFT 频点的频率"""
+    return np.fft.rfftfreq(n_fft, d=1.0 / sr)
+
+
+def frame_signal(y: np.ndarray, frame_length: int, hop_length: int) -> np.ndarray:
+    """以 stride 视图分帧，返回 (n_frames, frame_length)，不复制信号"""
+    if len(y) < frame_length:
+        raise ValueError(f"信号长度 {len(y)} 小于帧长 {frame_length}")
+    return np.lib.stride_tricks.sliding_window_view(y, frame_length)[::hop_length]
+
+
+def stft_magnitude(y: np.ndarray, n_fft: int = N_FFT, hop_length: int = HOP_LENGTH) -> np.ndarray:
+    """居中补零后的幅度谱 |STFT| (1 + n_fft // 2, n_frames)，与 np.abs(librosa.stft(y)) 一致"""
+    y = np.pad(np.asarray(y, dtype=np.float32), n_fft // 2, mode="constant")
+    frames = frame_signal(y, n_fft, hop_length) * hann_window(n_fft)
+    spectrum = scipy.fft.rfft(frames, axis=-1, workers=settings.FEATURE_FFT_WORKERS)
+    return np.abs(spectrum).T
+
+
+def mel_power(S: np.ndarray, sr: int, n_fft: int = N_FFT, n_mels: int = N_MELS) -> np.ndarray:
+    """由幅度谱计算梅尔功率谱"""
+    return mel_basis(sr, n_fft, n_mels) @ (S ** 2)
+
+
+def zero_crossing_rate(y: np.ndarray, frame_length: int = 2048, hop_length: int = 512) -> np.ndarray:
+    """逐帧过零率（与 librosa.feature.zero_crossing_rate 一致：边缘复制补齐，|x| <= 1e-10 视为 0）"""
+    y = np.pad(y, frame_length // 2, mode="edge")
+    frames = frame_signal(y, frame_length, hop_length)
+    signs = np.signbit(np.where(np.abs(frames) <= 1e-10, 0, frames))
+    crossings = np.count_nonzero(signs[:, 1:] != signs[:, :-1], axis=1)
+    return crossings / frame_length
+
+
+def _piptrack(S: np.ndarray, sr: int, n_fft: int) -> Tuple[np.ndarray, np.ndarray]:
+    """抛物线插值的谱峰跟踪，返回候选峰的 (频率, 幅度)（与 librosa.piptrack 一致）"""
+    avg = np.gradient(S, axis=0)
+    # 各频点的抛物线插值偏移，偏移超过一个频点时置 0
+    a = S[2:] + S[:-2] - 2 * S[1:-1]
+    b = (S[2:] - S[:-2]) / 2
+    shift = np.zeros_like(S)
+    valid = np.abs(b) < np.abs(a)
+    np.divide(-b, a, out=shift[1:-1], where=valid)
+    dskew = 0.5 * avg * shift
+
+    freqs = fft_frequencies(sr, n_fft)
+    freq_mask = (freqs >= PIPTRACK_FMIN) & (freqs < min(PIPTRACK_FMAX, sr / 2))
+    ref_value = PIPTRACK_THRESHOLD * S.max(axis=0, keepdims=True)
+    X = S * (S > ref_value)
+    # 局部极大值：严格大于前一点且不小于后一点，首个频点不计，末个频点只与前一点比较
+    peaks = np.zeros(S.shape, dtype=bool)
+    peaks[1:-1] = (X[1:-1] > X[:-2]) & (X[1:-1] >= X[2:])
+    peaks[-1] = X[-1] > X[-2]
+    rows, cols = np.nonzero(peaks & freq_mask[:, None])
+    pitches = (rows + shift[rows, cols]) * float(sr) / n_fft
+    mags = S[rows, cols] + dskew[rows, cols]
+    return pitches, mags
+
+
+def estimate_tuning(S: np.ndarray, sr: int, n_fft: int) -> float:
+    """由幅度谱估计调音偏移（单位：半音，与 librosa.estimate_tuning 一致）"""
+    pitches, mags = _piptrack(S, sr, n_fft)
+    voiced = pitches > 0
+    threshold = np.median(mags[voiced]) if voiced.any() else 0.0
+    frequencies = pitches[(mags >= threshold) & voiced]
+    if not frequencies.size:
+        return 0.0
+    residual = np.mod(N_CHROMA * _hz_to_octs(frequencies), 1.0)
+    residual[residual >= 0.5] -= 1.0
+    bins = np.linspace(-0.5, 0.5, int(np.ceil(1.0 / TUNING_RESOLUTION)) + 1)
+    counts, edges = np.histogram(residual, bins)
+    return float(edges[np.argmax(counts)])
+
+
+def chroma(S: np.ndarray, sr: int, n_fft: int = N_FFT) -> np.ndarray:
+    """色度特征 (12, n_frames)，逐帧按最大值归一化（与 librosa.feature.chroma_stft(S=S) 一致）"""
+    raw = chroma_basis(sr, n_fft, estimate_tuning(S, sr, n_fft)) @ S
+    length = np.max(np.abs(raw), axis=0, keepdims=True).astype(np.float64)
+    length[length < np.finfo(raw.dtype).tiny] = 1.0
+    return (raw / length).astype(raw.dtype)
+
+
+def mfcc(mel: np.ndarray, n_mfcc: int = N_MFCC, top_db: float = 80.0) -> np.ndarray:
+    """由梅尔功率谱计算 MFCC (n_mfcc, n_frames)（与 librosa.feature.mfcc(S=power_to_db(mel)) 一致）"""
+    log_mel = 10.0 * np.log10(np.maximum(1e-10, mel))
+    log_mel = np.maximum(log_mel, log_mel.max() - top_db)
+    return dct_basis(mel.shape[0], n_mfcc) @ log_mel
+
+
+def chroma_mean(context) -> np.ndarray:
+    """12 维色度特征均值（特征提取中耗时最多的一组）"""
+    return np.mean(chroma(context.stft_magnitude(), context.sr), axis=1)
+
+
+def extract_features(context, with_chroma: bool = True) -> np.ndarray:
+    """
+    提取 162 维特征向量（顺序与 AnalysisModel.extract_features 的 librosa 实现一致）
+
+    Args:
+        context: AudioAnalysisContext，幅度谱和梅尔功率谱由上下文按当前引擎计算并缓存
+        with_chroma: 为 False 时跳过色度特征，对应位置填 NaN（级联推理的第一级使用）
+    """
+    zcr = np.mean(zero_crossing_rate(context.y), keepdims=True)
+    chroma_part = chroma_mean(context) if with_chroma else np.full(N_CHROMA, np.nan)
+    mel = context.mel_power()
+    mfcc_mean = np.mean(mfcc(mel), axis=1)
+    rms = np.mean(np.sqrt(np.mean(context.frames() ** 2, axis=0)), keepdims=True)
+    mel_mean = np.mean(mel, axis=1)
+    return np.hstack((zcr, chroma_part, mfcc_mean, rms, mel_mean))
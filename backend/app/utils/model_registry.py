@@ -0,0 +1,199 @@
+"""
+模型注册表
+每个进程内按版本缓存已加载的SVM模型，同一版本只加载一次。
+- 版本号默认取模型文件内容的哈希，文件不变则版本不变
+- 加载完成后先做一次预热预测，再对外提供
+- 热切换时新模型加载、预热完成后才原子替换当前版本，
+  正在处理中的请求继续持有旧模型引用，不会被中断
+- 分析进程池的工作进程通过 ModelRef 获知应使用的版本，按需加载
+"""
+
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, NamedTuple, Optional
+
+import numpy as np
+
+from app.core.config import settings
+from app.utils.audio_context import AudioAnalysisContext
+from app.utils.svm_inference import source_digest
+from app.utils.voice_models_utils import (
+    AnalysisModel,
+    DEFAULT_MODEL_PATH,
+    FEATURE_DURATION,
+    FEATURE_OFFSET,
+    FEATURE_SAMPLE_RATE
+)
+
+logger = logging.getLogger(__name__)
+
+class ModelRef(NamedTuple):
+    """模型版本引用（可跨进程传递）"""
+    version: str
+    path: str
+
+
+def compute_model_version(path: str) -> str:
+    """根据模型文件内容计算版本号"""
+    return source_digest(path)
+
+
+def _warm_up_signal() -> np.ndarray:
+    """生成预热用的合成信号（覆盖特征提取所需的时间窗口）"""
+    rng = np.random.default_rng(0)
+    duration = FEATURE_OFFSET + FEATURE_DURATION + 0.5
+    t = np.arange(int(duration * FEATURE_SAMPLE_RATE)) / FEATURE_SAMPLE_RATE
+    y = 0.1 * np.sin(2 * np.pi * 440 * t) + 0.01 * rng.standard_normal(len(t))
+    return y.astype(np.float32)
+
+
+class ModelRegistry:
+    """进程内的模型注册表（线程安全）"""
+
+    def __init__(
+        self,
+        default_path: Optional[str] = None,
+        mmap_mode: Optional[str] = None,
+        max_versions: Optional[int] = None
+    ):
+        """
+        初始化注册表（模型在首次使用时才加载）
+
+        Args:
+            default_path: 默认模型文件路径
+            mmap_mode: joblib.load 的内存映射模式
+            max_versions: 最多保留的模型版本数（含当前版本）
+        """
+        self.default_path = default_path or settings.MODEL_PATH or DEFAULT_MODEL_PATH
+        self.mmap_mode = mmap_mode or settings.MODEL_MMAP_MODE
+        self.max_versions = max(1, max_versions or settings.MODEL_MAX_VERSIONS)
+        self._lock = threading.RLock()
+        self._models: "OrderedDict[str, AnalysisModel]" = OrderedDict()
+        self._active: Optional[ModelRef] = None
+        self._loaded_at: Dict[str, float] = {}
+        self._load_seconds: Dict[str, float] = {}
+
+    def _warm_up(self, model: AnalysisModel) -> None:
+        """对新加载的模型做一次预热预测（触发特征提取和SVM的首次调用开销）"""
+        context = AudioAnalysisContext(_warm_up_signal(), FEATURE_SAMPLE_RATE, source="warm-up")
+        model.get_pred(context)
+
+    def load(self, path: str, version: Optional[str] = None, warm_up: bool = True) -> ModelRef:
+        """
+        加载指定模型文件（同一版本已加载时直接返回）
+
+        Args:
+            path: 模型文件路径
+            version: 版本号，默认按文件内容计算
+            warm_up: 是否在加载后做预热预测
+
+        Returns:
+            模型版本引用
+        """
+        path = os.path.abspath(path)
+        version = version or compute_model_version(path)
+        ref = ModelRef(version, path)
+        with self._lock:
+            if version in self._models:
+                return ref
+            start = time.perf_counter()
+            model = AnalysisModel(path, mmap_mode=self.mmap_mode)
+            if warm_up:
+                self._warm_up(model)
+            self._models[version] = model
+            self._loaded_at[version] = time.time()
+            self._load_seconds[version] = time.perf_counter() - start
+            logger.info(f"[ModelRegistry.load] 模型已加载: version={version}, path={path}, 耗时={self._load_seconds[version]:.3f}s")
+            self._evict(protected=version)
+        return ref
+
+    def _evict(self, protected: Optional[str] = None) -> None:
+        """
+        淘汰最早加载的非当前版本（处理中的请求仍持有模型引用，不受影响）
+
+        Args:
+            protected: 同样不淘汰的版本（刚加载、即将切换为当前版本的模型）
+        """
+        while len(self._models) > self.max_versions:
+            for version in self._models:
+                if version != protected and (self._active is None or version != self._active.version):
+                    self._models.pop(version)
+                    self._loaded_at.pop(version, None)
+                    self._load_seconds.pop(version, None)
+                    logger.info(f"[ModelRegistry._evict] 淘汰模型版本: {version}")
+                    break
+            else:
+                return
+
+    def swap(self, path: str, version: Optional[str] = None) -> ModelRef:
+        """
+        热切换当前模型：新模型加载并预热成功后才原子替换
+
+        Raises:
+            加载或预热失败时抛出原始异常，当前模型保持不变
+        """
+        ref = self.load(path, version)
+        with self._lock:
+            previous = self._active
+            self._active = ref
+            # 新模型加载时旧的当前版本不能淘汰，切换后再按上限淘汰
+            self._evict()
+        logger.info(f"[ModelRegistry.swap] 当前模型切换: {previous.version if previous else None} -> {ref.version}")
+        return ref
+
+    def active_ref(self) -> ModelRef:
+        """当前生效的模型版本（首次调用时加载默认模型）"""
+        ref = self._active
+        if ref is None:
+            with self._lock:
+                if self._active is None:
+                    self._active = self.load(self.default_path)
+                ref = self._active
+        return ref
+
+    def get(self, ref: Optional[ModelRef] = None) -> AnalysisModel:
+        """
+        获取模型实例
+
+        Args:
+            ref: 指定的模型版本（由主进程随任务下发），默认使用当前版本
+        """
+        ref = ref or self.active_ref()
+        model = self._models.get(ref.version)
+        if model is None:
+            # 工作进程首次见到该版本，或该版本已被淘汰
+            with self._lock:
+                self.load(ref.path, ref.version)
+                model = self._models[ref.version]
+        return model
+
+    def warm_up(self) -> ModelRef:
+        """加载并预热当前模型（应用启动时调用）"""
+        return self.active_ref()
+
+    def info(self) -> Dict[str, Any]:
+        """注册表状态"""
+        with self._lock:
+            return {
+                "active": self._active._asdict() if self._active else None,
+                "mmap_mode": self.mmap_mode,
+                "max_versions": self.max_versions,
+                "loaded": [
+                    {
+                        "version": version,
+                        "path": model.model_path,
+                        "inference": model.inference,
+                        "cascade": model.cascade.digest if model.cascade is not None else None,
+                        "loaded_at": self._loaded_at.get(version),
+                        "load_seconds": self._load_seconds.get(version)
+                    }
+                    for version, model in self._models.items()
+                ]
+            }
+
+
+# 全局唯一ModelRegistry实例（每个进程各自一份）
+model_registry = ModelRegistry()
@@ -0,0 +1,130 @@
+"""
+历史记录的游标（keyset）分页
+历史列表按 (created_at, id) 倒序排列，下一页从上一页最后一条之后开始：
+- 游标是 (created_at, id) 的不透明编码，客户端原样传回，不需要理解其内容
+- 查询条件为 created_at < c OR (created_at = c AND id < i)，配合 (user_id, created_at) 复合索引直接定位，
+  不再像 OFFSET 那样扫描并丢弃前面的全部记录
+- 每次多取一条判断是否还有下一页，不需要 count()
+- 总数是可选的，按用户在进程内缓存 HISTORY_TOTAL_CACHE_TTL 秒（近似值），写入新记录时清除该用户的缓存
+- 响应体为记录列表的接口（分析历史）通过 X-Next-Cursor、X-Total-Count 响应头返回分页信息
+"""
+
+import base64
+import threading
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from fastapi import Response
+from sqlalchemy import and_, or_
+from sqlalchemy.orm import Query
+
+from app.core.config import settings
+
+
+def encode_cursor(created_at: datetime, row_id: int) -> str:
+    """把最后一条记录的 (created_at, id) 编码为游标"""
+    raw = f"{created_at.isoformat()}|{int(row_id)}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """
+    解码游标
+
+    Raises:
+        ValueError: 游标格式错误
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        created_at, row_id = raw.rsplit("|", 1)
+        return datetime.fromisoformat(created_at), int(row_id)
+    except (ValueError, UnicodeDecodeError):
+        raise ValueError("无效的分页游标")
+
+
+def keyset_page(
+    query: Query,
+    created_column: Any,
+    id_column: Any,
+    limit: int,
+    cursor: Optional[str] = None,
+    offset: int = 0,
+    key: Optional[Callable[[Any], Tuple[datetime, int]]] = None
+) -> Tuple[List[Any], Optional[str]]:
+    """
+    按 (created_at, id) 倒序取一页
+
+    Args:
+        query: 已按用户过滤、尚未排序的查询
+        created_column / id_column: 排序列
+        cursor: 上一页返回的游标；不提供时从 offset 开始（兼容按页码/skip 分页的旧参数）
+        key: 从结果行取出 (created_at, id)，默认取行对象的 created_at、id 属性
+
+    Returns:
+        (本页记录, 下一页游标)；没有下一页时游标为 None
+
+    Raises:
+        ValueError: 游标格式错误
+    """
+    if cursor:
+        created_at, row_id = decode_cursor(cursor)
+        query = query.filter(or_(
+            created_column < created_at,
+            and_(created_column == created_at, id_column < row_id)
+        ))
+    query = query.order_by(created_column.desc(), id_column.desc())
+    if offset and not cursor:
+        query = query.offset(offset)
+    rows = query.limit(limit + 1).all()
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    last_created_at, last_id = key(rows[-1]) if key else (rows[-1].created_at, rows[-1].id)
+    return rows, encode_cursor(last_created_at, last_id)
+
+
+def set_page_headers(response: Response, page: Dict[str, Any]) -> List[Any]:
+    """
+    响应体保持为记录列表的接口，通过响应头返回分页信息
+
+    Returns:
+        本页记录
+    """
+    if page.get("next_cursor"):
+        response.headers["X-Next-Cursor"] = page["next_cursor"]
+    if page.get("total") is not None:
+        response.headers["X-Total-Count"] = str(page["total"])
+    return page["records"]
+
+
+class HistoryTotalCache:
+    """按 (列表类型, 用户ID) 缓存历史记录总数"""
+
+    def __init__(self):
+        self._totals: Dict[Tuple[str, int], Tuple[int, float]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, scope: str, user_id: int, count: Callable[[], int]) -> int:
+        """返回缓存的总数，过期或不存在时调用 count() 重新统计"""
+        ttl = settings.HISTORY_TOTAL_CACHE_TTL
+        now = time.time()
+        with self._lock:
+            entry = self._totals.get((scope, user_id))
+            if ttl > 0 and entry is not None and now - entry[1] < ttl:
+                return entry[0]
+        total = int(count())
+        if ttl > 0:
+            with self._lock:
+                self._totals[(scope, user_id)] = (total, now)
+        return total
+
+    def invalidate(self, user_id: int) -> None:
+        """清除该用户的全部总数缓存（写入新会话或语音指标后调用）"""
+        with self._lock:
+            for key in [key for key in self._totals if key[1] == user_id]:
+                del self._totals[key]
+
+
+# 全局唯一HistoryTotalCache实例（每个进程各自一份）
+history_total_cache = HistoryTotalCache()
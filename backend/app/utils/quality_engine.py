@@ -0,0 +1,202 @@
+"""
+向量化音频质量评分引擎
+计算与原 evaluate_audio_quality 相同的七项子评分（能量稳定性、时长、静音比例、过零率、频谱质心、VAD、呼吸声特征），
+但不再逐帧在解释器中求和：
+- 平方信号和过零指示各做一次前缀和，25ms 能量帧、VAD 帧和过零率帧的逐帧求和都由前缀和相减得到
+- 频谱质心和呼吸声能量共用上下文中缓存的同一份幅度谱（与特征提取共用同一个 STFT 实现）
+- 多段音频拼接后一次计算，逐段统计量通过 np.add.reduceat 汇总，批量评分只需一次调用
+"""
+
+import logging
+from typing import Dict, Sequence
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# 各项子评分的权重（与原实现一致）
+WEIGHTS = {
+    "energy": 0.15,
+    "duration": 0.10,
+    "silence": 0.15,
+    "zcr": 0.10,
+    "spectral": 0.10,
+    "vad": 0.25,
+    "respiration": 0.15
+}
+BASE_SCORE = 0.3
+MIN_SCORE = 0.2
+MAX_SCORE = 0.95
+# 静音过多或几乎没有声音活动时直接给出的低分
+LOW_QUALITY_SCORE = 0.3
+
+# 过零率和频谱分析的帧参数（与 librosa 默认值一致）
+N_FFT = 2048
+ZCR_FRAME_LENGTH = 2048
+ZCR_HOP_LENGTH = 512
+ZCR_THRESHOLD = 1e-10
+RESPIRATION_BAND = (200, 800)
+
+
+def _segment_sums(values: np.ndarray, counts: np.ndarray) -> np.ndarray:
+    """按段长度对拼接后的数组逐段求和（允许空段）"""
+    totals = np.zeros(len(counts), dtype=np.float64)
+    nonempty = counts > 0
+    if nonempty.any():
+        starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+        totals[nonempty] = np.add.reduceat(np.asarray(values, dtype=np.float64), starts[nonempty])
+    return totals
+
+
+def _segment_std(values: np.ndarray, counts: np.ndarray) -> np.ndarray:
+    """逐段总体标准差（与 np.std 一致），空段为 nan"""
+    with np.errstate(invalid="ignore", divide="ignore"):
+        means = _segment_sums(values, counts) / counts
+        deviations = values - np.repeat(means, counts)
+        return np.sqrt(_segment_sums(deviations ** 2, counts) / counts)
+
+
+def _window_sums(prefix: np.ndarray, offset: int, length: int, starts: np.ndarray, width: int) -> np.ndarray:
+    """
+    由前缀和计算一段信号上的滑动窗口和，窗口超出信号的部分按 0 计（即补零分帧）
+
+    Args:
+        prefix: 拼接信号的前缀和（首元素为 0）
+        offset: 该段信号在拼接信号中的起点
+        length: 该段信号的长度
+        starts: 各窗口在该段信号坐标系中的起点（可为负）
+        width: 窗口宽度
+    """
+    lo = np.clip(starts, 0, length) + offset
+    hi = np.clip(starts + width, 0, length) + offset
+    return prefix[hi] - prefix[lo]
+
+
+def quality_components(contexts: Sequence) -> Dict[str, np.ndarray]:
+    """
+    批量计算各段音频的质量子评分
+
+    Args:
+        contexts: AudioAnalysisContext 序列（幅度谱取自上下文缓存，与特征提取共用）
+
+    Returns:
+        各项子评分、中间统计量和总分，每项为长度等于段数的数组
+    """
+    signals = [np.asarray(c.y, dtype=np.float32) for c in contexts]
+    rates = np.array([c.sr for c in contexts], dtype=np.int64)
+    lengths = np.array([len(y) for y in signals], dtype=np.int64)
+    if (lengths == 0).any():
+        raise ValueError("音频信号为空")
+    offsets = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+    y_all = np.concatenate(signals)
+    abs_all = np.abs(y_all)
+
+    # 平方信号与过零指示的前缀和（各做一次，所有时域分帧共用）
+    power_prefix = np.concatenate(([0.0], np.cumsum(y_all.astype(np.float64) ** 2)))
+    signs = np.signbit(np.where(abs_all <= ZCR_THRESHOLD, 0, y_all))
+    crossings = np.empty(len(y_all), dtype=np.int64)
+    crossings[0] = 0
+    crossings[1:] = signs[1:] != signs[:-1]
+    # 每段首个样本与上一段末尾之间不算过零
+    crossings[offsets] = 0
+    crossing_prefix = np.concatenate(([0], np.cumsum(crossings)))
+
+    energy, energy_counts = [], []
+    vad, vad_counts = [], []
+    zcr, zcr_counts = [], []
+    for offset, length, sr in zip(offsets, lengths, rates):
+        frame_length = int(sr * 0.025)
+        hop_length = int(sr * 0.010)
+        # 1. 短时能量：不补零，起点 0, hop, ... < length - frame_length
+        starts = np.arange(0, max(length - frame_length, 0), hop_length)
+        energy.append(_window_sums(power_prefix, offset, length, starts, frame_length))
+        energy_counts.append(len(starts))
+        # 6. VAD 帧能量：居中补零分帧（与 context.frames(frame_length, hop_length) 一致）
+        pad = frame_length // 2
+        n_frames = 1 + (length + 2 * pad - frame_length) // hop_length
+        if n_frames <= 0:
+            raise ValueError(f"音频过短，无法分帧: {length} 个样本")
+        starts = np.arange(n_frames) * hop_length - pad
+        vad.append(np.sqrt(_window_sums(power_prefix, offset, length, starts, frame_length) / frame_length))
+        vad_counts.append(n_frames)
+        # 4. 过零率：边缘复制补齐的 2048/512 分帧，补齐部分不产生过零，帧内相邻样本对即前缀和区间
+        n_frames = 1 + length // ZCR_HOP_LENGTH
+        starts = np.arange(n_frames) * ZCR_HOP_LENGTH - ZCR_FRAME_LENGTH // 2 + 1
+        zcr.append(_window_sums(crossing_prefix, offset, length, starts, ZCR_FRAME_LENGTH - 1) / ZCR_FRAME_LENGTH)
+        zcr_counts.append(n_frames)
+
+    energy, energy_counts = np.concatenate(energy), np.array(energy_counts)
+    vad, vad_counts = np.concatenate(vad), np.array(vad_counts)
+    zcr, zcr_counts = np.concatenate(zcr), np.array(zcr_counts)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        energy_mean = _segment_sums(energy, energy_counts) / energy_counts
+        energy_var = np.where(energy_mean > 0, _segment_std(energy, energy_counts) / energy_mean, 0.0)
+    energy_score = np.maximum(0, 1 - np.minimum(1, energy_var * 2))
+
+    # 2. 时长
+    durations = lengths / rates
+    duration_score = np.minimum(1.0, durations / 2.0)
+
+    # 3. 静音比例（阈值为每段最大幅度的 1%）
+    peaks = np.maximum.reduceat(abs_all, offsets)
+    silent = abs_all < np.repeat(0.01 * peaks, lengths)
+    silence_ratio = _segment_sums(silent, lengths) / lengths
+    silence_score = 1.0 - np.maximum(0, np.minimum(1.0, (silence_ratio - 0.2) / 0.6))
+
+    zcr_score = np.minimum(1.0, _segment_std(zcr, zcr_counts) * 25)
+
+    # 5 & 7. 频谱质心与呼吸声能量，共用幅度谱；各段的谱按列拼接后一次计算
+    spectra = [c.stft_magnitude(n_fft=N_FFT) for c in contexts]
+    frame_counts = np.array([S.shape[1] for S in spectra])
+    S_all = np.hstack(spectra)
+    column_sums = S_all.sum(axis=0, dtype=np.float64)
+    norm = np.where(column_sums < np.finfo(np.float32).tiny, 1.0, column_sums)
+    # 频点 k 的频率为 k * sr / n_fft，按列乘以各段的 sr / n_fft
+    bins = np.arange(S_all.shape[0], dtype=np.float64)
+    centroid = (bins @ S_all) / norm * np.repeat(rates / N_FFT, frame_counts)
+    spectral_score = np.minimum(1.0, _segment_std(centroid, frame_counts) / 400)
+
+    resp_energy = np.empty(len(contexts))
+    for i, (S, sr) in enumerate(zip(spectra, rates)):
+        freqs = np.fft.rfftfreq(N_FFT, d=1.0 / sr)
+        band = (freqs >= RESPIRATION_BAND[0]) & (freqs <= RESPIRATION_BAND[1])
+        resp_energy[i] = S[band].mean(dtype=np.float64) if band.any() else np.nan
+    total_energy = _segment_sums(column_sums, frame_counts) / (S_all.shape[0] * frame_counts)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        resp_ratio = np.where(total_energy > 0, resp_energy / total_energy, 0.0)
+    respiration_score = np.minimum(1.0, resp_ratio * 10)
+    respiration_score = np.where(resp_ratio < 0.05, respiration_score * 0.5, respiration_score)
+
+    # VAD：有声帧比例（阈值为每段最大帧能量的 5%）
+    vad_peaks = np.maximum.reduceat(vad, np.concatenate(([0], np.cumsum(vad_counts)[:-1])))
+    active_frames = _segment_sums(vad > np.repeat(0.05 * vad_peaks, vad_counts), vad_counts) / vad_counts
+    vad_score = np.minimum(1.0, active_frames / 0.3)
+
+    weighted = (
+        WEIGHTS["energy"] * energy_score +
+        WEIGHTS["duration"] * duration_score +
+        WEIGHTS["silence"] * silence_score +
+        WEIGHTS["zcr"] * zcr_score +
+        WEIGHTS["spectral"] * spectral_score +
+        WEIGHTS["vad"] * vad_score +
+        WEIGHTS["respiration"] * respiration_score
+    )
+    score = np.clip(BASE_SCORE + (1.0 - BASE_SCORE) * weighted, MIN_SCORE, MAX_SCORE)
+    # 静音比例过高（超过70%）或有声帧不足10%时直接判定为低质量录音
+    score = np.where((silence_ratio > 0.7) | (active_frames < 0.1), LOW_QUALITY_SCORE, score)
+
+    return {
+        "energy": energy_score,
+        "duration": duration_score,
+        "silence": silence_score,
+        "zcr": zcr_score,
+        "spectral": spectral_score,
+        "vad": vad_score,
+        "respiration": respiration_score,
+        "silence_ratio": silence_ratio,
+        "active_frames": active_frames,
+        "resp_ratio": resp_ratio,
+        "score": score
+    }
+
@@ -0,0 +1,245 @@
+"""
+流式录音特征累加
+客户端边录音边通过 WebSocket 发送 PCM 帧，服务器逐帧累加：
+- 按流水线采样率流式重采样（soxr 流式重采样器，与整段重采样结果一致）
+- 对完整的分析帧（帧长 2048、跳步 512，与特征提取一致）累加 RMS、过零率、峰值、削波和静音帧计数，
+  用于推送实时质量提示
+- SVM 特征向量只依赖 FEATURE_OFFSET 起 FEATURE_DURATION 秒的固定窗口，
+  且色度的调音估计、MFCC 的 dB 截断都依赖窗口内的全局统计量，无法逐帧精确累加；
+  因此窗口一旦收齐就由调用方立即计算特征，录音结束时只剩预测和质量评估
+"""
+
+import io
+import logging
+from typing import Any, Dict, List, Optional
+
+import librosa
+import numpy as np
+import soundfile as sf
+import soxr
+
+from app.core.config import settings
+from app.utils.voice_models_utils import FEATURE_DURATION, FEATURE_OFFSET
+
+logger = logging.getLogger(__name__)
+
+# 客户端可选的 PCM 样本格式
+SAMPLE_FORMATS = {
+    "f32le": np.dtype("<f4"),
+    "s16le": np.dtype("<i2")
+}
+
+# 分析帧参数（与 librosa 特征提取的默认值一致）
+FRAME_LENGTH = 2048
+HOP_LENGTH = 512
+
+# 实时提示阈值
+CLIPPING_LEVEL = 0.99   # 样本绝对值达到该值视为削波
+SILENCE_RMS = 0.01      # 帧 RMS 低于该值视为静音（与麦克风测试的呼吸音最低音量一致）
+QUIET_RMS = 0.01        # 最近一段的平均 RMS 低于该值提示音量过低
+CLIPPING_RATIO = 0.001  # 最近一段削波样本比例超过该值提示音量过高
+
+# librosa res_type 到 soxr 质量参数的映射
+SOXR_QUALITIES = {
+    "soxr_vhq": "VHQ",
+    "soxr_hq": "HQ",
+    "soxr_mq": "MQ",
+    "soxr_lq": "LQ",
+    "soxr_qq": "QQ"
+}
+
+
+class StreamTooLongError(Exception):
+    """流式录音超过最长时长"""
+    pass
+
+
+def _soxr_quality() -> str:
+    """按配置的重采样质量选择 soxr 质量参数（非 soxr 的 res_type 使用 HQ）"""
+    return SOXR_QUALITIES.get(settings.RESAMPLE_QUALITY, "HQ")
+
+
+def to_wav_bytes(y: np.ndarray, sr: int) -> bytes:
+    """将信号编码为 16 位 PCM WAV（流式录音归档使用）"""
+    buffer = io.BytesIO()
+    sf.write(buffer, y, sr, format="WAV", subtype="PCM_16")
+    return buffer.getvalue()
+
+
+class StreamingFeatureAccumulator:
+    """单次流式录音的样本缓冲和逐帧统计量"""
+
+    def __init__(
+        self,
+        input_sr: Optional[int] = None,
+        sample_format: str = "f32le",
+        sr: Optional[int] = None,
+        max_seconds: Optional[float] = None
+    ):
+        """
+        初始化累加器
+
+        Args:
+            input_sr: 客户端 PCM 的采样率，默认与流水线采样率相同
+            sample_format: PCM 样本格式（f32le / s16le），单声道、小端
+            sr: 流水线采样率，默认 settings.PIPELINE_SAMPLE_RATE
+            max_seconds: 最长录音时长，默认 settings.STREAM_MAX_SECONDS
+
+        Raises:
+            ValueError: 采样率或样本格式无效
+        """
+        if sample_format not in SAMPLE_FORMATS:
+            raise ValueError(f"不支持的样本格式: {sample_format}，可选: {', '.join(SAMPLE_FORMATS)}")
+        self.sr = int(sr or settings.PIPELINE_SAMPLE_RATE)
+        self.input_sr = int(input_sr or self.sr)
+        if self.input_sr <= 0:
+            raise ValueError(f"无效的采样率: {input_sr}")
+        self.sample_format = sample_format
+        self._dtype = SAMPLE_FORMATS[sample_format]
+        self._resampler = None
+        if self.input_sr != self.sr:
+            self._resampler = soxr.ResampleStream(self.input_sr, self.sr, 1, dtype="float32", quality=_soxr_quality())
+        self.max_samples = int((max_seconds or settings.STREAM_MAX_SECONDS) * self.sr)
+        # 特征提取窗口的结束位置（与 AudioAnalysisContext.segment 的截取方式一致）
+        self.window_samples = int(FEATURE_OFFSET * self.sr) + int(FEATURE_DURATION * self.sr)
+
+        self._remainder = b""
+        self._chunks: List[np.ndarray] = []
+        self.n_samples = 0
+        self._finished = False
+        # 尚未凑成完整分析帧的样本
+        self._tail = np.zeros(0, dtype=np.float32)
+
+        # 全程累加量
+        self.frame_count = 0
+        self.rms_sum = 0.0
+        self.zcr_sum = 0.0
+        self.silent_frames = 0
+        self.peak = 0.0
+        self.clipped_samples = 0
+        # 距上次提示以来的累加量
+        self._recent_frames = 0
+        self._recent_rms_sum = 0.0
+        self._recent_samples = 0
+        self._recent_clipped = 0
+        self._hinted_samples = 0
+
+    @property
+    def duration(self) -> float:
+        """已接收的录音时长（秒，按流水线采样率计）"""
+        return self.n_samples / self.sr
+
+    @property
+    def window_ready(self) -> bool:
+        """特征提取窗口是否已收齐"""
+        return self.n_samples >= self.window_samples
+
+    def feed(self, data: bytes) -> int:
+        """
+        追加一段 PCM 字节（可以不按样本边界切分）
+
+        Returns:
+            本次新增的流水线采样率样本数
+
+        Raises:
+            StreamTooLongError: 超过最长录音时长
+        """
+        if self._finished:
+            raise ValueError("录音已结束，不能继续追加")
+        data = self._remainder + bytes(data)
+        usable = len(data) - len(data) % self._dtype.itemsize
+        self._remainder = data[usable:]
+        samples = np.frombuffer(data[:usable], dtype=self._dtype)
+        if self._dtype.kind == "i":
+            samples = samples.astype(np.float32) / 32768.0
+        else:
+            samples = samples.astype(np.float32)
+        if self._resampler is not None:
+            samples = self._resampler.resample_chunk(samples)
+        return self._append(samples)
+
+    def finish(self) -> None:
+        """录音结束：取出流式重采样器中剩余的样本"""
+        if self._finished:
+            return
+        if self._resampler is not None:
+            self._append(self._resampler.resample_chunk(np.zeros(0, dtype=np.float32), last=True))
+        self._finished = True
+
+    def _append(self, samples: np.ndarray) -> int:
+        if len(samples) == 0:
+            return 0
+        if self.n_samples + len(samples) > self.max_samples:
+            raise StreamTooLongError(f"录音超过最长时长 {self.max_samples / self.sr:.0f} 秒")
+        samples = np.ascontiguousarray(samples, dtype=np.float32)
+        self._chunks.append(samples)
+        self.n_samples += len(samples)
+
+        abs_samples = np.abs(samples)
+        self.peak = max(self.peak, float(abs_samples.max()))
+        clipped = int(np.count_nonzero(abs_samples >= CLIPPING_LEVEL))
+        self.clipped_samples += clipped
+        self._recent_clipped += clipped
+        self._recent_samples += len(samples)
+        self._accumulate_frames(samples)
+        return len(samples)
+
+    def _accumulate_frames(self, samples: np.ndarray) -> None:
+        """对新凑成的完整分析帧累加 RMS、过零率和静音帧计数"""
+        tail = np.concatenate([self._tail, samples]) if len(self._tail) else samples
+        if len(tail) < FRAME_LENGTH:
+            self._tail = tail
+            return
+        frames = librosa.util.frame(tail, frame_length=FRAME_LENGTH, hop_length=HOP_LENGTH)
+        n_frames = frames.shape[1]
+        rms = np.sqrt(np.mean(frames ** 2, axis=0))
+        zcr = np.mean(np.abs(np.diff(np.signbit(frames), axis=0)), axis=0)
+        self.frame_count += n_frames
+        self.rms_sum += float(rms.sum())
+        self.zcr_sum += float(zcr.sum())
+        self.silent_frames += int(np.count_nonzero(rms < SILENCE_RMS))
+        self._recent_frames += n_frames
+        self._recent_rms_sum += float(rms.sum())
+        # 保留下一帧的起点之后的样本
+        self._tail = tail[n_frames * HOP_LENGTH:].copy()
+
+    def signal(self) -> np.ndarray:
+        """已接收的完整信号（多段缓冲合并为一段，后续调用不再重复拼接）"""
+        if len(self._chunks) > 1:
+            self._chunks = [np.concatenate(self._chunks)]
+        return self._chunks[0] if self._chunks else np.zeros(0, dtype=np.float32)
+
+    def should_hint(self, interval: Optional[float] = None) -> bool:
+        """距上次提示是否已累计足够时长的新音频"""
+        interval = settings.STREAM_HINT_INTERVAL if interval is None else interval
+        return self.n_samples - self._hinted_samples >= int(interval * self.sr)
+
+    def hint(self) -> Dict[str, Any]:
+        """生成实时质量提示，并重置最近一段的累加量"""
+        recent_rms = self._recent_rms_sum / self._recent_frames if self._recent_frames else None
+        recent_clipping = self._recent_clipped / self._recent_samples if self._recent_samples else 0.0
+        messages = []
+        if recent_rms is not None and recent_rms < QUIET_RMS:
+            messages.append("音量过低，请靠近麦克风")
+        if recent_clipping > CLIPPING_RATIO:
+            messages.append("音量过高，出现削波，请远离麦克风")
+        if self.window_ready:
+            messages.append("已满足分析所需时长，可以结束录音")
+
+        hint = {
+            "type": "hint",
+            "duration": round(self.duration, 3),
+            "level_db": round(float(20 * np.log10(max(recent_rms, 1e-10))), 1) if recent_rms is not None else None,
+            "peak": round(self.peak, 4),
+            "clipping_ratio": round(recent_clipping, 6),
+            "silence_ratio": round(self.silent_frames / self.frame_count, 4) if self.frame_count else None,
+            "zcr": round(self.zcr_sum / self.frame_count, 4) if self.frame_count else None,
+            "window_ready": self.window_ready,
+            "messages": messages
+        }
+        self._recent_frames = 0
+        self._recent_rms_sum = 0.0
+        self._recent_samples = 0
+        self._recent_clipped = 0
+        self._hinted_samples = self.n_samples
+        return hint
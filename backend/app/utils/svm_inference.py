@@ -0,0 +1,248 @@
+"""
+SVM 模型导出与纯 NumPy 推理
+将 joblib 加载的 scikit-learn SVM 导出为紧凑的 .npz 推理文件（支持向量、对偶系数、截距、核参数及前置的缩放器），
+推理时直接计算决策函数，不经过 scikit-learn 的输入校验，工作进程也无需导入 scikit-learn。
+- 导出只依赖估计器的属性（不导入 scikit-learn），支持 SVC / NuSVC 及其前置的 StandardScaler / MinMaxScaler
+- 支持向量和对偶系数以 float32 写入推理文件，加载后按 float64 计算核函数与决策值
+- 多分类按 libsvm 的一对一投票规则预测（票数相同时取类别顺序靠前者），与 SVC.predict 一致
+"""
+
+import hashlib
+import logging
+import os
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# 推理文件格式版本，字段或计算方式变化时递增
+ARTIFACT_FORMAT = 1
+ARTIFACT_SUFFIX = ".npz"
+SUPPORTED_KERNELS = ("linear", "rbf", "poly", "sigmoid")
+SUPPORTED_ESTIMATORS = ("SVC", "NuSVC")
+
+# 一致性检查允许的决策值绝对误差（支持向量按 float32 存储带来的误差）
+PARITY_ATOL = 1e-4
+
+# 计算模型文件哈希时每次读取的字节数
+HASH_READ_CHUNK = 1024 * 1024
+
+
+def source_digest(path: str) -> str:
+    """模型文件内容的哈希（与模型注册表的版本号一致），用于判断推理文件是否过期"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_READ_CHUNK), b""):
+            digest.update(chunk)
+    return digest.hexdigest()[:12]
+
+
+def artifact_path(model_path: str) -> str:
+    """模型文件对应的推理文件路径（同目录、同名，扩展名为 .npz）"""
+    return os.path.splitext(model_path)[0] + ARTIFACT_SUFFIX
+
+
+def scaler_affine(step: Any) -> Tuple[np.ndarray, np.ndarray]:
+    """把缩放器表示为 x * scale + offset"""
+    kind = type(step).__name__
+    n_features = step.n_features_in_
+    if kind == "StandardScaler":
+        scale = np.ones(n_features) if step.scale_ is None else 1.0 / np.asarray(step.scale_, dtype=np.float64)
+        mean = np.zeros(n_features) if step.mean_ is None else np.asarray(step.mean_, dtype=np.float64)
+        return scale, -mean * scale
+    if kind == "MinMaxScaler":
+        return np.asarray(step.scale_, dtype=np.float64), np.asarray(step.min_, dtype=np.float64)
+    raise ValueError(f"不支持导出的预处理步骤: {kind}")
+
+
+def export_svm(estimator: Any, source_version: str = "") -> Dict[str, np.ndarray]:
+    """
+    将已训练的 SVM（或以 SVM 结尾的 Pipeline）导出为推理所需的数组
+
+    Args:
+        estimator: SVC / NuSVC，或由缩放器和 SVC / NuSVC 组成的 Pipeline
+        source_version: 来源模型文件的哈希，写入推理文件用于判断是否过期
+
+    Returns:
+        可直接传给 np.savez 的数组字典
+
+    Raises:
+        ValueError: 估计器、核函数或预处理步骤不受支持
+    """
+    steps = list(estimator.steps) if hasattr(estimator, "steps") else [(None, estimator)]
+    svm = steps[-1][1]
+    kind = type(svm).__name__
+    if kind not in SUPPORTED_ESTIMATORS:
+        raise ValueError(f"不支持导出的估计器: {kind}")
+    if svm.kernel not in SUPPORTED_KERNELS:
+        raise ValueError(f"不支持导出的核函数: {svm.kernel}")
+    classes = np.asarray(svm.classes_)
+    if len(classes) > 2 and svm.break_ties and svm.decision_function_shape == "ovr":
+        raise ValueError("不支持 break_ties=True 的多分类模型")
+    if classes.dtype == object:
+        classes = classes.astype(str)
+
+    # 前置缩放器合并为一次仿射变换
+    n_features = svm.support_vectors_.shape[1]
+    scale, offset = np.ones(n_features), np.zeros(n_features)
+    for _, step in steps[:-1]:
+        if step is None or step == "passthrough":
+            continue
+        step_scale, step_offset = scaler_affine(step)
+        scale, offset = scale * step_scale, offset * step_scale + step_offset
+
+    return {
+        "format": np.array(ARTIFACT_FORMAT),
+        "source_version": np.array(source_version),
+        "kernel": np.array(svm.kernel),
+        "gamma": np.array(float(svm._gamma)),
+        "coef0": np.array(float(svm.coef0)),
+        "degree": np.array(float(svm.degree)),
+        "classes": classes,
+        "n_support": np.asarray(svm.n_support_, dtype=np.int32),
+        # 使用 libsvm 内部符号约定的对偶系数和截距（二分类时 scikit-learn 对外属性的符号是反的）
+        "support_vectors": np.asarray(svm.support_vectors_, dtype=np.float32),
+        "dual_coef": np.asarray(svm._dual_coef_, dtype=np.float32),
+        "intercept": np.asarray(svm._intercept_, dtype=np.float64),
+        "scale": scale,
+        "offset": offset
+    }
+
+
+def save_artifact(arrays: Dict[str, np.ndarray], path: str) -> str:
+    """写入推理文件（先写临时文件再替换，避免其他进程读到不完整的文件）"""
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        np.savez(f, **arrays)
+    os.replace(tmp_path, path)
+    return path
+
+
+class CompiledSVM:
+    """由导出数组构建的 SVM 推理器（仅依赖 NumPy）"""
+
+    def __init__(self, arrays: Dict[str, np.ndarray]):
+        if int(arrays["format"]) != ARTIFACT_FORMAT:
+            raise ValueError(f"推理文件格式版本不匹配: {int(arrays['format'])}")
+        self.source_version = str(arrays["source_version"])
+        self.kernel = str(arrays["kernel"])
+        self.gamma = float(arrays["gamma"])
+        self.coef0 = float(arrays["coef0"])
+        self.degree = float(arrays["degree"])
+        self.classes_ = arrays["classes"]
+        self.support_vectors = np.ascontiguousarray(arrays["support_vectors"], dtype=np.float64)
+        self.intercept = np.asarray(arrays["intercept"], dtype=np.float64)
+        self.scale = np.asarray(arrays["scale"], dtype=np.float64)
+        self.offset = np.asarray(arrays["offset"], dtype=np.float64)
+        self.n_features_in_ = self.support_vectors.shape[1]
+        self.pairs = self._class_pairs(len(self.classes_))
+        self.coef = self._pair_coefficients(
+            np.asarray(arrays["dual_coef"], dtype=np.float64),
+            np.asarray(arrays["n_support"], dtype=np.int64)
+        )
+        # RBF 核展开式中支持向量的平方范数
+        self.sv_sq_norms = np.einsum("ij,ij->i", self.support_vectors, self.support_vectors)
+
+    @classmethod
+    def load(cls, path: str) -> "CompiledSVM":
+        """从 .npz 推理文件加载"""
+        with np.load(path, allow_pickle=False) as data:
+            return cls({name: data[name] for name in data.files})
+
+    @staticmethod
+    def _class_pairs(n_classes: int) -> List[Tuple[int, int]]:
+        """一对一分类器的类别对，顺序与 libsvm 一致"""
+        return [(i, j) for i in range(n_classes) for j in range(i + 1, n_classes)]
+
+    def _pair_coefficients(self, dual_coef: np.ndarray, n_support: np.ndarray) -> np.ndarray:
+        """
+        把 libsvm 的对偶系数展开为 (类别对数, 支持向量数) 的系数矩阵，
+        每个一对一分类器的决策值即为一次矩阵乘法
+        """
+        starts = np.concatenate(([0], np.cumsum(n_support)))
+        coef = np.zeros((len(self.pairs), self.support_vectors.shape[0]), dtype=np.float64)
+        for p, (i, j) in enumerate(self.pairs):
+            si = slice(starts[i], starts[i + 1])
+            sj = slice(starts[j], starts[j + 1])
+            coef[p, si] = dual_coef[j - 1, si]
+            coef[p, sj] = dual_coef[i, sj]
+        return coef
+
+    def _kernel(self, X: np.ndarray) -> np.ndarray:
+        """样本与全部支持向量的核矩阵 (n_samples, n_support_vectors)"""
+        dot = X @ self.support_vectors.T
+        if self.kernel == "linear":
+            return dot
+        if self.kernel == "rbf":
+            sq_dist = np.einsum("ij,ij->i", X, X)[:, None] + self.sv_sq_norms[None, :] - 2.0 * dot
+            return np.exp(-self.gamma * np.maximum(sq_dist, 0.0))
+        if self.kernel == "poly":
+            return (self.gamma * dot + self.coef0) ** self.degree
+        return np.tanh(self.gamma * dot + self.coef0)
+
+    def _validate(self, X: Any) -> np.ndarray:
+        X = np.atleast_2d(np.asarray(X, dtype=np.float64))
+        if X.ndim != 2 or X.shape[1] != self.n_features_in_:
+            raise ValueError(f"特征维度不匹配: 期望 {self.n_features_in_}，实际 {X.shape}")
+        return X * self.scale + self.offset
+
+    def decision_function(self, X: Any) -> np.ndarray:
+        """
+        一对一决策值 (n_samples, n_pairs)，正值表示投给类别对中靠前的类别
+        （二分类时与 SVC.decision_function 符号相反，多分类时与 decision_function_shape="ovo" 一致）
+        """
+        X = self._validate(X)
+        return self._kernel(X) @ self.coef.T + self.intercept
+
+    def predict(self, X: Any) -> np.ndarray:
+        """预测类别标签"""
+        decision = self.decision_function(X)
+        n_classes = len(self.classes_)
+        if n_classes == 2:
+            return self.classes_[np.where(decision[:, 0] > 0, 0, 1)]
+        votes = np.zeros((decision.shape[0], n_classes), dtype=np.int64)
+        positive = decision > 0
+        for p, (i, j) in enumerate(self.pairs):
+            votes[:, i] += positive[:, p]
+            votes[:, j] += ~positive[:, p]
+        return self.classes_[np.argmax(votes, axis=1)]
+
+
+def load_compiled(model_path: str) -> Optional[CompiledSVM]:
+    """
+    加载模型文件对应的推理文件
+
+    Returns:
+        CompiledSVM；推理文件不存在、格式不符或与模型文件内容不一致时返回 None
+    """
+    path = artifact_path(model_path)
+    if not os.path.exists(path):
+        return None
+    try:
+        compiled = CompiledSVM.load(path)
+    except Exception as e:
+        logger.warning(f"[load_compiled] 推理文件无法加载: {path}, {str(e)}")
+        return None
+    if compiled.source_version != source_digest(model_path):
+        logger.warning(f"[load_compiled] 推理文件与模型文件不一致，需要重新导出: {path}")
+        return None
+    return compiled
+
+
+def compile_model(estimator: Any, model_path: str, save: bool = True) -> CompiledSVM:
+    """
+    导出已加载的模型并构建推理器，可选写入模型文件旁的推理文件（目录不可写时只在内存中使用）
+
+    Raises:
+        ValueError: 模型不支持导出
+    """
+    arrays = export_svm(estimator, source_digest(model_path))
+    if save:
+        path = artifact_path(model_path)
+        try:
+            save_artifact(arrays, path)
+            logger.info(f"[compile_model] 推理文件已导出: {path}")
+        except OSError as e:
+            logger.warning(f"[compile_model] 推理文件写入失败，仅在内存中使用: {path}, {str(e)}")
+    return CompiledSVM(arrays)
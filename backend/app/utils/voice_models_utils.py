@@ -6,86 +6,181 @@ import warnings
 import logging
 from pathlib import Path
 
+from app.core.config import settings
+from app.utils import feature_engine
+from app.utils.audio_context import AudioAnalysisContext
+from app.utils.cascade_model import CHROMA_SLICE, load_linear_stage
+from app.utils.svm_inference import compile_model, load_compiled
+
 warnings.filterwarnings("ignore")
 logger = logging.getLogger(__name__)
 
-MODEL_INSTANCE = None
+# 模型文件目录（项目根目录下的 ml_models/trained/voice_models）
+MODEL_DIR = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', '..', 'ml_models', 'trained', 'voice_models'))
+DEFAULT_MODEL_PATH = os.path.join(MODEL_DIR, 'svm_model.pkl')
+
+# 特征提取的采样参数（与训练时 librosa.load 的默认参数保持一致）
+FEATURE_SAMPLE_RATE = 22050
+FEATURE_OFFSET = 0.6
+FEATURE_DURATION = 2.5
+
+# 特征提取版本号，特征计算方式变化时递增（用作分析结果缓存键的一部分）
+FEATURE_VERSION = "2"
+
+
+def feature_version() -> str:
+    """分析结果缓存使用的特征版本（不同特征提取引擎的结果分开缓存）"""
+    if settings.FEATURE_ENGINE == "librosa":
+        return FEATURE_VERSION
+    return f"{FEATURE_VERSION}-{settings.FEATURE_ENGINE}"
 
 class AnalysisModel:
-    def __init__(self, model_path):
+    def __init__(self, model_path=None, mmap_mode=None, inference=None):
+        """
+        加载SVM模型
+
+        Args:
+            model_path: 模型文件路径，默认使用 DEFAULT_MODEL_PATH
+            mmap_mode: 传给 joblib.load 的内存映射模式（如 "r"），用于较大的模型文件
+            inference: 推理方式（sklearn / numpy），默认使用 settings.MODEL_INFERENCE
+        """
         try:
-            # 获取项目根目录
-            current_dir = os.path.dirname(os.path.abspath(__file__))
-            project_root = os.path.abspath(os.path.join(current_dir, '..', '..', '..'))
-            
-            # 构建完整的模型文件路径
-            model_file = os.path.join(project_root, 'ml_models', 'trained', 'voice_models', 'svm_model.pkl')
+            model_file = model_path or DEFAULT_MODEL_PATH
             
             logger.info(f"尝试加载模型文件: {model_file}")
             if not os.path.exists(model_file):
                 raise FileNotFoundError(f"模型文件不存在: {model_file}")
             
-            self.model_svm_loaded = joblib.load(model_file)
-            logger.info("模型加载成功")
+            self.model_path = model_file
+            self.inference = inference or settings.MODEL_INFERENCE
+            self.model_svm_loaded = None
+            self.compiled = None
+            if self.inference == "numpy":
+                # 优先使用已导出的推理文件，此时不加载 joblib 模型（也不导入 scikit-learn）
+                self.compiled = load_compiled(model_file)
+            if self.compiled is None:
+                self.model_svm_loaded = joblib.load(model_file, mmap_mode=mmap_mode)
+                if self.inference == "numpy":
+                    self._compile()
+            # 级联推理的第一级模型（未启用级联或没有与该模型对应的第一级模型时为 None）
+            self.cascade = load_linear_stage(model_file) if settings.MODEL_CASCADE else None
+            if settings.MODEL_CASCADE and self.cascade is None:
+                logger.warning(f"未找到与模型对应的级联第一级模型，全部请求由SVM判断: {model_file}")
+            logger.info(f"模型加载成功，推理方式: {self.inference}, 级联: {'是' if self.cascade is not None else '否'}")
         except Exception as e:
             logger.error(f"模型加载失败: {str(e)}")
             raise
 
-    def extract_features(self, data):
+    def _compile(self):
+        """推理文件不存在或已过期时，由已加载的模型导出；模型不支持导出时退回 scikit-learn 推理"""
+        try:
+            self.compiled = compile_model(self.model_svm_loaded, self.model_path)
+            self.model_svm_loaded = None
+        except ValueError as e:
+            logger.warning(f"模型无法导出为NumPy推理，使用scikit-learn推理: {str(e)}")
+            self.inference = "sklearn"
+
+    def _predict(self, X):
+        if self.compiled is not None:
+            return self.compiled.predict(X)
+        return self.model_svm_loaded.predict(X)
+
+    def extract_chroma(self, context):
+        """12 维色度特征均值（与梅尔谱共用同一份幅度谱）"""
+        if settings.FEATURE_ENGINE == "numpy":
+            return feature_engine.chroma_mean(context)
+        return np.mean(librosa.feature.chroma_stft(S=context.stft_magnitude(), sr=context.sr).T, axis=0)
+
+    def extract_features(self, data, with_chroma=True):
+        # 兼容直接传入信号数组的旧调用方式
+        if isinstance(data, AudioAnalysisContext):
+            context = data
+        else:
+            context = AudioAnalysisContext(data, FEATURE_SAMPLE_RATE)
+        if settings.FEATURE_ENGINE == "numpy":
+            return feature_engine.extract_features(context, with_chroma)
+        y = context.y
+
         # ZCR
         result = np.array([])
-        zcr = np.mean(librosa.feature.zero_crossing_rate(data).T, axis=0)
+        zcr = np.mean(librosa.feature.zero_crossing_rate(y).T, axis=0)
         result = np.hstack((result, zcr)) # stacking horizontally
         
-        # Chroma_stft
-        stft = np.abs(librosa.stft(data))
-        chroma_stft = np.mean(librosa.feature.chroma_stft(S=stft).T, axis=0)
+        # Chroma_stft（级联第一级不需要色度特征，对应位置填 NaN）
+        chroma_stft = self.extract_chroma(context) if with_chroma else np.full(12, np.nan)
         result = np.hstack((result, chroma_stft)) # stacking horizontally
         
-        # MFCC
-        mfcc = np.mean(librosa.feature.mfcc(y=data).T, axis=0)
+        # MFCC（由缓存的梅尔功率谱计算，不再重复STFT）
+        mel_power = context.mel_power()
+        mfcc = np.mean(librosa.feature.mfcc(S=librosa.power_to_db(mel_power), sr=context.sr).T, axis=0)
         result = np.hstack((result, mfcc)) # stacking horizontally
         
-        # Root Mean Square Value
-        rms = np.mean(librosa.feature.rms(y=data).T, axis=0)
+        # Root Mean Square Value（基于缓存的分帧信号）
+        rms = np.mean(np.sqrt(np.mean(context.frames() ** 2, axis=0)), keepdims=True)
         result = np.hstack((result, rms)) # stacking horizontally
         
         # MelSpectogram
-        mel = np.mean(librosa.feature.melspectrogram(y=data).T, axis=0)
+        mel = np.mean(mel_power.T, axis=0)
         result = np.hstack((result, mel)) # stacking horizontally
         
         return result
 
-    def get_features(self, path):
+    def get_features(self, path, with_chroma=True):
+        """
+        提取特征向量，path 可以是文件路径或 AudioAnalysisContext
+        传入上下文时结果会缓存在上下文中，同一次上传只计算一次
+
+        Args:
+            with_chroma: 为 False 时只提取低成本特征组（色度位置为 NaN，供级联第一级使用）；
+                之后再提取完整特征时只补算色度特征
+        """
+        context = path if isinstance(path, AudioAnalysisContext) else AudioAnalysisContext.from_file(path)
         # duration and offset are used to take care of the no audio in start and the ending of each audio files as seen above.
-        data, sample_rate = librosa.load(path, duration=2.5, offset=0.6)
+        segment = context.segment(FEATURE_OFFSET, FEATURE_DURATION, FEATURE_SAMPLE_RATE)
         
+        full = context.peek("features")
+        if full is not None:
+            return full
+        if not with_chroma:
+            return context.cached("light_features", lambda: np.array(self.extract_features(segment, with_chroma=False)))
+        light = context.peek("light_features")
+        if light is not None:
+            return context.cached("features", lambda: self._complete_features(light, segment))
         # without augmentation
-        res1 = self.extract_features(data)
-        result = np.array(res1)
-        
-        return result
+        return context.cached("features", lambda: np.array(self.extract_features(segment)))
+
+    def _complete_features(self, light, segment):
+        """在低成本特征组的基础上补算色度特征，得到完整特征向量"""
+        features = np.array(light)
+        features[CHROMA_SLICE] = self.extract_chroma(segment)
+        return features
 
     def get_pred(self, audio_path):
         X = []
         audio_feature = self.get_features(audio_path)
         X.append(audio_feature)
-        logger.info(f"处理音频文件: {audio_path}")
-        result = self.model_svm_loaded.predict(X)[0]
+        source = audio_path.source if isinstance(audio_path, AudioAnalysisContext) else audio_path
+        logger.info(f"处理音频文件: {source}")
+        result = self._predict(X)[0]
         return result
 
+    def predict_batch(self, features):
+        """
+        对多段音频的特征矩阵做一次批量预测
+        Args:
+            features: (n_clips, n_features) 特征矩阵
+        Returns:
+            预测标签数组
+        """
+        X = np.atleast_2d(np.asarray(features))
+        logger.info(f"批量预测: {X.shape[0]} 段音频")
+        return self._predict(X)
+
 def create_model() -> AnalysisModel:
     """
-    创建并返回模型实例（全局只加载一次）
+    返回当前生效的模型实例（由进程内的模型注册表统一加载，每个版本只加载一次）
     Returns:
         AnalysisModel实例
     """
-    global MODEL_INSTANCE
-    if MODEL_INSTANCE is None:
-        # 获取项目根目录
-        current_dir = os.path.dirname(os.path.abspath(__file__))
-        project_root = os.path.abspath(os.path.join(current_dir, '..', '..', '..'))
-        # 构建模型文件路径
-        model_path = os.path.join(project_root, 'ml_models', 'trained', 'voice_models', 'svm_model.pkl')
-        MODEL_INSTANCE = AnalysisModel(model_path)
-    return MODEL_INSTANCE
\ No newline at end of file
+    from app.utils.model_registry import model_registry
+    return model_registry.get()
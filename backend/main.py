@@ -1,16 +1,29 @@
 from fastapi import FastAPI, Depends
 from fastapi.middleware.cors import CORSMiddleware
 from app.core.config import settings
-from app.api.v1.endpoints import auth, users, diagnosis, llm, dashboard, microphone_test
+import os
+
+# numba 编译缓存目录须在导入 librosa 之前设置（分析工作进程以 spawn 启动，继承该环境变量）
+if settings.NUMBA_CACHE_DIR:
+    os.makedirs(settings.NUMBA_CACHE_DIR, exist_ok=True)
+    os.environ.setdefault("NUMBA_CACHE_DIR", settings.NUMBA_CACHE_DIR)
+
+from app.api.v1.endpoints import auth, users, diagnosis, llm, dashboard, microphone_test, admin
 from app.db.session import engine, get_db
 from app.db.models import Base
+from app.services.analysis_executor import analysis_executor
+from app.services.analysis_job_service import analysis_job_manager
+from app.services.inference_scheduler import inference_scheduler
+from app.services.llm_wait_service import llm_result_waiter
+from app.services.model_service import cascade_stats
+from app.services.warmup_service import warm_up_service
+from app.utils.model_registry import model_registry
+from app.utils.analysis_cache import analysis_cache
 import uvicorn
 import logging
 from fastapi.responses import JSONResponse
 from fastapi.encoders import jsonable_encoder
 from sqlalchemy.orm import Session
-import pymysql
-import os
 from fastapi.exception_handlers import RequestValidationError
 from fastapi.exceptions import RequestValidationError
 from fastapi import Request, status
@@ -30,23 +43,6 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-# 在应用启动时检查数据库连接
-try:
-    # 测试与MySQL的连接
-    conn = pymysql.connect(
-        host=settings.MYSQL_HOST,
-        port=int(settings.MYSQL_PORT),
-        user=settings.MYSQL_USER,
-        password=settings.MYSQL_PASSWORD,
-        database=settings.MYSQL_DATABASE,
-    )
-    conn.close()
-    logger.info(f"成功连接到MySQL数据库: {settings.MYSQL_DATABASE}")
-except Exception as e:
-    logger.error(f"无法连接到MySQL数据库: {e}")
-    logger.warning("请确保MySQL服务正在运行并且已经初始化数据库")
-    logger.info("可以使用 'python init_mysql_db.py' 初始化数据库")
-
 app = FastAPI(
     title=settings.PROJECT_NAME,
     version=settings.VERSION,
@@ -61,6 +57,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "X-Total-Count"],  # 分析历史的分页信息
 )
 
 # 注册路由
@@ -70,6 +67,7 @@ app.include_router(diagnosis.router, prefix=f"{settings.API_V1_STR}/diagnosis",
 app.include_router(llm.router, prefix=f"{settings.API_V1_STR}/llm", tags=["大模型调用"])
 app.include_router(dashboard.router, prefix=f"{settings.API_V1_STR}/dashboard", tags=["仪表盘"])
 app.include_router(microphone_test.router, prefix=f"{settings.API_V1_STR}/microphone-test", tags=["麦克风测试"])
+app.include_router(admin.router, prefix=f"{settings.API_V1_STR}/admin", tags=["系统管理"])
 
 @app.get("/")
 def read_root():
@@ -88,6 +86,44 @@ def check_db_status(db: Session = Depends(get_db)):
     except Exception as e:
         return {"status": "error", "message": f"数据库连接失败: {str(e)}"}
 
+@app.get("/analysis-status")
+def check_analysis_status():
+    """分析进程池运行指标（队列深度、拒绝次数等）、推理合批直方图、级联推理各层级命中、异步分析任务、LLM结果长轮询和分析缓存命中统计"""
+    return {
+        "status": "success",
+        "executor": analysis_executor.stats(),
+        "inference": inference_scheduler.stats(),
+        "cascade": cascade_stats.stats(),
+        "jobs": analysis_job_manager.stats(),
+        "llm_wait": llm_result_waiter.stats(),
+        "cache": analysis_cache.stats()
+    }
+
+@app.get("/healthz")
+def liveness():
+    """存活检查：进程能响应即返回200，同时附带预热状态"""
+    return {"status": "alive", "warm_up": warm_up_service.info()}
+
+@app.get("/readyz")
+def readiness():
+    """就绪检查：数据库连接池、模型、特征提取和分析工作进程全部预热完成前返回503"""
+    info = warm_up_service.info()
+    if not info["ready"]:
+        return JSONResponse(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, content={"status": "warming", **info})
+    return {"status": "ready", "model": model_registry.active_ref()._asdict(), **info}
+
+@app.on_event("startup")
+async def start_warm_up():
+    """启动时在后台并发预热数据库连接池、模型注册表、特征提取、分析工作进程和LLM客户端，避免首个请求承担冷启动开销"""
+    warm_up_service.start()
+
+@app.on_event("shutdown")
+async def shutdown_services():
+    """停止预热和异步分析任务、关闭LLM HTTP客户端和分析进程池"""
+    await warm_up_service.stop()
+    await analysis_job_manager.stop()
+    analysis_executor.shutdown()
+
 @app.exception_handler(RequestValidationError)
 async def validation_exception_handler(request: Request, exc: RequestValidationError):
     logger.error("====== 422 Unprocessable Entity Traceback ======")
@@ -0,0 +1,199 @@
+"""
+特征组消融基准测试
+
+衡量 extract_features 中各特征组（ZCR、色度、MFCC、RMS、梅尔谱）的CPU耗时与对SVM准确率的贡献：
+1. 耗时：按片段时长分别计时每组特征单独提取的耗时，以及从完整特征中去掉该组后节省的耗时
+   （色度与梅尔谱共用幅度谱、MFCC与梅尔谱共用梅尔功率谱，共用部分只在单独提取时计入）
+2. 准确率：在有标注的数据集上，用与当前模型相同的估计器和超参数（sklearn.base.clone）
+   对每种特征组组合分层交叉验证
+3. 输出各组合在线上片段时长（FEATURE_DURATION）下的特征提取耗时与交叉验证准确率，并标出帕累托最优的组合
+计时前会检查各组拼接的结果与 AnalysisModel.extract_features 一致，确保计时对象就是线上的特征提取
+
+数据集格式与 scripts/train_cascade_model.py 相同（<目录>/<标签>/*.wav 或 path,label CSV 清单）；
+不指定 --data 时只用样例音频计时
+
+用法:
+    python scripts/benchmark_feature_ablation.py [--data path/to/dataset] [--durations 1,2.5,5,10] [--repeat 20] [--folds 5] [--all]
+"""
+
+import argparse
+import itertools
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Sequence, Tuple
+
+import librosa
+import numpy as np
+from sklearn.base import clone
+from sklearn.model_selection import StratifiedKFold, cross_val_score
+
+# 添加项目根目录到 Python 路径
+project_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(project_root / "backend"))
+
+from app.core.config import settings
+from app.utils import feature_engine
+from app.utils.audio_context import AudioAnalysisContext
+from app.utils.audio_decoder import decode_audio_bytes
+from app.utils.voice_models_utils import AnalysisModel, DEFAULT_MODEL_PATH, FEATURE_DURATION, FEATURE_SAMPLE_RATE
+from train_cascade_model import list_dataset
+
+GROUPS = list(feature_engine.FEATURE_GROUPS)
+SAMPLE_AUDIO = project_root / "ml_models" / "trained" / "voice_models" / "P1COPDMc_2.wav"
+
+
+def group_extractors(model: AnalysisModel) -> Dict[str, Callable[[AudioAnalysisContext], np.ndarray]]:
+    """按当前特征提取引擎逐组提取特征（与 AnalysisModel.extract_features 的计算方式相同）"""
+    if settings.FEATURE_ENGINE == "numpy":
+        return {
+            "zcr": lambda c: np.mean(feature_engine.zero_crossing_rate(c.y), keepdims=True),
+            "chroma": feature_engine.chroma_mean,
+            "mfcc": lambda c: np.mean(feature_engine.mfcc(c.mel_power()), axis=1),
+            "rms": lambda c: np.mean(np.sqrt(np.mean(c.frames() ** 2, axis=0)), keepdims=True),
+            "mel": lambda c: np.mean(c.mel_power(), axis=1)
+        }
+    return {
+        "zcr": lambda c: np.mean(librosa.feature.zero_crossing_rate(c.y).T, axis=0),
+        "chroma": model.extract_chroma,
+        "mfcc": lambda c: np.mean(librosa.feature.mfcc(S=librosa.power_to_db(c.mel_power()), sr=c.sr).T, axis=0),
+        "rms": lambda c: np.mean(np.sqrt(np.mean(c.frames() ** 2, axis=0)), keepdims=True),
+        "mel": lambda c: np.mean(c.mel_power().T, axis=0)
+    }
+
+
+def subset_ms(extractors, y: np.ndarray, groups: Sequence[str], repeat: int) -> float:
+    """在新的上下文中只提取指定特征组的耗时中位数（毫秒），共用的幅度谱和梅尔功率谱按需计算"""
+    durations = []
+    for _ in range(repeat):
+        context = AudioAnalysisContext(y, FEATURE_SAMPLE_RATE)
+        start = time.perf_counter()
+        for group in groups:
+            extractors[group](context)
+        durations.append((time.perf_counter() - start) * 1000)
+    return statistics.median(durations)
+
+
+def check_extractors(model: AnalysisModel, extractors, y: np.ndarray) -> bool:
+    """逐组提取拼接的结果与 AnalysisModel.extract_features 一致"""
+    context = AudioAnalysisContext(y, FEATURE_SAMPLE_RATE)
+    stacked = np.hstack([extractors[group](context) for group in GROUPS])
+    return np.allclose(stacked, model.extract_features(AudioAnalysisContext(y, FEATURE_SAMPLE_RATE)))
+
+
+def clip(y: np.ndarray, seconds: float) -> np.ndarray:
+    """把信号循环拼接或截取到指定时长"""
+    n = int(seconds * FEATURE_SAMPLE_RATE)
+    return np.resize(y, n).astype(np.float32)
+
+
+def print_timing(extractors, y: np.ndarray, durations: List[float], repeat: int) -> Dict[Tuple[str, ...], float]:
+    """打印各片段时长下每组特征的单独耗时和去掉该组后节省的耗时，返回线上时长下各组合的耗时"""
+    header = f"{'时长(s)':>8}{'完整(ms)':>10}" + "".join(f"{group + '单独':>10}{group + '节省':>10}" for group in GROUPS)
+    print("各特征组耗时（单独：只提取该组；节省：完整特征去掉该组后减少的耗时）")
+    print(header)
+    print("-" * len(header))
+    for seconds in durations:
+        segment = clip(y, seconds)
+        full = subset_ms(extractors, segment, GROUPS, repeat)
+        row = f"{seconds:>8g}{full:>10.2f}"
+        for group in GROUPS:
+            alone = subset_ms(extractors, segment, [group], repeat)
+            saved = full - subset_ms(extractors, segment, [g for g in GROUPS if g != group], repeat)
+            row += f"{alone:>10.2f}{saved:>10.2f}"
+        print(row)
+    segment = clip(y, FEATURE_DURATION)
+    return {combo: subset_ms(extractors, segment, combo, repeat) for combo in combinations()}
+
+
+def combinations() -> List[Tuple[str, ...]]:
+    """全部非空特征组组合"""
+    return [combo for size in range(1, len(GROUPS) + 1) for combo in itertools.combinations(GROUPS, size)]
+
+
+def columns(combo: Sequence[str]) -> np.ndarray:
+    return np.r_[tuple(feature_engine.FEATURE_GROUPS[group] for group in combo)]
+
+
+def dataset_features(model: AnalysisModel, data: str) -> Tuple[np.ndarray, np.ndarray]:
+    """提取数据集的完整特征向量和标签"""
+    rows, labels = [], []
+    for path, label in list_dataset(data):
+        try:
+            y, sr = decode_audio_bytes(path.read_bytes(), path.suffix)
+        except Exception as e:
+            print(f"  跳过无法解码的文件: {path} ({e})")
+            continue
+        rows.append(model.get_features(AudioAnalysisContext(y, sr, source=str(path))))
+        labels.append(label)
+    return np.vstack(rows), np.array(labels)
+
+
+def pareto(points: Dict[Tuple[str, ...], Tuple[float, float]]) -> set:
+    """耗时更低且准确率不更差（或准确率更高且耗时不更高）的组合不存在时，该组合为帕累托最优"""
+    front = set()
+    for combo, (ms, acc) in points.items():
+        dominated = any(
+            other_ms <= ms and other_acc >= acc and (other_ms < ms or other_acc > acc)
+            for other, (other_ms, other_acc) in points.items() if other != combo
+        )
+        if not dominated:
+            front.add(combo)
+    return front
+
+
+def main():
+    parser = argparse.ArgumentParser(description="特征组消融基准测试")
+    parser.add_argument("--data", default=None, help="有标注的数据集目录或 CSV 清单，不指定时只计时")
+    parser.add_argument("--durations", default=f"1,{FEATURE_DURATION:g},5,10", help="逗号分隔的片段时长（秒）")
+    parser.add_argument("--repeat", type=int, default=20, help="计时的重复次数")
+    parser.add_argument("--folds", type=int, default=5, help="交叉验证折数")
+    parser.add_argument("--model", default=settings.MODEL_PATH or DEFAULT_MODEL_PATH, help="提供估计器和超参数的模型文件")
+    parser.add_argument("--all", action="store_true", help="列出全部组合（默认只列帕累托最优的组合）")
+    args = parser.parse_args()
+    durations = [float(d) for d in args.durations.split(",") if d.strip()]
+
+    model = AnalysisModel(args.model, inference="sklearn")
+    extractors = group_extractors(model)
+    y, sr = decode_audio_bytes(SAMPLE_AUDIO.read_bytes(), ".wav")
+    y = AudioAnalysisContext(y, sr).segment(0.0, len(y) / sr, FEATURE_SAMPLE_RATE).y
+    if not check_extractors(model, extractors, clip(y, FEATURE_DURATION)):
+        print("逐组提取的特征与 extract_features 不一致，请同步 group_extractors")
+        sys.exit(1)
+    print(f"特征提取引擎: {settings.FEATURE_ENGINE}, 线上片段时长: {FEATURE_DURATION:g}s @ {FEATURE_SAMPLE_RATE}Hz")
+    print()
+    timings = print_timing(extractors, y, durations, args.repeat)
+
+    accuracies: Dict[Tuple[str, ...], Tuple[float, float]] = {}
+    if args.data:
+        X, labels = dataset_features(model, args.data)
+        folds = StratifiedKFold(n_splits=min(args.folds, int(np.min(np.unique(labels, return_counts=True)[1]))), shuffle=True, random_state=0)
+        print()
+        print(f"数据集: {len(labels)} 段, {folds.n_splits} 折交叉验证, 估计器: {model.model_svm_loaded}")
+        for combo in combinations():
+            scores = cross_val_score(clone(model.model_svm_loaded), X[:, columns(combo)], labels, cv=folds)
+            accuracies[combo] = (float(np.mean(scores)), float(np.std(scores)))
+
+    points = {combo: (timings[combo], accuracies.get(combo, (0.0, 0.0))[0]) for combo in timings}
+    front = pareto(points) if accuracies else set(points)
+    full = tuple(GROUPS)
+    print()
+    print(f"各特征组组合（片段时长 {FEATURE_DURATION:g}s，* 为帕累托最优）")
+    header = f"{'特征组':<28}{'维数':>6}{'耗时(ms)':>10}{'相对完整':>10}{'准确率':>10}{'标准差':>8}{'准确率变化':>12}"
+    print(header)
+    print("-" * len(header))
+    for combo in sorted(points, key=lambda c: (points[c][0], -points[c][1])):
+        if not args.all and combo not in front and combo != full:
+            continue
+        ms = timings[combo]
+        mark = "*" if combo in front and accuracies else " "
+        row = f"{mark}{'+'.join(combo):<27}{len(columns(combo)):>6}{ms:>10.2f}{ms / timings[full]:>10.0%}"
+        if accuracies:
+            acc, std = accuracies[combo]
+            row += f"{acc:>10.1%}{std:>8.1%}{acc - accuracies[full][0]:>+12.1%}"
+        print(row)
+
+
+if __name__ == "__main__":
+    main()
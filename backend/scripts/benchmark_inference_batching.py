@@ -0,0 +1,105 @@
+"""
+推理合批基准测试
+
+模拟多个并发请求几乎同时需要SVM预测的情况，对比：
+- 逐条预测：每个请求在线程池中各做一次单行 predict（相当于原来每个工作进程各自预测）
+- 合批预测：经 InferenceScheduler 在时间窗口内合并后做一次向量化预测
+输出吞吐量、端到端延迟分位数，以及调度器的批大小和等待时间直方图；
+同时检查合批预测的标签与逐条预测一致
+
+用法:
+    python scripts/benchmark_inference_batching.py [--requests 512] [--concurrency 1,8,32,64] [--window-ms 5] [--inference sklearn]
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+# 添加项目根目录到 Python 路径
+project_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(project_root / "backend"))
+
+from app.core.config import settings
+
+
+def percentile(values, q: float) -> float:
+    return float(np.percentile(values, q)) if values else 0.0
+
+
+async def run_requests(predict, rows: np.ndarray, concurrency: int):
+    """以固定并发度发出全部请求，返回总耗时（秒）、各请求延迟（毫秒）和预测标签"""
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = [0.0] * len(rows)
+    labels = [None] * len(rows)
+
+    async def _one(i: int):
+        async with semaphore:
+            start = time.perf_counter()
+            labels[i] = (await predict(rows[i]))[0]
+            latencies[i] = (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    await asyncio.gather(*[_one(i) for i in range(len(rows))])
+    return time.perf_counter() - start, latencies, labels
+
+
+async def benchmark(args):
+    from app.services.inference_scheduler import InferenceScheduler
+    from app.utils.model_registry import model_registry
+
+    ref = model_registry.warm_up()
+    model = model_registry.get(ref)
+    n_features = model.compiled.n_features_in_ if model.compiled is not None else model.model_svm_loaded.n_features_in_
+    rng = np.random.default_rng(0)
+    rows = rng.normal(size=(args.requests, n_features)) * 20
+    loop = asyncio.get_running_loop()
+
+    async def single(row):
+        return await loop.run_in_executor(None, lambda: [str(label) for label in model.predict_batch(row)])
+
+    header = f"{'并发':>6}{'方式':>8}{'吞吐(次/秒)':>14}{'p50(ms)':>10}{'p99(ms)':>10}{'平均批大小':>12}"
+    print(f"模型版本: {ref.version}, 推理方式: {model.inference}, 合批窗口: {args.window_ms} ms, 最大批: {args.max_batch}")
+    print(header)
+    print("-" * len(header))
+    failed = False
+    for concurrency in args.concurrency:
+        elapsed, latencies, expected = await run_requests(single, rows, concurrency)
+        print(f"{concurrency:>6}{'逐条':>8}{len(rows) / elapsed:>14.0f}{percentile(latencies, 50):>10.2f}{percentile(latencies, 99):>10.2f}{1:>12.1f}")
+        scheduler = InferenceScheduler(window_ms=args.window_ms, max_batch=args.max_batch)
+        elapsed, latencies, labels = await run_requests(lambda row: scheduler.predict(row, ref), rows, concurrency)
+        stats = scheduler.stats()
+        print(f"{concurrency:>6}{'合批':>8}{len(rows) / elapsed:>14.0f}{percentile(latencies, 50):>10.2f}{percentile(latencies, 99):>10.2f}{stats['avg_batch_size']:>12.1f}")
+        if labels != expected:
+            failed = True
+            print(f"  合批预测标签与逐条预测不一致: {sum(a != b for a, b in zip(labels, expected))} 条")
+        if args.histograms:
+            print(f"  批大小直方图: {json.dumps(stats['batch_size']['buckets'])}")
+            print(f"  等待时间直方图(ms): {json.dumps(stats['wait_ms']['buckets'])}")
+    return failed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="推理合批基准测试")
+    parser.add_argument("--requests", type=int, default=512, help="每种并发度下的请求总数")
+    parser.add_argument("--concurrency", default="1,8,32,64", help="逗号分隔的并发度")
+    parser.add_argument("--window-ms", type=float, default=settings.INFERENCE_BATCH_WINDOW_MS, help="合批窗口（毫秒）")
+    parser.add_argument("--max-batch", type=int, default=settings.INFERENCE_BATCH_MAX_SIZE, help="单批最多样本数")
+    parser.add_argument("--inference", choices=["sklearn", "numpy"], default=settings.MODEL_INFERENCE, help="SVM推理方式")
+    parser.add_argument("--histograms", action="store_true", help="打印每种并发度下的直方图")
+    args = parser.parse_args()
+    args.concurrency = [int(c) for c in args.concurrency.split(",") if c.strip()]
+    settings.MODEL_INFERENCE = args.inference
+
+    failed = asyncio.run(benchmark(args))
+    print()
+    print("合批预测标签一致性检查未通过" if failed else "合批预测标签与逐条预测一致")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
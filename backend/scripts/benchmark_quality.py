@@ -0,0 +1,139 @@
+"""
+音频质量评分基准测试
+
+对比原有的逐帧循环实现与向量化质量评分引擎：
+- 评分差异（超过 --tolerance 时返回非零退出码）
+- 单段评分耗时（含/不含幅度谱计算）
+- 多段音频一次批量评分与逐段评分的耗时
+
+样例音频较短，另外拼接为 10 秒录音，并附加一段 10 秒合成信号
+用法:
+    python scripts/benchmark_quality.py [--repeat 10] [--tolerance 1e-6]
+"""
+
+import argparse
+import statistics
+import sys
+import time
+from pathlib import Path
+
+import librosa
+import numpy as np
+
+# 添加项目根目录到 Python 路径
+project_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(project_root / "backend"))
+
+from app.services.analysis_pipeline import evaluate_audio_quality, evaluate_audio_quality_batch
+from app.utils.audio_context import AudioAnalysisContext
+from app.utils.audio_decoder import decode_audio_bytes
+
+AUDIO_DIR = project_root / "ml_models" / "trained" / "voice_models"
+AUDIO_FILES = ["test_audio.wav", "P1COPDMc_2.wav"]
+LONG_SECONDS = 10
+
+
+def legacy_quality(context: AudioAnalysisContext) -> float:
+    """原有实现（逐帧循环计算短时能量，过零率和频谱质心单独调用 librosa），仅用于对比"""
+    y, sr = context.y, context.sr
+    frame_length = int(sr * 0.025)
+    hop_length = int(sr * 0.010)
+    energy = np.array([
+        sum(abs(y[i:i+frame_length]**2))
+        for i in range(0, len(y)-frame_length, hop_length)
+    ])
+    energy_mean = np.mean(energy)
+    energy_var = np.std(energy) / energy_mean if energy_mean > 0 else 0
+    energy_score = max(0, 1 - min(1, energy_var * 2))
+    duration_score = min(1.0, len(y) / sr / 2.0)
+    silence_ratio = np.sum(np.abs(y) < 0.01 * np.max(np.abs(y))) / len(y)
+    silence_score = 1.0 - max(0, min(1.0, (silence_ratio - 0.2) / 0.6))
+    if silence_ratio > 0.7:
+        return 0.3
+    zcr_score = min(1.0, np.std(librosa.feature.zero_crossing_rate(y)[0]) * 25)
+    D = np.abs(librosa.stft(y, n_fft=2048))
+    spectral_score = min(1.0, np.std(librosa.feature.spectral_centroid(S=D, sr=sr)[0]) / 400)
+    frames = librosa.util.frame(np.pad(y, frame_length // 2), frame_length=frame_length, hop_length=hop_length)
+    energy_frames = np.sqrt(np.mean(frames ** 2, axis=0))
+    active_frames = np.sum(energy_frames > 0.05 * np.max(energy_frames)) / len(energy_frames)
+    vad_score = min(1.0, active_frames / 0.3)
+    if active_frames < 0.1:
+        return 0.3
+    freqs = librosa.fft_frequencies(sr=sr, n_fft=2048)
+    total_energy = np.mean(D)
+    resp_ratio = np.mean(D[(freqs >= 200) & (freqs <= 800), :]) / total_energy if total_energy > 0 else 0
+    respiration_score = min(1.0, resp_ratio * 10)
+    if resp_ratio < 0.05:
+        respiration_score = respiration_score * 0.5
+    quality_score = (
+        0.15 * energy_score + 0.10 * duration_score + 0.15 * silence_score + 0.10 * zcr_score +
+        0.10 * spectral_score + 0.25 * vad_score + 0.15 * respiration_score
+    )
+    return max(0.2, min(0.95, 0.3 + 0.7 * quality_score))
+
+
+def load_signals():
+    """样例音频（流水线采样率）、拼接的 10 秒版本和 10 秒合成信号"""
+    signals = []
+    for name in AUDIO_FILES:
+        path = AUDIO_DIR / name
+        if not path.exists():
+            print(f"{name}: 文件不存在，跳过")
+            continue
+        y, sr = decode_audio_bytes(path.read_bytes(), ".wav")
+        signals.append((name, y, sr))
+        repeats = int(np.ceil(LONG_SECONDS * sr / len(y)))
+        signals.append((f"{name}x{LONG_SECONDS}s", np.tile(y, repeats)[:LONG_SECONDS * sr], sr))
+    rng = np.random.default_rng(0)
+    sr = signals[0][2] if signals else 22050
+    t = np.arange(LONG_SECONDS * sr) / sr
+    breath = 0.2 * np.sin(2 * np.pi * 0.3 * t) ** 2 * rng.standard_normal(len(t)) + 0.005 * rng.standard_normal(len(t))
+    signals.append(("synthetic", breath.astype(np.float32), sr))
+    return signals
+
+
+def timed(fn, repeat: int):
+    """返回最后一次的结果和多次运行耗时的中位数（毫秒）"""
+    durations = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        durations.append((time.perf_counter() - start) * 1000)
+    return result, statistics.median(durations)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="音频质量评分基准测试")
+    parser.add_argument("--repeat", type=int, default=10, help="每项计时的重复次数")
+    parser.add_argument("--tolerance", type=float, default=1e-6, help="允许的评分差异")
+    args = parser.parse_args()
+
+    signals = load_signals()
+    header = f"{'音频':<24}{'原有评分':>10}{'新评分':>10}{'差异':>10}{'原有(ms)':>10}{'新(ms)':>10}{'新,含STFT(ms)':>15}"
+    print(header)
+    print("-" * len(header))
+    failed = False
+    for name, y, sr in signals:
+        legacy, legacy_ms = timed(lambda: legacy_quality(AudioAnalysisContext(y, sr)), args.repeat)
+        # 幅度谱已在上下文中（与特征提取共用）时的评分耗时
+        context = AudioAnalysisContext(y, sr)
+        context.stft_magnitude()
+        score, warm_ms = timed(lambda: evaluate_audio_quality(context), args.repeat)
+        _, cold_ms = timed(lambda: evaluate_audio_quality(AudioAnalysisContext(y, sr)), args.repeat)
+        diff = abs(score - legacy)
+        failed = failed or diff > args.tolerance
+        print(f"{name:<24}{legacy:>10.4f}{score:>10.4f}{diff:>10.1e}{legacy_ms:>10.1f}{warm_ms:>10.2f}{cold_ms:>15.2f}")
+
+    print()
+    _, single_ms = timed(lambda: [evaluate_audio_quality(AudioAnalysisContext(y, sr)) for _, y, sr in signals], args.repeat)
+    scores, batch_ms = timed(lambda: evaluate_audio_quality_batch([AudioAnalysisContext(y, sr) for _, y, sr in signals]), args.repeat)
+    print(f"{len(signals)} 段音频逐段评分: {single_ms:.1f} ms，一次批量评分: {batch_ms:.1f} ms")
+
+    print()
+    print("评分一致性检查未通过" if failed else "评分一致性检查通过")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""
+流水线采样率与重采样质量基准测试
+
+对比原有流程（特征提取按 22.05kHz 单独加载片段、质量评估按原始采样率加载）
+与统一流水线采样率（一次解码直接输出 PIPELINE_SAMPLE_RATE）在不同重采样质量下的：
+- 解码 + 特征提取 + 质量评估的耗时
+- 特征向量相对原有流程的偏差
+- SVM 预测标签是否一致
+- 音频质量评分的变化
+
+用法:
+    python scripts/benchmark_sample_rate.py [--repeat 5] [--rates 22050,16000] [--qualities soxr_hq,soxr_qq]
+"""
+
+import argparse
+import io
+import statistics
+import sys
+import time
+from pathlib import Path
+
+import librosa
+import numpy as np
+import soundfile as sf
+
+# 添加项目根目录到 Python 路径
+project_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(project_root / "backend"))
+
+from app.core.config import settings
+from app.services.analysis_pipeline import evaluate_audio_quality
+from app.utils.audio_context import AudioAnalysisContext
+from app.utils.audio_decoder import decode_audio_bytes
+from app.utils.voice_models_utils import (
+    AnalysisModel,
+    FEATURE_DURATION,
+    FEATURE_OFFSET,
+    FEATURE_SAMPLE_RATE
+)
+
+AUDIO_DIR = project_root / "ml_models" / "trained" / "voice_models"
+AUDIO_FILES = ["test_audio.wav", "P1COPDMc_2.wav"]
+
+# 浏览器/手机录音常见的采样率，用于模拟线上上传（样例文件本身为 4kHz）
+UPLOAD_SAMPLE_RATE = 44100
+
+
+def run_legacy(model: AnalysisModel, content: bytes):
+    """原有流程：特征和质量评估各自加载、各自重采样"""
+    y, _ = librosa.load(io.BytesIO(content), sr=FEATURE_SAMPLE_RATE, offset=FEATURE_OFFSET, duration=FEATURE_DURATION)
+    features = np.array(model.extract_features(y))
+    y_native, sr_native = librosa.load(io.BytesIO(content), sr=None)
+    quality = evaluate_audio_quality(AudioAnalysisContext(y_native, sr_native))
+    return features, quality
+
+
+def run_pipeline(model: AnalysisModel, content: bytes, sr: int):
+    """统一流水线：一次解码直接输出流水线采样率，各环节共用"""
+    y, sample_rate = decode_audio_bytes(content, ".wav", sr)
+    context = AudioAnalysisContext(y, sample_rate)
+    features = np.array(model.get_features(context))
+    quality = evaluate_audio_quality(context)
+    return features, quality
+
+
+def to_upload_rate(content: bytes) -> bytes:
+    """将样例音频转换为常见录音采样率的WAV，模拟线上上传的文件"""
+    y, sr = sf.read(io.BytesIO(content), dtype="float32")
+    y = librosa.resample(y, orig_sr=sr, target_sr=UPLOAD_SAMPLE_RATE, res_type="soxr_vhq")
+    buffer = io.BytesIO()
+    sf.write(buffer, y, UPLOAD_SAMPLE_RATE, format="WAV", subtype="PCM_16")
+    return buffer.getvalue()
+
+
+def timed(fn, repeat: int):
+    """返回最后一次的结果和多次运行耗时的中位数（毫秒）"""
+    durations = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        durations.append((time.perf_counter() - start) * 1000)
+    return result, statistics.median(durations)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="流水线采样率与重采样质量基准测试")
+    parser.add_argument("--repeat", type=int, default=5, help="每种配置的重复次数")
+    parser.add_argument("--rates", default=str(FEATURE_SAMPLE_RATE), help="流水线采样率列表，逗号分隔")
+    parser.add_argument("--qualities", default="soxr_hq,soxr_qq", help="重采样质量列表，逗号分隔")
+    args = parser.parse_args()
+
+    model = AnalysisModel()
+    rates = [int(r) for r in args.rates.split(",")]
+    qualities = args.qualities.split(",")
+
+    header = f"{'文件':<20}{'配置':<22}{'耗时(ms)':>10}{'特征相对误差':>14}{'标签':>8}{'质量评分':>10}{'评分变化':>10}"
+    print(header)
+    print("-" * len(header))
+    samples = []
+    for name in AUDIO_FILES:
+        path = AUDIO_DIR / name
+        if not path.exists():
+            print(f"{name:<20}文件不存在，跳过")
+            continue
+        content = path.read_bytes()
+        samples.append((name, content))
+        samples.append((f"{name}@44k", to_upload_rate(content)))
+
+    for name, content in samples:
+        # 预热一次，避免首次调用的导入和JIT开销计入耗时
+        run_legacy(model, content)
+        (ref_features, ref_quality), legacy_ms = timed(lambda: run_legacy(model, content), args.repeat)
+        ref_label = model.predict_batch(ref_features)[0]
+        print(f"{name:<20}{'原有流程':<22}{legacy_ms:>10.1f}{0.0:>14.2e}{str(ref_label):>8}{ref_quality:>10.4f}{0.0:>10.4f}")
+
+        for sr in rates:
+            for quality in qualities:
+                settings.RESAMPLE_QUALITY = quality
+                run_pipeline(model, content, sr)
+                (features, score), ms = timed(lambda: run_pipeline(model, content, sr), args.repeat)
+                error = np.linalg.norm(features - ref_features) / (np.linalg.norm(ref_features) or 1.0)
+                label = model.predict_batch(features)[0]
+                print(f"{name:<20}{f'{sr}Hz/{quality}':<22}{ms:>10.1f}{error:>14.2e}{str(label):>8}{score:>10.4f}{score - ref_quality:>+10.4f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+"""
+特征提取引擎一致性与速度检查
+
+在样例音频上对比 librosa 引擎与 numpy 引擎：
+- 各组特征（过零率、色度、MFCC、RMS、梅尔谱）的相对误差，超过 feature_engine.PARITY_RTOL 时返回非零退出码
+- SVM 预测标签是否一致
+- 预热后的单次提取耗时，以及新进程中首次提取的耗时（librosa 引擎含 numba JIT 编译）
+
+用法:
+    python scripts/check_feature_engine.py [--repeat 20] [--skip-cold]
+"""
+
+import argparse
+import io
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import librosa
+import numpy as np
+import soundfile as sf
+
+# 添加项目根目录到 Python 路径
+project_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(project_root / "backend"))
+
+from app.core.config import settings
+from app.utils import feature_engine
+from app.utils.audio_context import AudioAnalysisContext
+from app.utils.audio_decoder import decode_audio_bytes
+from app.utils.voice_models_utils import (
+    AnalysisModel,
+    DEFAULT_MODEL_PATH,
+    FEATURE_DURATION,
+    FEATURE_OFFSET,
+    FEATURE_SAMPLE_RATE
+)
+
+AUDIO_DIR = project_root / "ml_models" / "trained" / "voice_models"
+AUDIO_FILES = ["test_audio.wav", "P1COPDMc_2.wav"]
+
+
+def load_samples():
+    """样例音频、其 44.1kHz 版本（模拟线上上传）和一段合成信号，均解码到流水线采样率"""
+    samples = []
+    for name in AUDIO_FILES:
+        path = AUDIO_DIR / name
+        if not path.exists():
+            print(f"{name}: 文件不存在，跳过")
+            continue
+        content = path.read_bytes()
+        samples.append((name, decode_audio_bytes(content, ".wav")))
+        y, sr = sf.read(io.BytesIO(content), dtype="float32")
+        buffer = io.BytesIO()
+        sf.write(buffer, librosa.resample(y, orig_sr=sr, target_sr=44100), 44100, format="WAV", subtype="PCM_16")
+        samples.append((f"{name}@44k", decode_audio_bytes(buffer.getvalue(), ".wav")))
+    rng = np.random.default_rng(0)
+    t = np.arange(int(4 * FEATURE_SAMPLE_RATE)) / FEATURE_SAMPLE_RATE
+    tone = 0.2 * np.sin(2 * np.pi * 311 * t) * (1 + 0.5 * np.sin(2 * np.pi * 0.7 * t)) + 0.02 * rng.standard_normal(len(t))
+    samples.append(("synthetic", (tone.astype(np.float32), FEATURE_SAMPLE_RATE)))
+    return samples
+
+
+def extract(model: AnalysisModel, y: np.ndarray, sr: int, engine: str) -> np.ndarray:
+    """用指定引擎在新的上下文中提取特征（不复用其他引擎缓存的谱）"""
+    settings.FEATURE_ENGINE = engine
+    segment = AudioAnalysisContext(y, sr).segment(FEATURE_OFFSET, FEATURE_DURATION, FEATURE_SAMPLE_RATE)
+    return np.asarray(model.extract_features(segment), dtype=np.float64)
+
+
+def timed(fn, repeat: int) -> float:
+    """多次运行耗时的中位数（毫秒）"""
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        durations.append((time.perf_counter() - start) * 1000)
+    return statistics.median(durations)
+
+
+def cold_start(engine: str) -> float:
+    """在新进程中测量首次特征提取的耗时（毫秒）"""
+    code = (
+        "import sys, time, numpy as np\n"
+        f"sys.path.insert(0, {str(project_root / 'backend')!r})\n"
+        "from app.core.config import settings\n"
+        f"settings.FEATURE_ENGINE = {engine!r}\n"
+        "from app.utils.audio_context import AudioAnalysisContext\n"
+        "from app.utils.voice_models_utils import AnalysisModel, FEATURE_SAMPLE_RATE\n"
+        "y = (0.1 * np.random.default_rng(0).standard_normal(int(2.5 * FEATURE_SAMPLE_RATE))).astype(np.float32)\n"
+        "model = AnalysisModel.__new__(AnalysisModel)\n"
+        "start = time.perf_counter()\n"
+        "model.extract_features(AudioAnalysisContext(y, FEATURE_SAMPLE_RATE))\n"
+        "print((time.perf_counter() - start) * 1000)\n"
+    )
+    output = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True).stdout
+    return float(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="特征提取引擎一致性与速度检查")
+    parser.add_argument("--repeat", type=int, default=20, help="预热后计时的重复次数")
+    parser.add_argument("--skip-cold", action="store_true", help="不测量新进程首次提取的耗时")
+    args = parser.parse_args()
+
+    model = AnalysisModel() if Path(DEFAULT_MODEL_PATH).exists() else AnalysisModel.__new__(AnalysisModel)
+    has_model = hasattr(model, "model_path")
+    engine = settings.FEATURE_ENGINE
+    failed = False
+
+    groups = "".join(f"{name:>10}" for name in feature_engine.FEATURE_GROUPS)
+    header = f"{'文件':<22}{groups}{'标签':>14}{'librosa(ms)':>13}{'numpy(ms)':>11}"
+    print(f"允许的相对误差: {feature_engine.PARITY_RTOL:.0e}")
+    print(header)
+    print("-" * len(header))
+    try:
+        for name, (y, sr) in load_samples():
+            reference = extract(model, y, sr, "librosa")
+            candidate = extract(model, y, sr, "numpy")
+            errors = []
+            for group in feature_engine.FEATURE_GROUPS.values():
+                ref, cand = reference[group], candidate[group]
+                errors.append(np.linalg.norm(cand - ref) / (np.linalg.norm(ref) or 1.0))
+            failed = failed or max(errors) > feature_engine.PARITY_RTOL
+            if has_model:
+                labels = model.predict_batch(np.vstack([reference, candidate]))
+                label = str(labels[0]) if labels[0] == labels[1] else f"{labels[0]}≠{labels[1]}"
+                failed = failed or labels[0] != labels[1]
+            else:
+                label = "-"
+            librosa_ms = timed(lambda: extract(model, y, sr, "librosa"), args.repeat)
+            numpy_ms = timed(lambda: extract(model, y, sr, "numpy"), args.repeat)
+            row = "".join(f"{e:>10.1e}" for e in errors)
+            print(f"{name:<22}{row}{label:>14}{librosa_ms:>13.2f}{numpy_ms:>11.2f}")
+    finally:
+        settings.FEATURE_ENGINE = engine
+
+    if not args.skip_cold:
+        print()
+        for name in ("librosa", "numpy"):
+            print(f"新进程首次提取耗时 {name}: {cold_start(name):.1f} ms")
+
+    print()
+    print("一致性检查未通过" if failed else "一致性检查通过")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
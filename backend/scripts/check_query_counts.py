@@ -0,0 +1,134 @@
+"""
+仓储查询次数与游标分页检查
+
+在内存 SQLite 数据库中写入一个用户的诊断会话和语音指标，统计各分页查询实际执行的 SQL 语句数：
+- DiagnosisRepository.get_voice_history（及 VoiceAnalysisService.history_record 读取所属会话）
+- LLMRepository.get_analysis_history（每次上传的LLM分析都会调用）
+- LLMRepository.get_realtime_data
+每页的语句数必须固定（不随每页条数增长，即没有 N+1 查询）且不超过预期值；
+按游标逐页读取的结果必须与一次读取全部记录的顺序一致、不重复不遗漏，否则返回非零退出码
+
+用法:
+    python scripts/check_query_counts.py [--sessions 30] [--sizes 1,5,20]
+"""
+
+import argparse
+import sys
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Callable, List
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+# 添加项目根目录到 Python 路径
+project_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(project_root / "backend"))
+
+from app.db.base import Base
+from app.db.models import DiagnosisSession, User, VoiceMetrics
+from app.repositories.diagnosis_repository import DiagnosisRepository
+from app.repositories.llm_repository import LLMRepository
+from app.services.voice_analysis_service import VoiceAnalysisService
+
+
+class QueryCounter:
+    """统计引擎上执行的 SQL 语句数"""
+
+    def __init__(self, engine):
+        self.count = 0
+        event.listen(engine, "before_cursor_execute", self._on_execute)
+
+    def _on_execute(self, *args) -> None:
+        self.count += 1
+
+    def measure(self, fn: Callable[[], object]) -> int:
+        start = self.count
+        fn()
+        return self.count - start
+
+
+def seed(db, sessions: int) -> int:
+    """写入一个用户及其诊断会话（每3个会话创建时间相同，每个会话一条语音指标，最后一个会话没有语音指标），返回用户ID"""
+    user = User(username="query_check", email="query_check@example.com", hashed_password="-")
+    db.add(user)
+    db.flush()
+    now = datetime.utcnow()
+    for i in range(sessions):
+        session = DiagnosisSession(user_id=user.id, created_at=now - timedelta(minutes=i // 3), diagnosis_suggestion=f"建议{i}")
+        db.add(session)
+        db.flush()
+        if i < sessions - 1:
+            db.add(VoiceMetrics(session_id=session.id, user_id=user.id, model_prediction="Healthy", model_confidence=0.9, created_at=session.created_at))
+    db.commit()
+    return user.id
+
+
+def main():
+    parser = argparse.ArgumentParser(description="仓储查询次数检查")
+    parser.add_argument("--sessions", type=int, default=30, help="写入的诊断会话数")
+    parser.add_argument("--sizes", default="1,5,20", help="逗号分隔的每页条数")
+    args = parser.parse_args()
+    sizes = [int(s) for s in args.sizes.split(",") if s.strip()]
+
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+    user_id = seed(db, args.sessions)
+    counter = QueryCounter(engine)
+    diagnosis_repository = DiagnosisRepository(db)
+    llm_repository = LLMRepository(db)
+
+    def voice_history(size: int) -> None:
+        records, _ = diagnosis_repository.get_voice_history(user_id, size)
+        [VoiceAnalysisService.history_record(record) for record in records]
+
+    # 检查项: (名称, 每页查询, 预期语句数)
+    checks = [
+        ("get_voice_history", voice_history, 1),
+        ("get_analysis_history", lambda size: llm_repository.get_analysis_history(user_id, 0, size), 1),
+        ("get_realtime_data", lambda size: llm_repository.get_realtime_data(user_id), 1)
+    ]
+    print(f"数据库: SQLite (内存), 会话数: {args.sessions}")
+    header = f"{'查询':<24}" + "".join(f"{f'size={size}':>10}" for size in sizes) + f"{'预期':>8}{'结果':>8}"
+    print(header)
+    print("-" * len(header))
+    failed = False
+    for name, fn, expected in checks:
+        counts: List[int] = []
+        for size in sizes:
+            # 每次都从空的标识映射开始，避免已加载的对象掩盖查询
+            db.expire_all()
+            db.expunge_all()
+            counts.append(counter.measure(lambda: fn(size)))
+        ok = len(set(counts)) == 1 and counts[0] <= expected
+        failed = failed or not ok
+        print(f"{name:<24}" + "".join(f"{count:>10}" for count in counts) + f"{expected:>8}{'通过' if ok else '失败':>8}")
+
+    # 游标分页：逐页读取与一次读取全部的结果一致
+    pagers = [
+        ("get_voice_history", lambda size, cursor: diagnosis_repository.get_voice_history(user_id, size, cursor=cursor), lambda r: r.id),
+        ("get_analysis_history_page", lambda size, cursor: llm_repository.get_analysis_history_page(user_id, size, cursor=cursor), lambda r: r["session_id"])
+    ]
+    print()
+    for name, fetch, row_id in pagers:
+        expected_ids = [row_id(r) for r in fetch(args.sessions + 1, None)[0]]
+        for size in sizes:
+            ids, cursor = [], None
+            while True:
+                rows, cursor = fetch(size, cursor)
+                ids.extend(row_id(r) for r in rows)
+                if cursor is None:
+                    break
+            ok = ids == expected_ids
+            failed = failed or not ok
+            print(f"游标分页 {name} size={size}: {len(ids)} 条, {'通过' if ok else '失败'}")
+
+    print()
+    print("查询次数检查未通过" if failed else "查询次数检查通过")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
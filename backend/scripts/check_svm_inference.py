@@ -0,0 +1,177 @@
+"""
+SVM 导出推理一致性与速度检查
+
+对比 scikit-learn 的 predict / decision_function 与 NumPy 推理器：
+- 当前模型：样例音频的特征向量及其随机扰动样本
+- 合成模型：四种核函数、二分类与多分类、带 StandardScaler / MinMaxScaler 的 Pipeline
+- 标签不一致或决策值误差超过 svm_inference.PARITY_ATOL 时返回非零退出码
+- 单行预测耗时，以及新进程中加载模型并完成一次预测新增的内存占用
+
+用法:
+    python scripts/check_svm_inference.py [--repeat 200] [--samples 2000] [--skip-memory]
+"""
+
+import argparse
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import joblib
+import numpy as np
+from sklearn.pipeline import make_pipeline
+from sklearn.preprocessing import MinMaxScaler, StandardScaler
+from sklearn.svm import SVC, NuSVC
+
+# 添加项目根目录到 Python 路径
+project_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(project_root / "backend"))
+
+from app.core.config import settings
+from app.utils.audio_context import AudioAnalysisContext
+from app.utils.audio_decoder import decode_audio_bytes
+from app.utils.svm_inference import PARITY_ATOL, CompiledSVM, compile_model, export_svm
+from app.utils.voice_models_utils import AnalysisModel, DEFAULT_MODEL_PATH
+
+AUDIO_DIR = project_root / "ml_models" / "trained" / "voice_models"
+AUDIO_FILES = ["test_audio.wav", "P1COPDMc_2.wav"]
+
+
+def sklearn_decision(estimator, X: np.ndarray) -> np.ndarray:
+    """scikit-learn 的一对一决策值，换算为 libsvm 的符号约定"""
+    svm = estimator.steps[-1][1] if hasattr(estimator, "steps") else estimator
+    if len(svm.classes_) == 2:
+        return -estimator.decision_function(X)[:, None]
+    shape = svm.decision_function_shape
+    svm.decision_function_shape = "ovo"
+    try:
+        return estimator.decision_function(X)
+    finally:
+        svm.decision_function_shape = shape
+
+
+def compare(name: str, estimator, X: np.ndarray) -> bool:
+    """比较标签和决策值，打印一行结果，返回是否一致"""
+    compiled = CompiledSVM(export_svm(estimator))
+    expected = estimator.predict(X)
+    labels = compiled.predict(X)
+    mismatched = int(np.sum(labels != expected))
+    error = float(np.max(np.abs(compiled.decision_function(X) - sklearn_decision(estimator, X))))
+    ok = mismatched == 0 and error <= PARITY_ATOL
+    print(f"{name:<36}{len(X):>8}{mismatched:>10}{error:>14.1e}{'通过' if ok else '未通过':>8}")
+    return ok
+
+
+def synthetic_models(rng: np.random.Generator):
+    """覆盖各核函数、类别数和缩放器的合成模型及测试数据"""
+    for n_classes in (2, 3, 4):
+        centers = rng.normal(scale=3.0, size=(n_classes, 20))
+        y = rng.integers(0, n_classes, 600)
+        X = centers[y] + rng.normal(scale=2.5, size=(600, 20)) * rng.uniform(0.5, 50, 20)
+        X_test = centers[rng.integers(0, n_classes, 500)] + rng.normal(scale=3.0, size=(500, 20)) * rng.uniform(0.5, 50, 20)
+        labels = np.array(["健康", "COPD", "哮喘", "其他"])[y]
+        for kernel in ("linear", "rbf", "poly", "sigmoid"):
+            yield f"SVC {kernel} {n_classes}类 +StandardScaler", make_pipeline(StandardScaler(), SVC(kernel=kernel, degree=2, coef0=0.5)).fit(X, labels), X_test
+        yield f"SVC rbf {n_classes}类 +MinMaxScaler", make_pipeline(MinMaxScaler(), SVC(gamma=2.0)).fit(X, labels), X_test
+        yield f"NuSVC rbf {n_classes}类 整数标签", make_pipeline(StandardScaler(), NuSVC(nu=0.3)).fit(X, y), X_test
+        yield f"SVC rbf {n_classes}类 无缩放器", SVC().fit(X, labels), X_test
+
+
+def model_samples(model: AnalysisModel, rng: np.random.Generator, n_samples: int) -> np.ndarray:
+    """样例音频的特征向量及其随机扰动（用于覆盖决策边界附近的样本）"""
+    rows = []
+    for name in AUDIO_FILES:
+        path = AUDIO_DIR / name
+        if path.exists():
+            y, sr = decode_audio_bytes(path.read_bytes(), ".wav")
+            rows.append(model.get_features(AudioAnalysisContext(y, sr)))
+    support_vectors = model.model_svm_loaded.support_vectors_
+    base = np.vstack(rows + [support_vectors]) if rows else support_vectors
+    spread = base.std(axis=0) + 1e-6
+    picks = base[rng.integers(0, len(base), n_samples)]
+    return np.vstack([base, picks + rng.normal(size=picks.shape) * spread * rng.uniform(0, 1, (n_samples, 1))])
+
+
+def timed(fn, repeat: int) -> float:
+    """多次运行耗时的中位数（微秒）"""
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        durations.append((time.perf_counter() - start) * 1e6)
+    return statistics.median(durations)
+
+
+def worker_memory(inference: str, model_path: str) -> str:
+    """在新进程中加载模型并预测一次，返回常驻内存（Linux /proc）和是否导入了 scikit-learn"""
+    code = (
+        "import resource, sys, numpy as np\n"
+        f"sys.path.insert(0, {str(project_root / 'backend')!r})\n"
+        "rss = lambda: int(open('/proc/self/statm').read().split()[1]) * resource.getpagesize() / 2 ** 20\n"
+        "from app.utils.voice_models_utils import AnalysisModel\n"
+        "before = rss()\n"
+        f"model = AnalysisModel({model_path!r}, inference={inference!r})\n"
+        "model.predict_batch(np.zeros((1, model.compiled.n_features_in_ if model.compiled else model.model_svm_loaded.n_features_in_)))\n"
+        "print(rss(), rss() - before, 'sklearn' in sys.modules)\n"
+    )
+    output = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True).stdout
+    total, delta, imported = output.strip().splitlines()[-1].split()
+    return f"常驻内存 {float(total):.1f} MB（加载模型并预测新增 {float(delta):.1f} MB），导入 scikit-learn: {'是' if imported == 'True' else '否'}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="SVM 导出推理一致性与速度检查")
+    parser.add_argument("--repeat", type=int, default=200, help="计时的重复次数")
+    parser.add_argument("--samples", type=int, default=2000, help="当前模型上随机扰动样本数")
+    parser.add_argument("--skip-memory", action="store_true", help="不测量新进程的内存占用")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    model_path = settings.MODEL_PATH or DEFAULT_MODEL_PATH
+    has_model = Path(model_path).exists()
+    failed = False
+
+    header = f"{'模型':<36}{'样本数':>8}{'标签不一致':>10}{'最大决策误差':>14}{'结果':>8}"
+    print(f"允许的决策值误差: {PARITY_ATOL:.0e}")
+    print(header)
+    print("-" * len(header))
+    if has_model:
+        model = AnalysisModel(model_path, inference="sklearn")
+        X_model = model_samples(model, rng, args.samples)
+        failed = not compare(f"当前模型 {Path(model_path).name}", model.model_svm_loaded, X_model) or failed
+    else:
+        print(f"模型文件不存在，跳过当前模型: {model_path}")
+    for name, estimator, X in synthetic_models(rng):
+        failed = not compare(name, estimator, X) or failed
+
+    if has_model:
+        print()
+        compiled = compile_model(model.model_svm_loaded, model_path, save=False)
+        row = X_model[:1]
+        sklearn_us = timed(lambda: model.model_svm_loaded.predict(row), args.repeat)
+        numpy_us = timed(lambda: compiled.predict(row), args.repeat)
+        print(f"单行预测耗时 scikit-learn: {sklearn_us:.1f} us，NumPy 推理: {numpy_us:.1f} us")
+        batch = X_model[:64]
+        sklearn_us = timed(lambda: model.model_svm_loaded.predict(batch), args.repeat)
+        numpy_us = timed(lambda: compiled.predict(batch), args.repeat)
+        print(f"64 行批量预测耗时 scikit-learn: {sklearn_us:.1f} us，NumPy 推理: {numpy_us:.1f} us")
+
+        if not args.skip_memory:
+            print()
+            with tempfile.TemporaryDirectory() as tmp:
+                # 在临时目录中使用模型副本，不在模型目录中留下推理文件
+                copy_path = str(Path(tmp) / Path(model_path).name)
+                joblib.dump(model.model_svm_loaded, copy_path)
+                compile_model(model.model_svm_loaded, copy_path)
+                print(f"sklearn 推理: {worker_memory('sklearn', copy_path)}")
+                print(f"numpy 推理:   {worker_memory('numpy', copy_path)}")
+
+    print()
+    print("一致性检查未通过" if failed else "一致性检查通过")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
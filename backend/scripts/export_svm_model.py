@@ -0,0 +1,55 @@
+"""
+导出 SVM 推理文件
+
+加载 joblib 模型文件，导出支持向量、对偶系数、截距、核参数和缩放器，
+写入模型文件旁的 .npz 推理文件（MODEL_INFERENCE=numpy 时使用）
+
+用法:
+    python scripts/export_svm_model.py [--model path/to/svm_model.pkl] [--output path/to/svm_model.npz]
+"""
+
+import argparse
+import os
+import sys
+from pathlib import Path
+
+import joblib
+import numpy as np
+
+# 添加项目根目录到 Python 路径
+project_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(project_root / "backend"))
+
+from app.core.config import settings
+from app.utils.svm_inference import CompiledSVM, artifact_path, export_svm, save_artifact, source_digest
+from app.utils.voice_models_utils import DEFAULT_MODEL_PATH
+
+
+def main():
+    parser = argparse.ArgumentParser(description="导出 SVM 推理文件")
+    parser.add_argument("--model", default=settings.MODEL_PATH or DEFAULT_MODEL_PATH, help="joblib 模型文件路径")
+    parser.add_argument("--output", default=None, help="推理文件路径，默认与模型文件同名的 .npz")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.model):
+        print(f"模型文件不存在: {args.model}")
+        sys.exit(1)
+    output = args.output or artifact_path(args.model)
+
+    estimator = joblib.load(args.model)
+    try:
+        arrays = export_svm(estimator, source_digest(args.model))
+    except ValueError as e:
+        print(f"导出失败: {e}")
+        sys.exit(1)
+    save_artifact(arrays, output)
+
+    compiled = CompiledSVM.load(output)
+    print(f"模型文件: {args.model}（版本 {compiled.source_version}）")
+    print(f"推理文件: {output}（{os.path.getsize(output) / 1024:.1f} KB）")
+    print(f"核函数: {compiled.kernel}, gamma={compiled.gamma:.6g}, 类别: {[str(c) for c in compiled.classes_]}")
+    print(f"支持向量: {compiled.support_vectors.shape[0]} x {compiled.n_features_in_}, 缩放器: {'有' if np.any(compiled.scale != 1) or np.any(compiled.offset != 0) else '无'}")
+
+
+if __name__ == "__main__":
+    main()
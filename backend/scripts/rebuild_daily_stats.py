@@ -0,0 +1,68 @@
+"""
+重建按天统计汇总
+
+从 diagnosis_sessions、voice_metrics 原始记录重新计算 user_daily_stats：
+- 迁移创建汇总表后首次回填
+- 汇总与原始记录不一致时修复（如手工删除或导入了记录）
+重建期间写入的新记录可能被覆盖，建议在低峰期执行；指定 --user-id 时只重建该用户
+
+用法:
+    python scripts/rebuild_daily_stats.py [--user-id 1] [--check]
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+# 添加项目根目录到 Python 路径
+project_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(project_root / "backend"))
+
+import app.core  # noqa: F401  先初始化 app.core，避免直接导入 app.db.session 时的循环导入
+from app.db.models import UserDailyStats
+from app.db.session import SessionLocal
+from app.repositories.stats_repository import StatsRepository, prediction_counts
+
+# --check 比较的列
+COMPARED_COLUMNS = [
+    "session_count", "analysis_count",
+    "confidence_count", "confidence_sum", "confidence_sumsq",
+    "rms_count", "rms_sum", "rms_sumsq",
+    "zcr_count", "zcr_sum", "zcr_sumsq"
+]
+
+
+def snapshot(db, user_id=None):
+    """当前汇总表内容: (user_id, day) -> 各列的值"""
+    query = db.query(UserDailyStats)
+    if user_id is not None:
+        query = query.filter(UserDailyStats.user_id == user_id)
+    return {
+        (row.user_id, row.day): [round(getattr(row, c), 6) for c in COMPARED_COLUMNS] + [prediction_counts(row)]
+        for row in query
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="重建按天统计汇总")
+    parser.add_argument("--user-id", type=int, default=None, help="只重建该用户（默认全部用户）")
+    parser.add_argument("--check", action="store_true", help="重建后报告与重建前不一致的汇总行")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        before = snapshot(db, args.user_id) if args.check else None
+        count = StatsRepository(db).rebuild(args.user_id)
+        print(f"已重建 {count} 行汇总" + (f"（用户 {args.user_id}）" if args.user_id is not None else ""))
+        if args.check:
+            after = snapshot(db, args.user_id)
+            changed = sorted(key for key in before.keys() | after.keys() if before.get(key) != after.get(key))
+            for user_id, day in changed:
+                print(f"  不一致: user_id={user_id}, day={day}")
+            print(f"重建前后不一致的汇总行: {len(changed)}")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,204 @@
+"""
+级联推理第一级模型的训练与评估
+
+在有标注的数据集上训练只使用低成本特征组（ZCR、MFCC、RMS）的线性分类器，导出到SVM模型文件旁的
+<模型名>_cascade.npz（MODEL_CASCADE=true 时加载），并在评估集上按一组置信间隔阈值报告：
+- 第一级命中率（直接采用第一级结果的比例）及命中部分的准确率
+- 回退到SVM部分的准确率、级联整体准确率及相对只用SVM的准确率变化
+- 平均特征提取耗时（低成本特征组 + 回退比例 × 补算色度特征）
+当前配置的阈值（CASCADE_MARGIN_THRESHOLD，以 * 标出）准确率下降超过 --max-accuracy-drop 时返回非零退出码
+
+数据集为按类别分子目录存放的音频（<目录>/<标签>/*.wav），或 path,label 两列的 CSV 清单（相对路径相对于清单所在目录），
+标签需与SVM模型的类别名一致
+
+用法:
+    python scripts/train_cascade_model.py --data path/to/dataset [--eval path/to/eval_set] [--eval-ratio 0.3] [--targets labels]
+    python scripts/train_cascade_model.py --data path/to/eval_set --eval-only
+"""
+
+import argparse
+import csv
+import sys
+import time
+from pathlib import Path
+from typing import List, Tuple
+
+import numpy as np
+from sklearn.linear_model import LogisticRegression
+from sklearn.model_selection import train_test_split
+from sklearn.pipeline import make_pipeline
+from sklearn.preprocessing import StandardScaler
+
+# 添加项目根目录到 Python 路径
+project_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(project_root / "backend"))
+
+from app.core.config import settings
+from app.utils.audio_context import AudioAnalysisContext
+from app.utils.audio_decoder import decode_audio_bytes
+from app.utils.cascade_model import (
+    LIGHT_FEATURE_INDICES, LinearStage, cascade_path, export_linear_stage, load_linear_stage, save_linear_stage
+)
+from app.utils.svm_inference import source_digest
+from app.utils.voice_models_utils import AnalysisModel, DEFAULT_MODEL_PATH
+
+AUDIO_EXTENSIONS = {".wav", ".mp3", ".flac", ".ogg", ".m4a", ".webm", ".aac"}
+DEFAULT_THRESHOLDS = "0,0.2,0.4,0.5,0.6,0.7,0.8,0.9,0.95,0.99"
+
+
+def list_dataset(path: str) -> List[Tuple[Path, str]]:
+    """列出数据集中的 (音频路径, 标签)"""
+    root = Path(path)
+    if root.is_file():
+        with open(root, newline="", encoding="utf-8") as f:
+            return [((root.parent / row["path"]).resolve(), row["label"].strip()) for row in csv.DictReader(f)]
+    return [
+        (file, label_dir.name)
+        for label_dir in sorted(root.iterdir()) if label_dir.is_dir()
+        for file in sorted(label_dir.rglob("*")) if file.suffix.lower() in AUDIO_EXTENSIONS
+    ]
+
+
+def extract_dataset(model: AnalysisModel, items: List[Tuple[Path, str]]):
+    """
+    提取完整特征向量，同时分别计时低成本特征组和补算色度特征
+
+    Returns:
+        (特征矩阵, 标签数组, 低成本特征组耗时毫秒数组, 补算色度耗时毫秒数组)
+    """
+    rows, labels, light_ms, chroma_ms = [], [], [], []
+    for path, label in items:
+        try:
+            y, sr = decode_audio_bytes(path.read_bytes(), path.suffix)
+        except Exception as e:
+            print(f"  跳过无法解码的文件: {path} ({e})")
+            continue
+        context = AudioAnalysisContext(y, sr, source=str(path))
+        start = time.perf_counter()
+        model.get_features(context, with_chroma=False)
+        middle = time.perf_counter()
+        rows.append(model.get_features(context))
+        light_ms.append((middle - start) * 1000)
+        chroma_ms.append((time.perf_counter() - middle) * 1000)
+        labels.append(label)
+    return np.vstack(rows), np.array(labels), np.array(light_ms), np.array(chroma_ms)
+
+
+def split(items: List[Tuple[Path, str]], ratio: float, seed: int):
+    """按标签分层划分训练集和评估集（某类样本过少无法分层时随机划分）"""
+    labels = [label for _, label in items]
+    try:
+        return train_test_split(items, test_size=ratio, random_state=seed, stratify=labels)
+    except ValueError:
+        return train_test_split(items, test_size=ratio, random_state=seed)
+
+
+def accuracy(predicted: np.ndarray, expected: np.ndarray) -> float:
+    return float(np.mean(predicted == expected)) if len(expected) else float("nan")
+
+
+def percent(value: float) -> str:
+    """百分比（没有样本时为 -）"""
+    return "-" if np.isnan(value) else f"{value:.1%}"
+
+
+def report(stage: LinearStage, X: np.ndarray, labels: np.ndarray, svm_labels: np.ndarray,
+           light_ms: np.ndarray, chroma_ms: np.ndarray, thresholds: List[float], max_drop: float) -> bool:
+    """打印各阈值下的命中率和准确率，返回当前配置的阈值是否超出允许的准确率下降"""
+    linear_labels, margins = stage.decide(X)
+    svm_accuracy = accuracy(svm_labels, labels)
+    configured = settings.CASCADE_MARGIN_THRESHOLD
+    distribution = {str(label): int(count) for label, count in zip(*np.unique(labels, return_counts=True))}
+    print(f"评估集: {len(labels)} 段, 类别分布: {distribution}")
+    print(f"只用SVM准确率: {svm_accuracy:.2%}, 只用第一级准确率: {accuracy(linear_labels, labels):.2%}, "
+          f"第一级与SVM一致率: {accuracy(linear_labels, svm_labels):.2%}")
+    print(f"平均特征提取耗时: 低成本特征组 {light_ms.mean():.2f} ms, 补算色度特征 {chroma_ms.mean():.2f} ms, "
+          f"完整特征 {light_ms.mean() + chroma_ms.mean():.2f} ms")
+    print()
+    header = f"{'阈值':>8}{'第一级命中率':>12}{'第一级准确率':>12}{'SVM部分准确率':>14}{'级联准确率':>12}{'准确率变化':>12}{'特征耗时(ms)':>14}"
+    print(header)
+    print("-" * len(header))
+    best, configured_delta = None, 0.0
+    for threshold in sorted(set(thresholds) | {configured}):
+        hit = margins >= threshold
+        cascade_labels = np.where(hit, linear_labels, svm_labels)
+        cascade_accuracy = accuracy(cascade_labels, labels)
+        delta = cascade_accuracy - svm_accuracy
+        feature_ms = float(np.mean(light_ms + np.where(hit, 0.0, chroma_ms)))
+        mark = "*" if threshold == configured else " "
+        print(f"{threshold:>7g}{mark}{hit.mean():>12.1%}{percent(accuracy(linear_labels[hit], labels[hit])):>12}"
+              f"{percent(accuracy(svm_labels[~hit], labels[~hit])):>14}{cascade_accuracy:>12.1%}{delta:>+12.1%}{feature_ms:>14.2f}")
+        if threshold == configured:
+            configured_delta = delta
+        if delta >= -max_drop and (best is None or hit.mean() > best[1]):
+            best = (threshold, hit.mean())
+    print()
+    if best is not None:
+        print(f"准确率下降不超过 {max_drop:.1%} 时第一级命中率最高的阈值: {best[0]:g}（命中率 {best[1]:.1%}）")
+    print(f"当前配置 CASCADE_MARGIN_THRESHOLD={configured:g}: 准确率变化 {configured_delta:+.2%}")
+    return configured_delta < -max_drop
+
+
+def main():
+    parser = argparse.ArgumentParser(description="级联推理第一级模型的训练与评估")
+    parser.add_argument("--data", required=True, help="数据集目录（按类别分子目录）或 path,label CSV 清单")
+    parser.add_argument("--eval", default=None, help="独立的评估集，不指定时从 --data 中按 --eval-ratio 划分")
+    parser.add_argument("--eval-ratio", type=float, default=0.3, help="评估集占比")
+    parser.add_argument("--eval-only", action="store_true", help="不训练，在 --data 上评估已导出的第一级模型")
+    parser.add_argument("--targets", choices=["labels", "svm"], default="labels",
+                        help="训练目标：标注标签，或SVM在训练集上的预测（使第一级尽量与SVM一致）")
+    parser.add_argument("--c", type=float, default=1.0, help="LogisticRegression 的正则化参数 C")
+    parser.add_argument("--thresholds", default=DEFAULT_THRESHOLDS, help="逗号分隔的置信间隔阈值")
+    parser.add_argument("--max-accuracy-drop", type=float, default=0.01, help="相对只用SVM允许的准确率下降")
+    parser.add_argument("--model", default=settings.MODEL_PATH or DEFAULT_MODEL_PATH, help="SVM模型文件路径")
+    parser.add_argument("--dry-run", action="store_true", help="只训练和评估，不写入第一级模型文件")
+    parser.add_argument("--seed", type=int, default=0, help="划分数据集的随机种子")
+    args = parser.parse_args()
+    thresholds = [float(t) for t in args.thresholds.split(",") if t.strip()]
+
+    if not Path(args.model).exists():
+        print(f"模型文件不存在: {args.model}")
+        sys.exit(1)
+    model = AnalysisModel(args.model)
+    items = list_dataset(args.data)
+    if not items:
+        print(f"数据集中没有音频文件: {args.data}")
+        sys.exit(1)
+    classes = {str(c) for c in (model.compiled.classes_ if model.compiled is not None else model.model_svm_loaded.classes_)}
+    print(f"SVM模型: {args.model}（版本 {source_digest(args.model)}，类别 {sorted(classes)}）")
+    unknown = {label for _, label in items} - classes
+    if unknown:
+        print(f"警告: 数据集中的标签不在SVM模型的类别中: {sorted(unknown)}")
+    print(f"特征提取引擎: {settings.FEATURE_ENGINE}")
+
+    if args.eval_only:
+        stage = load_linear_stage(args.model)
+        if stage is None:
+            print(f"没有与模型对应的第一级模型文件: {cascade_path(args.model)}")
+            sys.exit(1)
+        eval_items = items
+    else:
+        train_items, eval_items = (items, list_dataset(args.eval)) if args.eval else split(items, args.eval_ratio, args.seed)
+        print(f"训练集: {len(train_items)} 段，提取特征中...")
+        X_train, y_train, _, _ = extract_dataset(model, train_items)
+        targets = np.array([str(label) for label in model.predict_batch(X_train)]) if args.targets == "svm" else y_train
+        if len(set(targets)) < 2:
+            print(f"训练目标只有一个类别，无法训练第一级模型: {sorted(set(targets))}")
+            sys.exit(1)
+        estimator = make_pipeline(StandardScaler(), LogisticRegression(C=args.c, max_iter=1000))
+        estimator.fit(X_train[:, LIGHT_FEATURE_INDICES], targets)
+        arrays = export_linear_stage(estimator, source_digest(args.model), settings.FEATURE_ENGINE)
+        stage = LinearStage(arrays)
+        if not args.dry_run:
+            print(f"第一级模型已导出: {save_linear_stage(arrays, args.model)}")
+
+    print(f"评估集: {len(eval_items)} 段，提取特征中...")
+    X_eval, y_eval, light_ms, chroma_ms = extract_dataset(model, eval_items)
+    svm_labels = np.array([str(label) for label in model.predict_batch(X_eval)])
+    print()
+    failed = report(stage, X_eval, y_eval, svm_labels, light_ms, chroma_ms, thresholds, args.max_accuracy_drop)
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()